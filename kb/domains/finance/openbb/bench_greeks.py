@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark greeks.py against a scalar Black-Scholes reference.
+
+Builds a synthetic NIFTY-like chain (default 5,000 contracts: calls and puts
+over 10 expiries from 3 to 180 days, strikes spread +/-2.5 standard
+deviations around the forward, with a volatility smile), prices it with the
+scalar reference, then recovers the volatilities and Greeks with both the
+vectorized engine and a per-contract loop. The scalar reference uses only
+math.erf, so it shares no code with the engine.
+
+Reports the IV error against the true volatilities, the largest Greek
+mismatch between the two implementations, and the time each takes. Exits
+non-zero if the accuracy limits are exceeded. No network access is needed.
+
+Usage:
+    python bench_greeks.py
+    python bench_greeks.py --contracts 20000 --repeat 5
+"""
+
+import argparse
+import math
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from greeks import SCIPY_AVAILABLE, VOL_MAX, VOL_MIN, bs_greeks, bs_price, implied_vol
+
+SPOT = 24300.0
+RATE = 0.065
+DIV = 0.012
+EXPIRY_DAYS = (3, 7, 14, 21, 28, 35, 63, 91, 126, 180)
+
+# Accuracy limits: IV in vol units, Greeks relative to max(|value|, 1e-6)
+IV_LIMIT = 1e-6
+GREEK_LIMIT = 1e-9
+
+
+def scalar_cdf(x: float) -> float:
+    return 0.5 * math.erfc(-x / math.sqrt(2))
+
+
+def scalar_greeks(spot, strike, t, vol, rate, div, is_call) -> dict:
+    """Reference Black-Scholes price and Greeks of one contract."""
+    sqrt_t = math.sqrt(t)
+    d1 = (math.log(spot / strike) + (rate - div + 0.5 * vol * vol) * t) / (vol * sqrt_t)
+    d2 = d1 - vol * sqrt_t
+    pdf1 = math.exp(-0.5 * d1 * d1) / math.sqrt(2 * math.pi)
+    spot_disc, strike_disc = spot * math.exp(-div * t), strike * math.exp(-rate * t)
+    decay = -spot_disc * pdf1 * vol / (2 * sqrt_t)
+    if is_call:
+        price = spot_disc * scalar_cdf(d1) - strike_disc * scalar_cdf(d2)
+        delta = math.exp(-div * t) * scalar_cdf(d1)
+        theta = decay - rate * strike_disc * scalar_cdf(d2) + div * spot_disc * scalar_cdf(d1)
+    else:
+        price = strike_disc * scalar_cdf(-d2) - spot_disc * scalar_cdf(-d1)
+        delta = -math.exp(-div * t) * scalar_cdf(-d1)
+        theta = decay + rate * strike_disc * scalar_cdf(-d2) - div * spot_disc * scalar_cdf(-d1)
+    return {
+        'price': price,
+        'delta': delta,
+        'gamma': math.exp(-div * t) * pdf1 / (spot * vol * sqrt_t),
+        'vega': spot_disc * pdf1 * sqrt_t / 100,
+        'theta': theta / 365,
+    }
+
+
+def scalar_implied_vol(price, spot, strike, t, rate, div, is_call, tol=1e-10) -> float:
+    """Reference IV: Newton from 0.3, falling back to bisection, one contract at a time."""
+    lo, hi, vol = VOL_MIN, VOL_MAX, 0.3
+    for _ in range(200):
+        greeks = scalar_greeks(spot, strike, t, vol, rate, div, is_call)
+        diff = greeks['price'] - price
+        if abs(diff) <= tol * max(price, 1.0):
+            return vol
+        if diff > 0:
+            hi = vol
+        else:
+            lo = vol
+        vega = greeks['vega'] * 100
+        step = vol - diff / vega if vega > 0 else lo
+        vol = step if lo < step < hi else 0.5 * (lo + hi)
+        if hi - lo <= tol:
+            return vol
+    return float('nan')
+
+
+def make_chain(contracts: int, seed: int) -> dict:
+    """Synthetic chain: strikes around each expiry's forward, vols on a smile."""
+    rng = np.random.default_rng(seed)
+    per_expiry = max(contracts // (2 * len(EXPIRY_DAYS)), 1)
+    strike, t, vol, is_call = [], [], [], []
+    for days in EXPIRY_DAYS:
+        years = days / 365
+        forward = SPOT * math.exp((RATE - DIV) * years)
+        atm_vol = 0.11 + 0.02 * math.sqrt(years)
+        moneyness = np.linspace(-2.5, 2.5, per_expiry) * atm_vol * math.sqrt(years)
+        strikes = np.round(forward * np.exp(moneyness) / 50) * 50
+        smile = atm_vol + 0.6 * moneyness ** 2 - 0.05 * moneyness + rng.normal(0, 0.002, per_expiry)
+        for call in (True, False):
+            strike.append(strikes)
+            t.append(np.full(per_expiry, years))
+            vol.append(smile)
+            is_call.append(np.full(per_expiry, call))
+    chain = {name: np.concatenate(values)[:contracts] for name, values in
+             (('strike', strike), ('t', t), ('vol', vol), ('is_call', is_call))}
+    chain['price'] = np.array([scalar_greeks(SPOT, k, tt, v, RATE, DIV, c)['price'] for k, tt, v, c in
+                               zip(chain['strike'], chain['t'], chain['vol'], chain['is_call'])])
+    return chain
+
+
+def timed(function, repeat: int):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - started)
+    return result, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized Black-Scholes against a scalar reference")
+    parser.add_argument("--contracts", type=int, default=5000, help="Contracts in the synthetic chain (default: 5000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per timing; medians are reported (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the smile noise (default: 0)")
+    args = parser.parse_args()
+
+    chain = make_chain(args.contracts, args.seed)
+    n = len(chain['price'])
+    contracts = list(zip(chain['price'], chain['strike'], chain['t'], chain['is_call']))
+    print(f"{n} contracts, {len(EXPIRY_DAYS)} expiries, normal CDF: {'scipy' if SCIPY_AVAILABLE else 'Hart'}")
+
+    vector_iv, vector_iv_time = timed(lambda: implied_vol(
+        chain['price'], SPOT, chain['strike'], chain['t'], RATE, DIV, chain['is_call']), args.repeat)
+    scalar_iv, scalar_iv_time = timed(lambda: np.array([
+        scalar_implied_vol(p, SPOT, k, t, RATE, DIV, c) for p, k, t, c in contracts]), args.repeat)
+
+    vector_greeks, vector_greeks_time = timed(lambda: bs_greeks(
+        SPOT, chain['strike'], chain['t'], chain['vol'], RATE, DIV, chain['is_call']), args.repeat)
+    scalar_rows, scalar_greeks_time = timed(lambda: [
+        scalar_greeks(SPOT, k, t, v, RATE, DIV, c)
+        for k, t, v, c in zip(chain['strike'], chain['t'], chain['vol'], chain['is_call'])], args.repeat)
+
+    failures = 0
+    iv_error = np.abs(vector_iv - chain['vol'])
+    unsolved = int(np.isnan(vector_iv).sum())
+    print(f"\n{'Implied vol':<14}{'Vector s':>10}{'Scalar s':>10}{'Speedup':>9}{'Max error':>12}{'Unsolved':>10}")
+    print(f"{'':<14}{vector_iv_time:>10.4f}{scalar_iv_time:>10.4f}{scalar_iv_time / vector_iv_time:>8.1f}x"
+          f"{np.nanmax(iv_error):>12.2e}{unsolved:>10}")
+    if unsolved or np.nanmax(iv_error) > IV_LIMIT or np.nanmax(np.abs(vector_iv - scalar_iv)) > IV_LIMIT:
+        failures += 1
+
+    round_trip = np.abs(bs_price(SPOT, chain['strike'], chain['t'], vector_iv, RATE, DIV, chain['is_call'])
+                        - chain['price'])
+    print(f"{'':<14}max price round-trip error {np.nanmax(round_trip):.2e}")
+
+    print(f"\n{'Greeks':<14}{'Vector s':>10}{'Scalar s':>10}{'Speedup':>9}{'Max rel diff':>14}")
+    print(f"{'':<14}{vector_greeks_time:>10.4f}{scalar_greeks_time:>10.4f}"
+          f"{scalar_greeks_time / vector_greeks_time:>8.1f}x")
+    for name in ('price', 'delta', 'gamma', 'vega', 'theta'):
+        reference = np.array([row[name] for row in scalar_rows])
+        relative = np.abs(vector_greeks[name] - reference) / np.maximum(np.abs(reference), 1e-6)
+        flag = ""
+        if relative.max() > GREEK_LIMIT:
+            failures += 1
+            flag = "  MISMATCH"
+        print(f"  {name:<12}{'':>29}{relative.max():>14.2e}{flag}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
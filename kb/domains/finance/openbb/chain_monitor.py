@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Live option-chain monitor with diff-based incremental analytics.
+
+Polls nse_optionchain_scrapper() for any number of underlyings from one
+process and streams alerts. Each new snapshot is diffed against the
+previous one, and only the rows that changed feed the analytics:
+
+    PCR             per-expiry call/put OI totals, adjusted by the changed rows
+    max pain        recomputed only for expiries whose OI changed
+    OI-change and   top-k rankings per leg, merged from the changed rows
+    liquidity       (a full re-rank only when a current leader weakens)
+    leaders
+
+A payload with an unchanged NSE timestamp is skipped before parsing. Once
+parsed, per-tick work is one vectorized comparison plus updates
+proportional to the number of changed strikes. A re-listed chain (strikes
+added or an expiry rolled off) is rebuilt from scratch.
+
+Alerts (sentiment, max_pain, atm, oi_spike, leader, error) are yielded as
+Alert tuples and printed as text or JSON lines.
+
+Usage:
+    from chain_monitor import monitor
+    for alert in monitor(["NIFTY", "BANKNIFTY"], interval=60):
+        print(alert.symbol, alert.kind, alert.message)
+
+    python chain_monitor.py NIFTY BANKNIFTY FINNIFTY --interval 60
+    python chain_monitor.py NIFTY --json --store     # JSON lines, keep snapshots in market_store
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from option_chain import LEG_COLUMNS, LEGS, OptionChainSnapshot, max_pain, sentiment
+
+DEFAULT_INTERVAL = 60
+DEFAULT_WORKERS = 8
+DEFAULT_TOP = 5
+
+# Liquid legs, as in find_liquid_strikes() of nifty-options-data-libraries.md
+LIQUID_MIN_OI = 10000
+LIQUID_MIN_VOLUME = 1000
+
+# A leg's OI moving this much between two snapshots is an oi_spike alert
+OI_SPIKE_RATIO = 0.10
+OI_SPIKE_MIN = 10000
+
+
+class Alert(NamedTuple):
+    time: datetime
+    symbol: str
+    kind: str
+    message: str
+    data: dict
+
+    def to_json(self) -> str:
+        return json.dumps({**self._asdict(), 'time': self.time.isoformat()}, default=str)
+
+
+def _zero_nan(values: np.ndarray) -> np.ndarray:
+    # np.nan_to_num() costs ~30 us a call, several times this on a tick's few rows
+    return np.where(np.isnan(values), 0.0, values)
+
+
+class TopK:
+    """Rows with the k largest scores (ties to the lower row), kept up to date from changed rows.
+
+    Scores of -inf (or NaN) are never ranked.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.index = np.empty(0, dtype=np.intp)
+        self.values = np.empty(0)
+
+    def _select(self, index: np.ndarray, values: np.ndarray):
+        keep = values > -np.inf
+        index, values = index[keep], values[keep]
+        if len(values) > self.k:
+            # Everything tied with the k-th score, then an exact (score, row) ordering
+            kth = np.partition(values, len(values) - self.k)[len(values) - self.k]
+            keep = values >= kth
+            index, values = index[keep], values[keep]
+        order = np.lexsort((index, -values))[:self.k]
+        self.index, self.values = index[order], values[order]
+
+    def rebuild(self, values: np.ndarray):
+        self._select(np.arange(len(values)), np.where(np.isnan(values), -np.inf, values))
+
+    def update(self, rows: np.ndarray, values: np.ndarray, score: Callable[[], np.ndarray]):
+        """Merge new scores of the (sorted) changed rows; score() gives all scores for a re-rank."""
+        values = np.where(np.isnan(values), -np.inf, values)
+        position = np.minimum(np.searchsorted(rows, self.index), max(len(rows) - 1, 0))
+        hit = (rows[position] == self.index) if len(rows) else np.zeros(len(self.index), dtype=bool)
+        if np.any(values[position[hit]] < self.values[hit]):
+            # A leader weakened: some unchanged row may now outrank it
+            self.rebuild(score())
+            return
+        self._select(np.concatenate((self.index[~hit], rows)), np.concatenate((self.values[~hit], values)))
+
+
+class ChainMonitor:
+    """Incrementally maintained analytics of one underlying's option chain."""
+
+    RANKINGS = tuple(f"{leg}_{metric}" for metric in ('oi_change', 'liquidity') for leg in LEGS)
+
+    def __init__(self, symbol: str, top: int = DEFAULT_TOP, oi_spike_ratio: float = OI_SPIKE_RATIO,
+                 oi_spike_min: float = OI_SPIKE_MIN):
+        self.symbol = symbol
+        self.oi_spike_ratio = oi_spike_ratio
+        self.oi_spike_min = oi_spike_min
+        self.snap: Optional[OptionChainSnapshot] = None
+        self.row_expiry = np.empty(0, dtype=np.intp)
+        self.ce_oi = np.zeros(0)
+        self.pe_oi = np.zeros(0)
+        self.max_pains = np.zeros(0)
+        self.rankings = {name: TopK(top) for name in self.RANKINGS}
+        self.updates = 0
+        self.rows_changed = 0
+
+    # Analytics
+
+    def _score(self, snap: OptionChainSnapshot, name: str, rows=slice(None)) -> np.ndarray:
+        leg, metric = name.split('_', 1)
+        if metric == 'oi_change':
+            return snap.columns[f'{leg}_oi_change'][rows]
+        volume = snap.columns[f'{leg}_volume'][rows]
+        liquid = (snap.columns[f'{leg}_oi'][rows] > LIQUID_MIN_OI) & (volume > LIQUID_MIN_VOLUME)
+        return np.where(liquid, volume, -np.inf)
+
+    def _max_pain(self, snap: OptionChainSnapshot, expiry: int) -> float:
+        rows = slice(snap.expiry_starts[expiry], snap.expiry_stops[expiry])
+        strike = max_pain(snap.strike[rows], snap.ce_oi[rows], snap.pe_oi[rows])
+        return np.nan if strike is None else strike
+
+    def _rebuild(self, snap: OptionChainSnapshot):
+        self.row_expiry = np.repeat(np.arange(len(snap.expiries)), snap.expiry_stops - snap.expiry_starts)
+        self.ce_oi = np.bincount(self.row_expiry, _zero_nan(snap.ce_oi), len(snap.expiries))
+        self.pe_oi = np.bincount(self.row_expiry, _zero_nan(snap.pe_oi), len(snap.expiries))
+        self.max_pains = np.array([self._max_pain(snap, expiry) for expiry in range(len(snap.expiries))])
+        for name, ranking in self.rankings.items():
+            ranking.rebuild(self._score(snap, name))
+        self.rows_changed += len(snap)
+
+    @staticmethod
+    def aligned(old: OptionChainSnapshot, new: OptionChainSnapshot) -> bool:
+        """Whether both snapshots list the same (expiry, strike) rows in the same order."""
+        return np.array_equal(old.strike, new.strike) and np.array_equal(old.expiry, new.expiry)
+
+    @staticmethod
+    def changed_rows(old: OptionChainSnapshot, new: OptionChainSnapshot) -> np.ndarray:
+        """Sorted indices of aligned rows where any leg field differs (NaN equals NaN)."""
+        changed = (old.has_ce != new.has_ce) | (old.has_pe != new.has_pe)
+        for name in LEG_COLUMNS:
+            # Compare bit patterns: one pass per column, and NaN (always float('nan') here) equals itself
+            changed |= old.columns[name].view(np.int64) != new.columns[name].view(np.int64)
+        return np.flatnonzero(changed)
+
+    def _apply(self, old: OptionChainSnapshot, new: OptionChainSnapshot, rows: np.ndarray):
+        """Move the analytics from old to new, touching only rows."""
+        if not len(rows):
+            return
+        expiry = self.row_expiry[rows]
+        oi_moved = np.zeros(len(rows), dtype=bool)
+        for leg, sums in (('ce', self.ce_oi), ('pe', self.pe_oi)):
+            before = _zero_nan(old.columns[f'{leg}_oi'][rows])
+            after = _zero_nan(new.columns[f'{leg}_oi'][rows])
+            np.add.at(sums, expiry, after - before)
+            oi_moved |= after != before
+        for touched in np.unique(expiry[oi_moved]):
+            self.max_pains[touched] = self._max_pain(new, touched)
+        for name, ranking in self.rankings.items():
+            ranking.update(rows, self._score(new, name, rows), lambda name=name: self._score(new, name))
+        self.rows_changed += len(rows)
+
+    def pcr(self) -> float:
+        calls = self.ce_oi.sum()
+        return float(self.pe_oi.sum() / calls) if calls > 0 else 0.0
+
+    def _leader_keys(self, name: str) -> set:
+        index = self.rankings[name].index
+        return set(zip(self.snap.expiry[index].tolist(), self.snap.strike[index].tolist()))
+
+    def leaders(self, name: str) -> List[Tuple[str, float, float]]:
+        """(expiry, strike, score) of a ranking's rows, best first."""
+        ranking = self.rankings[name]
+        return [(str(self.snap.expiry[row]), float(self.snap.strike[row]), float(value))
+                for row, value in zip(ranking.index, ranking.values)]
+
+    def summary(self) -> dict:
+        snap = self.snap
+        pcr = self.pcr()
+        return {
+            'symbol': self.symbol,
+            'spot': snap.spot,
+            'atm': snap.atm_strike(snap.expiries[0]) if len(snap.expiries) else None,
+            'pcr': round(pcr, 4),
+            'sentiment': sentiment(pcr),
+            'max_pain': {str(expiry): float(strike) for expiry, strike in zip(snap.expiries, self.max_pains)},
+            'leaders': {name: self.leaders(name) for name in self.RANKINGS},
+        }
+
+    # Updates
+
+    def update(self, snap: OptionChainSnapshot) -> List[Alert]:
+        """Take a new snapshot and return the alerts it raises (none for the first one)."""
+        old = self.snap
+        before = None
+        if old is not None:
+            before = (self.pcr(), dict(zip(old.expiries, self.max_pains)),
+                      old.atm_strike(old.expiries[0]) if len(old.expiries) else None,
+                      {name: self._leader_keys(name) for name in self.RANKINGS})
+
+        if old is not None and self.aligned(old, snap):
+            rows = self.changed_rows(old, snap)
+            self.snap = snap
+            self._apply(old, snap, rows)
+        else:
+            rows = None
+            self.snap = snap
+            self._rebuild(snap)
+        self.updates += 1
+        if before is None:
+            return []
+        return self._alerts(old, snap, rows, *before)
+
+    def _alerts(self, old, snap, rows, pcr_before, max_pains_before, atm_before, leaders_before) -> List[Alert]:
+        when = snap.timestamp if isinstance(snap.timestamp, datetime) else datetime.now()
+        alerts = []
+
+        def alert(kind, message, **data):
+            alerts.append(Alert(when, self.symbol, kind, message, data))
+
+        pcr = self.pcr()
+        if sentiment(pcr) != sentiment(pcr_before):
+            alert('sentiment', f"PCR {pcr:.2f}: {sentiment(pcr_before)} -> {sentiment(pcr)}",
+                  pcr=pcr, previous=pcr_before)
+
+        for expiry, strike in zip(snap.expiries, self.max_pains):
+            previous = max_pains_before.get(expiry)
+            if previous is not None and strike != previous and not (np.isnan(strike) and np.isnan(previous)):
+                alert('max_pain', f"max pain {expiry}: {previous:g} -> {strike:g}",
+                      expiry=str(expiry), strike=float(strike), previous=float(previous))
+
+        atm = snap.atm_strike(snap.expiries[0]) if len(snap.expiries) else None
+        if atm != atm_before:
+            alert('atm', f"ATM {atm_before:g} -> {atm:g} (spot {snap.spot:,.2f})" if atm and atm_before
+                  else f"ATM {atm}", strike=atm, previous=atm_before, spot=snap.spot)
+
+        if rows is not None and len(rows):
+            for leg in LEGS:
+                before = _zero_nan(old.columns[f'{leg}_oi'][rows])
+                after = _zero_nan(snap.columns[f'{leg}_oi'][rows])
+                move = after - before
+                spikes = (np.abs(move) >= self.oi_spike_min) & (np.abs(move) >= self.oi_spike_ratio * before)
+                for row, change, total in zip(rows[spikes], move[spikes], after[spikes]):
+                    alert('oi_spike', f"{snap.strike[row]:g} {leg.upper()} ({snap.expiry[row]}) OI {change:+,.0f} "
+                          f"to {total:,.0f}", expiry=str(snap.expiry[row]), strike=float(snap.strike[row]),
+                          leg=leg.upper(), change=float(change), oi=float(total))
+
+        for name in self.RANKINGS:
+            ranking = self.rankings[name]
+            for rank, (row, score) in enumerate(zip(ranking.index, ranking.values), start=1):
+                expiry, strike = snap.expiry[row], snap.strike[row]
+                if (expiry.tolist(), strike.tolist()) not in leaders_before[name]:
+                    leg, metric = name.split('_', 1)
+                    alert('leader', f"{strike:g} {leg.upper()} ({expiry}) new #{rank} by {metric}: {score:,.0f}",
+                          ranking=name, rank=rank, expiry=str(expiry), strike=float(strike), score=float(score))
+        return alerts
+
+
+def monitor(symbols: Iterable[str], interval: float = DEFAULT_INTERVAL, fetch: Optional[Callable[[str], dict]] = None,
+            max_workers: int = DEFAULT_WORKERS, rounds: Optional[int] = None, store=None,
+            monitors: Optional[Dict[str, ChainMonitor]] = None, **options) -> Iterator[Alert]:
+    """Poll every symbol each interval seconds and yield alerts as they are raised.
+
+    Fetches run concurrently (at most max_workers at a time); each payload is
+    analysed as soon as it arrives. A failed fetch yields an 'error' alert
+    and the symbol is retried next round. rounds=None polls forever.
+    store is an optional market_store.MarketStore that keeps every new
+    snapshot. options go to each ChainMonitor.
+    """
+    if fetch is None:
+        from nsepython import nse_optionchain_scrapper as fetch
+    symbols = list(dict.fromkeys(symbols))
+    monitors = monitors if monitors is not None else {}
+    for symbol in symbols:
+        monitors.setdefault(symbol, ChainMonitor(symbol, **options))
+    last_stamp: Dict[str, object] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as executor:
+        completed = 0
+        while rounds is None or completed < rounds:
+            started = time.monotonic()
+            futures = {executor.submit(fetch, symbol): symbol for symbol in symbols}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    payload = future.result()
+                    stamp = payload['records'].get('timestamp')
+                    if stamp and stamp == last_stamp.get(symbol):
+                        continue
+                    snap = OptionChainSnapshot.from_payload(payload, symbol)
+                except Exception as e:
+                    yield Alert(datetime.now(), symbol, 'error', f"{type(e).__name__}: {e}", {})
+                    continue
+                last_stamp[symbol] = stamp
+                if store is not None:
+                    store.append_chain(snap)
+                yield from monitors[symbol].update(snap)
+            completed += 1
+            if rounds is None or completed < rounds:
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream option-chain alerts for NSE underlyings")
+    parser.add_argument("symbols", nargs="*", default=["NIFTY"], help="Underlyings (default: NIFTY)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help=f"Seconds between polls (default: {DEFAULT_INTERVAL})")
+    parser.add_argument("--rounds", type=int, help="Stop after this many polls (default: run until Ctrl-C)")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help=f"Leaders per ranking (default: {DEFAULT_TOP})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Parallel fetches (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--json", action="store_true", help="Print alerts as JSON lines")
+    parser.add_argument("--store", action="store_true", help="Append every snapshot to market_store")
+    args = parser.parse_args()
+
+    store = None
+    if args.store:
+        from market_store import MarketStore
+        store = MarketStore()
+
+    monitors: Dict[str, ChainMonitor] = {}
+    try:
+        for alert in monitor(args.symbols, args.interval, max_workers=args.workers, rounds=args.rounds,
+                             store=store, monitors=monitors, top=args.top):
+            if args.json:
+                print(alert.to_json(), flush=True)
+            else:
+                print(f"[{alert.time:%H:%M:%S}] {alert.symbol:<12}{alert.kind:<11}{alert.message}", flush=True)
+    except KeyboardInterrupt:
+        print("\nMonitoring stopped.")
+    for symbol, chain in monitors.items():
+        if chain.updates:
+            summary = chain.summary()
+            print(f"{symbol}: {chain.updates} snapshots, {chain.rows_changed:,} rows analysed; "
+                  f"PCR {summary['pcr']:.2f} ({summary['sentiment']}), ATM {summary['atm']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Vectorized Black-Scholes prices, Greeks and implied volatility.
+
+Every function takes NumPy arrays (or scalars that broadcast against them),
+so a whole multi-expiry chain is priced in a handful of array operations:
+
+    bs_price(spot, strike, t, vol, rate, div, is_call)
+    bs_greeks(...)      -> price, delta, gamma, vega, theta
+    implied_vol(price, spot, strike, t, rate, div, is_call)
+    chain_greeks(snap)  -> IV and Greeks for both legs of an OptionChainSnapshot
+
+implied_vol() solves all contracts in lockstep: a closed-form Corrado-Miller
+guess, then Newton steps safeguarded by a per-contract bisection bracket,
+with converged contracts dropped from the working set each iteration.
+
+Units: t in years, vol and rates as decimals (0.15, not 15). bs_greeks()
+reports vega per 1 vol point and theta per calendar day; chain_greeks()
+reports IV in percent, like NSE's impliedVolatility.
+
+Usage:
+    from greeks import chain_greeks
+    from option_chain import OptionChainSnapshot
+    snap = OptionChainSnapshot.from_payload(nse_optionchain_scrapper("NIFTY"), "NIFTY")
+    g = chain_greeks(snap)
+    i = snap.atm_index()
+    print(g['ce_iv'][i], g['ce_delta'][i], g['pe_theta'][i])
+
+    python bench_greeks.py    # accuracy and speed against a scalar reference
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+# Try to import scipy for the normal CDF, but make it optional
+try:
+    from scipy.special import ndtr
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# Roughly the 91-day T-bill yield; pass rate= for anything precise
+DEFAULT_RATE = 0.065
+
+# NSE index options expire at the 15:30 close
+EXPIRY_TIME = np.timedelta64(15 * 60 + 30, 'm')
+YEAR = np.timedelta64(365 * 24 * 3600, 's')
+
+# Implied-volatility search range and solver settings
+VOL_MIN = 1e-4
+VOL_MAX = 5.0
+IV_TOLERANCE = 1e-10
+IV_MAX_ITERATIONS = 100
+
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+def _norm_cdf_hart(x: np.ndarray) -> np.ndarray:
+    """Standard normal CDF to double precision (Hart 1968, as given by West 2005)."""
+    z = np.abs(x)
+    e = np.exp(-0.5 * z * z)
+    num = ((((((0.0352624965998911 * z + 0.700383064443688) * z + 6.37396220353165) * z
+              + 33.912866078383) * z + 112.079291497871) * z + 221.213596169931) * z + 220.206867912376)
+    den = (((((((0.0883883476483184 * z + 1.75566716318264) * z + 16.064177579207) * z
+               + 86.7807322029461) * z + 296.564248779674) * z + 637.333633378831) * z
+            + 793.826512519948) * z + 440.413735824752)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Continued fraction in the tail, where the rational form loses accuracy
+        tail = e / (z + 1 / (z + 2 / (z + 3 / (z + 4 / (z + 0.65))))) / SQRT_2PI
+    lower = np.where(z < 7.07106781186547, e * num / den, tail)
+    lower = np.where(z > 37, 0.0, lower)
+    return np.where(x > 0, 1 - lower, lower)
+
+
+def norm_cdf(x) -> np.ndarray:
+    """Standard normal CDF (scipy's ndtr when installed)."""
+    x = np.asarray(x, dtype=np.float64)
+    return ndtr(x) if SCIPY_AVAILABLE else _norm_cdf_hart(x)
+
+
+def norm_pdf(x) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def _d1_d2(spot, strike, t, vol, rate, div):
+    vol_sqrt_t = vol * np.sqrt(t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(spot / strike) + (rate - div + 0.5 * vol * vol) * t) / vol_sqrt_t
+    return d1, d1 - vol_sqrt_t
+
+
+def bs_price(spot, strike, t, vol, rate=DEFAULT_RATE, div=0.0, is_call=True) -> np.ndarray:
+    """Black-Scholes price of European calls (is_call True) or puts."""
+    d1, d2 = _d1_d2(spot, strike, t, vol, rate, div)
+    sign = np.where(is_call, 1.0, -1.0)
+    return sign * (spot * np.exp(-div * t) * norm_cdf(sign * d1) - strike * np.exp(-rate * t) * norm_cdf(sign * d2))
+
+
+def bs_greeks(spot, strike, t, vol, rate=DEFAULT_RATE, div=0.0, is_call=True) -> Dict[str, np.ndarray]:
+    """Price, delta, gamma, vega (per vol point) and theta (per calendar day)."""
+    d1, d2 = _d1_d2(spot, strike, t, vol, rate, div)
+    sign = np.where(is_call, 1.0, -1.0)
+    spot_disc = spot * np.exp(-div * t)
+    strike_disc = strike * np.exp(-rate * t)
+    cdf1 = norm_cdf(sign * d1)
+    cdf2 = norm_cdf(sign * d2)
+    pdf1 = norm_pdf(d1)
+    sqrt_t = np.sqrt(t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = np.exp(-div * t) * pdf1 / (spot * vol * sqrt_t)
+        decay = -spot_disc * pdf1 * vol / (2 * sqrt_t)
+    return {
+        'price': sign * (spot_disc * cdf1 - strike_disc * cdf2),
+        'delta': sign * np.exp(-div * t) * cdf1,
+        'gamma': gamma,
+        'vega': spot_disc * pdf1 * sqrt_t / 100,
+        'theta': (decay - sign * rate * strike_disc * cdf2 + sign * div * spot_disc * cdf1) / 365,
+    }
+
+
+def _price_and_vega(spot_disc, strike_disc, sqrt_t, log_moneyness, vol, sign):
+    """Price and raw vega from precomputed per-contract terms (the solver's inner loop)."""
+    vol_sqrt_t = vol * sqrt_t
+    d1 = log_moneyness / vol_sqrt_t + 0.5 * vol_sqrt_t
+    d2 = d1 - vol_sqrt_t
+    price = sign * (spot_disc * norm_cdf(sign * d1) - strike_disc * norm_cdf(sign * d2))
+    return price, spot_disc * norm_pdf(d1) * sqrt_t
+
+
+def initial_vol_guess(price, spot_disc, strike_disc, t, sign) -> np.ndarray:
+    """Corrado-Miller closed-form IV estimate (puts via put-call parity), clipped to the search range."""
+    call = price + np.where(sign > 0, 0.0, spot_disc - strike_disc)
+    half_gap = 0.5 * (spot_disc - strike_disc)
+    a = call - half_gap
+    root = np.sqrt(np.maximum(a * a - (spot_disc - strike_disc) ** 2 / np.pi, 0.0))
+    guess = np.sqrt(2 * np.pi / t) / (spot_disc + strike_disc) * (a + root)
+    guess = np.where(np.isfinite(guess) & (guess > 0), guess, 0.3)
+    return np.clip(guess, 2 * VOL_MIN, VOL_MAX / 2)
+
+
+def implied_vol(price, spot, strike, t, rate=DEFAULT_RATE, div=0.0, is_call=True,
+                tol: float = IV_TOLERANCE, max_iter: int = IV_MAX_ITERATIONS) -> np.ndarray:
+    """Black-Scholes implied volatility of every contract at once.
+
+    NaN where the price is outside the no-arbitrage bounds, t <= 0, or the
+    volatility would be above VOL_MAX. A contract is converged when its
+    model price is within tol * max(price, 1) of the target, or when its
+    bracket is narrower than tol.
+    """
+    price, spot, strike, t, rate, div, is_call = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.float64) for value in (price, spot, strike, t, rate, div)),
+        np.asarray(is_call, dtype=bool))
+    shape = price.shape
+    price, spot, strike, t, rate, div = (value.ravel() for value in (price, spot, strike, t, rate, div))
+    sign = np.where(is_call.ravel(), 1.0, -1.0)
+    result = np.full(price.size, np.nan)
+
+    with np.errstate(invalid='ignore', over='ignore', divide='ignore'):
+        spot_disc = spot * np.exp(-div * t)
+        strike_disc = strike * np.exp(-rate * t)
+        intrinsic = np.maximum(sign * (spot_disc - strike_disc), 0.0)
+        upper = np.where(sign > 0, spot_disc, strike_disc)
+        valid = (t > 0) & (price > intrinsic) & (price < upper) & (spot > 0) & (strike > 0)
+    idx = np.flatnonzero(valid)
+
+    # Per-contract constants of the working set
+    target = price[idx]
+    spot_disc, strike_disc, sign = spot_disc[idx], strike_disc[idx], sign[idx]
+    sqrt_t = np.sqrt(t[idx])
+    log_moneyness = np.log(spot_disc / strike_disc)
+    vol = initial_vol_guess(target, spot_disc, strike_disc, t[idx], sign)
+    lo = np.full(idx.size, VOL_MIN)
+    hi = np.full(idx.size, VOL_MAX)
+
+    for _ in range(max_iter):
+        if not idx.size:
+            break
+        model, vega = _price_and_vega(spot_disc, strike_disc, sqrt_t, log_moneyness, vol, sign)
+        diff = model - target
+        done = np.abs(diff) <= tol * np.maximum(target, 1.0)
+
+        # Price rises with vol, so the sign of diff moves one side of the bracket
+        hi = np.where(diff > 0, vol, hi)
+        lo = np.where(diff < 0, vol, lo)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = vol - diff / vega
+        newton = (step > lo) & (step < hi)
+        vol = np.where(done, vol, np.where(newton, step, 0.5 * (lo + hi)))
+        done |= (hi - lo) <= tol
+
+        if done.any():
+            result[idx[done]] = vol[done]
+            keep = ~done
+            idx, vol, lo, hi, target = idx[keep], vol[keep], lo[keep], hi[keep], target[keep]
+            spot_disc, strike_disc, sign = spot_disc[keep], strike_disc[keep], sign[keep]
+            sqrt_t, log_moneyness = sqrt_t[keep], log_moneyness[keep]
+
+    # A bracket that closed on the upper limit means the price needs more than VOL_MAX
+    result[result >= VOL_MAX * (1 - 1e-9)] = np.nan
+    return result.reshape(shape)
+
+
+def time_to_expiry(expiry, now: datetime) -> np.ndarray:
+    """Years from now until each expiry date's 15:30 close (0 once passed)."""
+    expiry = np.asarray(expiry, dtype='datetime64[D]')
+    remaining = (expiry + EXPIRY_TIME) - np.datetime64(now, 's')
+    return np.maximum(remaining / YEAR, 0.0)
+
+
+def chain_greeks(snap, rate: float = DEFAULT_RATE, div: float = 0.0, now: Optional[datetime] = None,
+                 price: str = 'mid') -> Dict[str, np.ndarray]:
+    """Our IV and Greeks for both legs of every row of an OptionChainSnapshot.
+
+    Keys are '<leg>_<name>' for leg in ce/pe and name in iv (percent),
+    delta, gamma, vega, theta; arrays line up with the snapshot's rows. Prices
+    are the bid/ask mid where both sides quote, else LTP (price='ltp' always
+    uses LTP). Time to expiry runs from now, default the snapshot timestamp.
+    """
+    now = now or snap.timestamp or datetime.now()
+    t = time_to_expiry(snap.expiry, now)
+    results = {}
+    for leg, is_call in (('ce', True), ('pe', False)):
+        ltp = snap.columns[f'{leg}_ltp']
+        if price == 'mid':
+            bid, ask = snap.columns[f'{leg}_bid'], snap.columns[f'{leg}_ask']
+            quoted = (bid > 0) & (ask >= bid)
+            premium = np.where(quoted, 0.5 * (bid + ask), ltp)
+        else:
+            premium = ltp
+        vol = implied_vol(premium, snap.spot, snap.strike, t, rate, div, is_call)
+        greeks = bs_greeks(snap.spot, snap.strike, t, vol, rate, div, is_call)
+        results[f'{leg}_iv'] = vol * 100
+        for name in ('delta', 'gamma', 'vega', 'theta'):
+            results[f'{leg}_{name}'] = greeks[name]
+    return results
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Batch OpenBB price history with a local, incrementally filled cache.
+
+load_history() fetches a universe of symbols with bounded parallelism and
+keeps every bar it downloads. Each (symbol, provider, interval) has an
+append-only JSON-lines file of bars plus the list of date ranges already
+covered; a request only fetches the gaps between those ranges and the
+requested one, so a year of history is downloaded once and later runs are
+daily top-ups. Today's (possibly unfinished) bar is never marked covered,
+so it is fetched again on the next run.
+
+Usage:
+    from history_cache import load_history
+    batch = load_history(["RELIANCE.NS", "TCS.NS"], start="2024-10-01")
+    batch.data["TCS.NS"]["close"].iloc[-1]    # DataFrames, like .to_df()
+    batch.failed                                # symbol -> error message
+
+    python history_cache.py RELIANCE.NS TCS.NS HDFCBANK.NS --days 365
+    python history_cache.py --universe nifty500.txt --days 365 --workers 16
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".history-cache"
+DEFAULT_PROVIDER = "yfinance"
+DEFAULT_INTERVAL = "1d"
+DEFAULT_WORKERS = 8
+
+# Rewrite a bar file once re-fetched bars (today's, mostly) pile up this much
+COMPACT_AFTER_DUPLICATES = 64
+
+DateLike = Union[str, date, datetime]
+DateRange = Tuple[date, date]
+
+
+class HistoryKey(NamedTuple):
+    symbol: str
+    provider: str
+    interval: str
+
+
+class HistoryBatch(NamedTuple):
+    data: Dict[str, object]      # symbol -> DataFrame (or list of bar dicts)
+    failed: Dict[str, str]       # symbol -> error message
+    requests: int                # provider calls made for the missing ranges
+
+
+def to_date(value: DateLike) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value[:10])
+
+
+def merge_ranges(ranges: Iterable[DateRange]) -> List[DateRange]:
+    """Sort inclusive date ranges and merge overlapping or adjacent ones."""
+    merged: List[DateRange] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(covered: List[DateRange], start: date, end: date) -> List[DateRange]:
+    """Parts of [start, end] not inside any covered range (covered must be merged)."""
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start - timedelta(days=1)))
+        cursor = max(cursor, covered_end + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def fetch_openbb(key: HistoryKey, start: date, end: date) -> List[dict]:
+    """Bars for [start, end] from obb.equity.price.historical as plain dicts."""
+    from openbb import obb
+
+    # Ask for one extra day in case the provider treats end_date as exclusive
+    result = obb.equity.price.historical(
+        symbol=key.symbol,
+        start_date=start.isoformat(),
+        end_date=(end + timedelta(days=1)).isoformat(),
+        provider=key.provider,
+        interval=key.interval,
+    )
+    return [row.model_dump() for row in result.results or []]
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+class HistoryCache:
+    """On-disk bars per (symbol, provider, interval) with their covered date ranges.
+
+    <root>/<provider>/<interval>/<symbol>.jsonl holds bars, appended as they
+    are fetched (a re-fetched date replaces the earlier bar on read);
+    <symbol>.json next to it holds {"covered": [[start, end], ...]}.
+    """
+
+    def __init__(self, root: Union[str, Path] = DEFAULT_CACHE_DIR):
+        self.root = Path(root)
+        self.locks: Dict[HistoryKey, Lock] = {}
+        self.locks_lock = Lock()
+
+    def lock(self, key: HistoryKey) -> Lock:
+        with self.locks_lock:
+            return self.locks.setdefault(key, Lock())
+
+    def paths(self, key: HistoryKey) -> Tuple[Path, Path]:
+        directory = self.root / key.provider / key.interval
+        name = key.symbol.replace(os.sep, "_")
+        return directory / f"{name}.jsonl", directory / f"{name}.json"
+
+    def covered(self, key: HistoryKey) -> List[DateRange]:
+        _, meta_path = self.paths(key)
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return []
+        return merge_ranges((to_date(start), to_date(end)) for start, end in meta.get("covered", []))
+
+    def missing(self, key: HistoryKey, start: date, end: date) -> List[DateRange]:
+        return missing_ranges(self.covered(key), start, end)
+
+    def append(self, key: HistoryKey, bars: List[dict], ranges: Iterable[DateRange]):
+        """Append bars, then record ranges as covered (bars first, so a crash only re-fetches)."""
+        bars_path, meta_path = self.paths(key)
+        bars_path.parent.mkdir(parents=True, exist_ok=True)
+        if bars:
+            with open(bars_path, "a") as f:
+                f.writelines(json.dumps(bar, default=_json_default) + "\n" for bar in bars)
+        covered = merge_ranges([*self.covered(key), *ranges])
+        meta = {"symbol": key.symbol, "provider": key.provider, "interval": key.interval,
+                "covered": [[start.isoformat(), end.isoformat()] for start, end in covered],
+                "updated": datetime.utcnow().isoformat() + "Z"}
+        fd, temp_path = tempfile.mkstemp(dir=meta_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(temp_path, meta_path)
+
+    def read(self, key: HistoryKey, start: date, end: date) -> List[dict]:
+        """Cached bars dated within [start, end], oldest first, one per date."""
+        bars_path, _ = self.paths(key)
+        try:
+            lines = bars_path.read_text().splitlines()
+        except OSError:
+            return []
+        bars = {}
+        for line in lines:
+            bar = json.loads(line)
+            bars[bar["date"]] = bar
+        if len(lines) - len(bars) > COMPACT_AFTER_DUPLICATES:
+            self.compact(key, bars)
+        first, last = start.isoformat(), (end + timedelta(days=1)).isoformat()
+        return [bars[day] for day in sorted(bars) if first <= day < last]
+
+    def compact(self, key: HistoryKey, bars: Dict[str, dict]):
+        bars_path, _ = self.paths(key)
+        fd, temp_path = tempfile.mkstemp(dir=bars_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.writelines(json.dumps(bars[day], default=_json_default) + "\n" for day in sorted(bars))
+        os.replace(temp_path, bars_path)
+
+
+def to_frame(bars: List[dict]):
+    """Bars as a DataFrame indexed by date, like OBBject.to_df() (needs pandas)."""
+    import pandas as pd
+
+    frame = pd.DataFrame(bars)
+    if frame.empty:
+        return frame
+    frame["date"] = pd.to_datetime(frame["date"])
+    return frame.set_index("date")
+
+
+def load_history(symbols: Iterable[str], start: DateLike, end: Optional[DateLike] = None,
+                 provider: str = DEFAULT_PROVIDER, interval: str = DEFAULT_INTERVAL,
+                 max_workers: int = DEFAULT_WORKERS, cache: Optional[HistoryCache] = None,
+                 fetch: Callable[[HistoryKey, date, date], List[dict]] = fetch_openbb,
+                 as_frame: bool = True) -> HistoryBatch:
+    """History of every symbol over [start, end] (end defaults to today).
+
+    Only the date ranges the cache has not covered are fetched, at most
+    max_workers at a time across the whole universe. A symbol whose fetch
+    fails is reported in .failed and keeps whatever was fetched for it.
+    """
+    cache = cache or HistoryCache()
+    start = to_date(start)
+    end = to_date(end) if end else date.today()
+    # Today's bar may still change; cover only up to yesterday
+    last_final = date.today() - timedelta(days=1)
+    symbols = list(dict.fromkeys(symbols))
+    keys = {symbol: HistoryKey(symbol, provider, interval) for symbol in symbols}
+    failed: Dict[str, str] = {}
+
+    def top_up(key: HistoryKey) -> int:
+        with cache.lock(key):
+            gaps = cache.missing(key, start, end)
+            for gap_start, gap_end in gaps:
+                bars = fetch(key, gap_start, gap_end)
+                covered = (gap_start, min(gap_end, last_final))
+                cache.append(key, bars, [covered] if covered[0] <= covered[1] else [])
+            return len(gaps)
+
+    requests = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {symbol: executor.submit(top_up, key) for symbol, key in keys.items()}
+        for symbol, future in futures.items():
+            try:
+                requests += future.result()
+            except Exception as e:
+                failed[symbol] = f"{type(e).__name__}: {e}"
+
+    data = {}
+    for symbol, key in keys.items():
+        bars = cache.read(key, start, end)
+        if bars or symbol not in failed:
+            data[symbol] = to_frame(bars) if as_frame else bars
+    return HistoryBatch(data, failed, requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch OpenBB price history into the local cache")
+    parser.add_argument("symbols", nargs="*", help="Symbols, e.g. RELIANCE.NS TCS.NS")
+    parser.add_argument("--universe", help="File with one symbol per line (# comments allowed)")
+    parser.add_argument("--days", type=int, default=365, help="History length in days (default: 365)")
+    parser.add_argument("--provider", default=DEFAULT_PROVIDER, help=f"OpenBB provider (default: {DEFAULT_PROVIDER})")
+    parser.add_argument("--interval", default=DEFAULT_INTERVAL, help=f"Bar interval (default: {DEFAULT_INTERVAL})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Parallel fetches (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Cache directory")
+    args = parser.parse_args()
+
+    symbols = list(args.symbols)
+    if args.universe:
+        for line in Path(args.universe).read_text().splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                symbols.append(line)
+    if not symbols:
+        parser.error("give symbols or --universe")
+
+    started = time.perf_counter()
+    batch = load_history(symbols, date.today() - timedelta(days=args.days), provider=args.provider,
+                         interval=args.interval, max_workers=args.workers,
+                         cache=HistoryCache(args.cache_dir), as_frame=False)
+    elapsed = time.perf_counter() - started
+
+    for symbol in symbols:
+        bars = batch.data.get(symbol, [])
+        if bars:
+            print(f"  {symbol:<16}{len(bars):>6} bars  {bars[0]['date'][:10]} .. {bars[-1]['date'][:10]}  "
+                  f"close {bars[-1].get('close')}")
+        if symbol in batch.failed:
+            print(f"  {symbol:<16}FAILED: {batch.failed[symbol]}")
+    print(f"\n{len(symbols)} symbols, {batch.requests} provider requests, "
+          f"{len(batch.failed)} failed, {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Columnar option-chain snapshot for nsepython payloads.
+
+OptionChainSnapshot turns one nse_optionchain_scrapper() payload into
+struct-of-arrays NumPy columns in a single pass over records.data:
+
+    strike, expiry                          one entry per (strike, expiry) row
+    has_ce, has_pe                          whether the row lists that leg
+    ce_oi, ce_oi_change, ce_volume, ce_ltp, ce_bid, ce_bid_qty,
+    ce_ask, ce_ask_qty, ce_iv               call leg (NaN where missing)
+    pe_...                                  put leg, same fields
+
+Rows are sorted by (expiry, strike), so each expiry is a contiguous slice
+and its strikes are already sorted: ATM lookup is a searchsorted() and PCR
+is a vectorized sum instead of another walk over nested dicts; max pain
+is a prefix-sum pass over one expiry's strikes.
+
+Usage:
+    from option_chain import OptionChainSnapshot
+    snap = OptionChainSnapshot.from_payload(nse_optionchain_scrapper("NIFTY"), "NIFTY")
+    i = snap.atm_index()
+    print(snap.strike[i], snap.ce_oi[i], snap.pe_oi[i], snap.pcr())
+
+    python option_chain.py NIFTY BANKNIFTY
+"""
+
+import sys
+import time
+from datetime import date, datetime
+from itertools import chain
+from operator import itemgetter
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+# Column suffix -> key in the CE / PE dicts of an NSE option-chain row
+LEG_FIELDS = {
+    'oi': 'openInterest',
+    'oi_change': 'changeinOpenInterest',
+    'volume': 'totalTradedVolume',
+    'ltp': 'lastPrice',
+    'bid': 'bidprice',
+    'bid_qty': 'bidQty',
+    'ask': 'askPrice',
+    'ask_qty': 'askQty',
+    'iv': 'impliedVolatility',
+}
+LEGS = ('ce', 'pe')
+LEG_COLUMNS = tuple(f"{leg}_{field}" for leg in LEGS for field in LEG_FIELDS)
+COLUMNS = ('strike', 'expiry', 'has_ce', 'has_pe') + LEG_COLUMNS
+
+EXPIRY_FORMAT = "%d-%b-%Y"
+TIMESTAMP_FORMAT = "%d-%b-%Y %H:%M:%S"
+
+# PCR thresholds used across the finance scripts
+BULLISH_PCR = 1.2
+BEARISH_PCR = 0.8
+
+Expiry = Union[None, str, date, np.datetime64]
+
+
+def parse_expiry(value) -> np.datetime64:
+    """'30-Jan-2025' (NSE's format), a date or a datetime64 -> datetime64[D]; NaT if empty."""
+    if value is None or value == '':
+        return np.datetime64('NaT', 'D')
+    if isinstance(value, str):
+        value = datetime.strptime(value, EXPIRY_FORMAT).date()
+    return np.datetime64(value, 'D')
+
+
+def sentiment(pcr: float) -> str:
+    """Bullish / Bearish / Neutral reading of a put-call ratio."""
+    if pcr > BULLISH_PCR:
+        return "Bullish"
+    if pcr < BEARISH_PCR:
+        return "Bearish"
+    return "Neutral"
+
+
+def max_pain(strike: np.ndarray, ce_oi: np.ndarray, pe_oi: np.ndarray) -> Optional[float]:
+    """Strike where option holders' payout would be smallest at expiry; None without strikes.
+
+    strike must be sorted. Prefix sums give every candidate's payout at once,
+    so this is linear in the number of strikes rather than quadratic.
+    """
+    if not len(strike):
+        return None
+    ce_oi = np.where(np.isnan(ce_oi), 0.0, ce_oi)
+    pe_oi = np.where(np.isnan(pe_oi), 0.0, pe_oi)
+    calls = np.cumsum(ce_oi)
+    call_value = np.cumsum(ce_oi * strike)
+    puts_above = pe_oi.sum() - np.cumsum(pe_oi)
+    put_value_above = (pe_oi * strike).sum() - np.cumsum(pe_oi * strike)
+    # Calls below each strike pay (K - k), puts above it pay (k - K)
+    payout = strike * calls - call_value + put_value_above - strike * puts_above
+    return float(strike[np.argmin(payout)])
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class OptionChainSnapshot:
+    """One option-chain payload as NumPy columns sorted by (expiry, strike).
+
+    Columns are attributes (snap.strike, snap.ce_oi, ...) and are also in
+    snap.columns. expiries holds the distinct expiry dates in order, and
+    rows_for(expiry) the row slice of one of them. Methods taking an expiry
+    accept NSE's 'DD-Mon-YYYY' string, a date or a datetime64; None means
+    every expiry, except for atm_index(), where it means the nearest one.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], spot: float, symbol: Optional[str] = None,
+                 timestamp: Optional[datetime] = None, expiry_dates: Optional[List[str]] = None):
+        missing = set(COLUMNS) - set(columns)
+        if missing:
+            raise ValueError(f"missing columns: {', '.join(sorted(missing))}")
+        self.columns = columns
+        self.spot = float(spot)
+        self.symbol = symbol
+        self.timestamp = timestamp
+        self.expiry_dates = list(expiry_dates or [])
+
+        # Distinct expiries and where each one's rows start (rows are sorted by expiry)
+        expiry = columns['expiry']
+        self.expiries = np.unique(expiry)
+        self.expiry_starts = np.searchsorted(expiry, self.expiries, side='left')
+        self.expiry_stops = np.append(self.expiry_starts[1:], len(expiry)).astype(self.expiry_starts.dtype)
+        self._atm_strikes: Dict[object, np.ndarray] = {}
+
+    @classmethod
+    def from_payload(cls, payload: dict, symbol: Optional[str] = None) -> "OptionChainSnapshot":
+        """Build a snapshot from an nse_optionchain_scrapper() payload in one pass.
+
+        Raises ValueError if records.timestamp is set but not in NSE's
+        TIMESTAMP_FORMAT; a missing one leaves timestamp None.
+        """
+        records = payload['records']
+        rows = records.get('data') or []
+        nan = float('nan')
+        keys = tuple(LEG_FIELDS.values())
+        absent = (nan,) * len(keys)
+
+        def scan(fields):
+            # The one pass over the dicts: three flat tuples per row
+            expiry_codes: Dict[object, int] = {}
+            table = []
+            append = table.append
+            for row in rows:
+                ce = row.get('CE')
+                pe = row.get('PE')
+                expiry = row.get('expiryDate') or (ce or pe or {}).get('expiryDate')
+                append((row['strikePrice'], expiry_codes.setdefault(expiry, len(expiry_codes)),
+                        ce is not None, pe is not None))
+                append(fields(ce) if ce is not None else absent)
+                append(fields(pe) if pe is not None else absent)
+            return table, expiry_codes
+
+        try:
+            table, expiry_codes = scan(itemgetter(*keys))
+        except KeyError:
+            # Some leg lacks a field; fall back to per-key lookups
+            table, expiry_codes = scan(lambda leg: tuple(leg.get(key, nan) for key in keys))
+
+        width = 4 + len(LEG_COLUMNS)
+        try:
+            values = np.fromiter(chain.from_iterable(table), dtype=np.float64, count=len(rows) * width)
+        except (TypeError, ValueError):
+            # NSE occasionally sends '-' or null for a number
+            values = np.array([_to_float(value) for value in chain.from_iterable(table)], dtype=np.float64)
+        values = values.reshape(len(rows), width)
+
+        code_dates = np.array([parse_expiry(expiry) for expiry in expiry_codes], dtype='datetime64[D]')
+        expiry = code_dates[values[:, 1].astype(np.intp)]
+        order = np.lexsort((values[:, 0], expiry))
+
+        # One transposed copy: every column is a contiguous row of it
+        block = np.ascontiguousarray(values[order].T)
+        columns = {'strike': block[0], 'expiry': expiry[order],
+                   'has_ce': block[2].astype(bool), 'has_pe': block[3].astype(bool)}
+        for index, name in enumerate(LEG_COLUMNS, start=4):
+            columns[name] = block[index]
+
+        timestamp = records.get('timestamp') or None
+        if timestamp is not None:
+            try:
+                timestamp = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+            except ValueError:
+                raise ValueError(f"unparseable records.timestamp {timestamp!r}, "
+                                 f"expected {TIMESTAMP_FORMAT!r}") from None
+        return cls(columns, records.get('underlyingValue', nan), symbol=symbol,
+                   timestamp=timestamp, expiry_dates=records.get('expiryDates'))
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        columns = self.__dict__.get('columns', {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(f"{type(self).__name__} has no attribute or column {name!r}")
+
+    def __len__(self) -> int:
+        return len(self.columns['strike'])
+
+    def rows_for(self, expiry: Expiry = None) -> slice:
+        """Row slice of one expiry (all rows for None); empty if the expiry is not listed."""
+        if expiry is None:
+            return slice(0, len(self))
+        expiry = parse_expiry(expiry)
+        index = np.searchsorted(self.expiries, expiry)
+        if index == len(self.expiries) or self.expiries[index] != expiry:
+            return slice(0, 0)
+        return slice(int(self.expiry_starts[index]), int(self.expiry_stops[index]))
+
+    def atm_strikes(self, expiry: Expiry = None) -> np.ndarray:
+        """Sorted strikes that list both a call and a put (the ATM candidates)."""
+        key = None if expiry is None else parse_expiry(expiry)
+        strikes = self._atm_strikes.get(key)
+        if strikes is None:
+            rows = self.rows_for(expiry)
+            both = self.has_ce[rows] & self.has_pe[rows]
+            strikes = self.strike[rows][both]
+            if expiry is None:
+                strikes = np.unique(strikes)
+            self._atm_strikes[key] = strikes
+        return strikes
+
+    def atm_strike(self, expiry: Expiry = None, spot: Optional[float] = None) -> Optional[float]:
+        """Listed strike closest to spot (the lower one on a tie); None if there is none."""
+        strikes = self.atm_strikes(expiry)
+        if not len(strikes):
+            return None
+        spot = self.spot if spot is None else spot
+        index = int(np.searchsorted(strikes, spot))
+        if index == len(strikes) or (index > 0 and spot - strikes[index - 1] <= strikes[index] - spot):
+            index -= 1
+        return float(strikes[index])
+
+    def atm_index(self, expiry: Expiry = None, spot: Optional[float] = None) -> Optional[int]:
+        """Row of the ATM strike in expiry (default: the nearest expiry)."""
+        if expiry is None:
+            if not len(self.expiries):
+                return None
+            expiry = self.expiries[0]
+        strike = self.atm_strike(expiry, spot)
+        if strike is None:
+            return None
+        rows = self.rows_for(expiry)
+        return rows.start + int(np.searchsorted(self.strike[rows], strike))
+
+    def pcr(self, expiry: Expiry = None, by: str = 'oi') -> float:
+        """Put-call ratio of total put vs. call `by` ('oi', 'volume' or 'oi_change'); 0 without calls."""
+        rows = self.rows_for(expiry)
+        calls = np.nansum(self.columns[f'ce_{by}'][rows])
+        puts = np.nansum(self.columns[f'pe_{by}'][rows])
+        return float(puts / calls) if calls > 0 else 0.0
+
+    def pcr_by_expiry(self, by: str = 'oi') -> np.ndarray:
+        """PCR of every expiry in self.expiries at once."""
+        if not len(self):
+            return np.zeros(0)
+        calls = np.add.reduceat(np.nan_to_num(self.columns[f'ce_{by}']), self.expiry_starts)
+        puts = np.add.reduceat(np.nan_to_num(self.columns[f'pe_{by}']), self.expiry_starts)
+        return np.divide(puts, calls, out=np.zeros_like(puts), where=calls > 0)
+
+    def max_pain(self, expiry: Expiry = None) -> Optional[float]:
+        """Max-pain strike of expiry (default: the nearest expiry)."""
+        if expiry is None:
+            if not len(self.expiries):
+                return None
+            expiry = self.expiries[0]
+        rows = self.rows_for(expiry)
+        return max_pain(self.strike[rows], self.ce_oi[rows], self.pe_oi[rows])
+
+    def leg(self, index: int, leg: str) -> Dict[str, float]:
+        """Fields of one leg ('CE' or 'PE') of a row, keyed like LEG_FIELDS."""
+        prefix = leg.lower()
+        return {field: float(self.columns[f"{prefix}_{field}"][index]) for field in LEG_FIELDS}
+
+
+def main():
+    from nsepython import nse_optionchain_scrapper
+
+    for symbol in sys.argv[1:] or ["NIFTY"]:
+        payload = nse_optionchain_scrapper(symbol)
+        started = time.perf_counter()
+        snap = OptionChainSnapshot.from_payload(payload, symbol)
+        built = time.perf_counter() - started
+
+        print(f"\n{symbol}: spot {snap.spot:,.2f}, {len(snap)} rows, {len(snap.expiries)} expiries "
+              f"(built in {built * 1000:.1f} ms)")
+        index = snap.atm_index()
+        if index is not None:
+            print(f"  ATM {snap.strike[index]:g} ({snap.expiry[index]}): "
+                  f"CE OI {snap.ce_oi[index]:,.0f}, PE OI {snap.pe_oi[index]:,.0f}")
+        pcr = snap.pcr()
+        print(f"  PCR (OI): {pcr:.2f} - {sentiment(pcr)}")
+        for expiry, value in list(zip(snap.expiries, snap.pcr_by_expiry()))[:5]:
+            print(f"    {expiry}: {value:.2f}")
+
+
+if __name__ == "__main__":
+    main()
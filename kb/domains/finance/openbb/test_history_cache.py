@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test the history_cache loader offline, with an injected fetch function
+
+No OpenBB install or network access is needed: the fake provider makes up a
+bar per calendar day and records every range it was asked for.
+"""
+
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from threading import Lock
+
+from history_cache import HistoryCache, load_history
+
+
+class FakeProvider:
+    """fetch() stand-in: one bar per day, every call and peak concurrency recorded."""
+
+    def __init__(self, delay=0.0, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = Lock()
+
+    def __call__(self, key, start, end):
+        with self.lock:
+            self.calls.append((key.symbol, start, end))
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if key.symbol in self.fail:
+                raise ConnectionError(f"no data for {key.symbol}")
+            days = (end - start).days + 1
+            return [{"date": (start + timedelta(days=i)).isoformat(), "close": 100.0 + i} for i in range(days)]
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+today = date.today()
+year_ago = today - timedelta(days=365)
+failures = 0
+
+
+def check(condition, message):
+    global failures
+    if condition:
+        print(f"✅ SUCCESS: {message}")
+    else:
+        failures += 1
+        print(f"❌ FAILED: {message}")
+
+
+print("=" * 80)
+print("history_cache Test - injected fetch, no live API")
+print("=" * 80)
+
+with tempfile.TemporaryDirectory() as tmp:
+    cache = HistoryCache(tmp)
+
+    # Test 1: Cold cache
+    print("\n[Test 1] A year of RELIANCE.NS into an empty cache...")
+    provider = FakeProvider()
+    batch = load_history(["RELIANCE.NS"], start=year_ago, cache=cache, fetch=provider, as_frame=False)
+    bars = batch.data["RELIANCE.NS"]
+    check(provider.calls == [("RELIANCE.NS", year_ago, today)], f"one request for the whole year: {provider.calls}")
+    check(len(bars) == 366 and bars[0]["date"] == year_ago.isoformat() and bars[-1]["date"] == today.isoformat(),
+          f"{len(bars)} bars, {bars[0]['date']} .. {bars[-1]['date']}")
+
+    # Test 2: Rerun
+    print("\n[Test 2] Same request again...")
+    provider = FakeProvider()
+    batch = load_history(["RELIANCE.NS"], start=year_ago, cache=cache, fetch=provider, as_frame=False)
+    check(provider.calls == [("RELIANCE.NS", today, today)], f"only today is fetched again: {provider.calls}")
+    check(len(batch.data["RELIANCE.NS"]) == 366, "still one bar per day after the re-fetch")
+
+    # Test 3: Extending the range back
+    print("\n[Test 3] Two years instead of one...")
+    two_years_ago = today - timedelta(days=730)
+    provider = FakeProvider()
+    batch = load_history(["RELIANCE.NS"], start=two_years_ago, cache=cache, fetch=provider, as_frame=False)
+    expected = [("RELIANCE.NS", two_years_ago, year_ago - timedelta(days=1)), ("RELIANCE.NS", today, today)]
+    check(provider.calls == expected, f"only the older gap and today are fetched: {provider.calls}")
+    check(len(batch.data["RELIANCE.NS"]) == 731, f"{len(batch.data['RELIANCE.NS'])} bars over two years")
+
+    # Test 4: Bounded parallelism
+    print("\n[Test 4] 20 symbols with max_workers=4...")
+    symbols = [f"SYM{i}.NS" for i in range(20)]
+    provider = FakeProvider(delay=0.05)
+    batch = load_history(symbols, start=today - timedelta(days=30), cache=cache, fetch=provider,
+                         max_workers=4, as_frame=False)
+    check(provider.peak == 4, f"at most 4 fetches in flight (peak {provider.peak})")
+    check(batch.requests == 20 and not batch.failed, f"{batch.requests} requests, {len(batch.failed)} failed")
+
+    # Test 5: A failing symbol
+    print("\n[Test 5] One symbol fails...")
+    provider = FakeProvider(fail=["BROKEN.NS"])
+    batch = load_history(["TCS.NS", "BROKEN.NS"], start=today - timedelta(days=30), cache=cache,
+                         fetch=provider, as_frame=False)
+    check(list(batch.failed) == ["BROKEN.NS"] and "ConnectionError" in batch.failed["BROKEN.NS"],
+          f"failure reported: {batch.failed}")
+    check(len(batch.data.get("TCS.NS", [])) == 31 and "BROKEN.NS" not in batch.data,
+          "the rest of the batch is unaffected")
+
+print("\n" + "=" * 80)
+print(f"{failures} failed checks" if failures else "All checks passed")
+print("=" * 80)
+sys.exit(1 if failures else 0)
@@ -7,6 +7,8 @@ from openbb import obb
 import json
 from datetime import datetime, timedelta
 
+from history_cache import load_history
+
 print("=" * 80)
 print("OpenBB API Test - Indian Stock Market")
 print("=" * 80)
@@ -71,32 +73,28 @@ try:
 except Exception as e:
     print(f"❌ FAILED: {e}")
 
-# Test 5: Multiple stocks at once
+# Test 5: Multiple stocks at once (fetched concurrently, kept in the local cache)
 print("\n[Test 5] Fetching multiple Indian stocks...")
 try:
     symbols = ["RELIANCE.NS", "TCS.NS", "HDFCBANK.NS"]
+    batch = load_history(symbols, start=datetime.now() - timedelta(days=7), provider="yfinance")
     for symbol in symbols:
-        result = obb.equity.price.historical(
-            symbol=symbol,
-            start_date=(datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d"),
-            provider="yfinance"
-        )
-        df = result.to_df()
+        if symbol in batch.failed:
+            raise RuntimeError(f"{symbol}: {batch.failed[symbol]}")
+        df = batch.data[symbol]
         print(f"   {symbol}: ₹{df['close'].iloc[-1]:.2f} ({len(df)} days)")
-    print("✅ SUCCESS: Multi-stock fetch working")
+    print(f"✅ SUCCESS: Multi-stock fetch working ({batch.requests} requests, rest from cache)")
 except Exception as e:
     print(f"❌ FAILED: {e}")
 
 # Test 6: Test data availability
 print("\n[Test 6] Testing data range and availability...")
 try:
-    # Try 1 year of data
-    result = obb.equity.price.historical(
-        symbol="RELIANCE.NS",
-        start_date=(datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d"),
-        provider="yfinance"
-    )
-    df = result.to_df()
+    # Try 1 year of data; the last week is already cached by Test 5
+    batch = load_history(["RELIANCE.NS"], start=datetime.now() - timedelta(days=365), provider="yfinance")
+    if batch.failed:
+        raise RuntimeError(batch.failed["RELIANCE.NS"])
+    df = batch.data["RELIANCE.NS"]
     print(f"✅ SUCCESS: Got {len(df)} days of historical data (1 year)")
     print(f"   Date range: {df.index[0]} to {df.index[-1]}")
     print(f"   Columns available: {list(df.columns)}")
@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+Benchmark fetch-docs.py against a local mock documentation site.
+
+Starts an HTTP server (in a child process) that serves a sitemap and N
+markdown pages with configurable size, latency, error rate and ETag/304
+support, then runs these scenarios with each engine:
+
+- cold:      empty output directory, every page is fetched
+- warm:      a fraction of the pages changed since the last sync
+- no-change: nothing changed; known pages are revalidated, and nothing on
+             disk may be written (no changed files, no temp files left over)
+- check:     check_updates() (--check) with nothing changed
+- throttle:  nothing changed, but the site answers --throttle page requests
+             with a 429 and Retry-After; the host limiter must halve its
+             concurrency limit and no request may reach the site during the
+             pause
+
+Each scenario runs in a fresh process, so peak RSS and CPU time are its own.
+check_updates() always uses the thread pool; its rows differ by engine only
+in which sync produced the manifest.
+Results (throughput, seconds, CPU time, peak RSS, request counts) can be
+written as JSON and compared with an earlier run. No network access is needed.
+The exit status is 1 if a scenario's checks fail.
+
+Usage:
+    python bench-fetch-docs.py --pages 500 --latency 0.05
+    python bench-fetch-docs.py --output before.json
+    python bench-fetch-docs.py --output after.json --compare before.json
+    python bench-fetch-docs.py --compare before.json after.json
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+SCENARIOS = ("cold", "warm", "no-change", "check", "throttle")
+
+# Server-side counters, indexes into MockDocSite.counters
+COUNTERS = ("requests", "get", "head", "ok", "not_modified", "throttled", "errors", "bytes")
+
+# Share of Retry-After the site must see without requests: requests already
+# in flight when the 429 went out may still arrive just after it
+PAUSE_TOLERANCE = 0.9
+
+# Result fields compared by --compare: (field, higher_is_better)
+COMPARED = (
+    ("docs_per_second", True),
+    ("seconds", False),
+    ("cpu_seconds", False),
+    ("peak_rss_mb", False),
+    ("server_requests", False),
+)
+
+
+def load_fetch_docs():
+    """Import fetch-docs.py as a module (its file name is not importable)."""
+    path = Path(__file__).parent / "fetch-docs.py"
+    spec = importlib.util.spec_from_file_location("fetch_docs", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # the default backlog of 5 drops bursts of connects
+
+
+class MockDocSite:
+    """Mock documentation site serving /sitemap.xml and /docs/en/<page>.md.
+    
+    The server runs in a child process so its handler threads do not compete
+    with the fetcher under test for the GIL. Pages carry an ETag and answer
+    If-None-Match with 304 unless etag=False; HEAD is supported. A fraction
+    error_rate of page requests fails with a 500. Calling bump() changes the
+    first change_rate of the pages, as if the site had been edited. After
+    start_throttling(), the next throttle page requests are answered with a
+    429 and a Retry-After of retry_after seconds; throttle_report() then gives
+    the longest stretch without any request since the first 429.
+    """
+    
+    def __init__(self, pages: int = 200, page_size: int = 8192, latency: float = 0.0,
+                 error_rate: float = 0.0, etag: bool = True, change_rate: float = 0.1,
+                 seed: int = 0, throttle: int = 1, retry_after: int = 1):
+        self.page_count = pages
+        self.page_size = page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.etag = etag
+        self.changed_pages = round(pages * change_rate)
+        self.seed = seed
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.generation = multiprocessing.Value("i", 0)
+        self.counters = multiprocessing.Array("q", len(COUNTERS))
+        self.throttle_left = multiprocessing.Value("i", 0)
+        # first 429, last request arrival, longest gap between arrivals since the first 429
+        self.timing = multiprocessing.Array("d", 3)
+        self.process = None
+        self.base_url = None
+    
+    def bump(self):
+        """Edit the changing pages: their content and ETag differ from now on."""
+        with self.generation.get_lock():
+            self.generation.value += 1
+    
+    def start_throttling(self):
+        """Answer the next throttle page requests with a 429."""
+        with self.timing.get_lock():
+            self.timing[:] = [0.0, 0.0, 0.0]
+        with self.throttle_left.get_lock():
+            self.throttle_left.value = self.throttle
+    
+    def take_throttle(self) -> bool:
+        """Whether this page request is one of the throttled ones."""
+        with self.throttle_left.get_lock():
+            if self.throttle_left.value <= 0:
+                return False
+            self.throttle_left.value -= 1
+        with self.timing.get_lock():
+            now = time.monotonic()
+            if not self.timing[0]:
+                self.timing[0] = now
+            self.timing[1] = now
+        return True
+    
+    def note_arrival(self):
+        with self.timing.get_lock():
+            if self.timing[0]:
+                now = time.monotonic()
+                self.timing[2] = max(self.timing[2], now - self.timing[1])
+                self.timing[1] = now
+    
+    def throttle_report(self) -> dict:
+        """Server view of the last throttling: seconds without requests after the first 429."""
+        with self.timing.get_lock():
+            return {"longest_gap": round(self.timing[2], 3)}
+    
+    def snapshot(self) -> dict:
+        """Current server-side counters."""
+        with self.counters.get_lock():
+            return dict(zip(COUNTERS, self.counters[:]))
+    
+    def serve(self, port_queue):
+        """Child process entry point: serve until killed."""
+        server = MockHTTPServer(("127.0.0.1", 0), self.handler())
+        self.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        server.RequestHandlerClass.sitemap = self.sitemap().encode()
+        port_queue.put(server.server_address[1])
+        server.serve_forever()
+    
+    def page(self, index: int) -> bytes:
+        revision = self.generation.value if index < self.changed_pages else 0
+        header = f"# Page {index}\n\nRevision {revision}\n\n"
+        return (header + "x" * max(0, self.page_size - len(header))).encode()
+    
+    def handler(self):
+        site = self
+        rng = random.Random(self.seed)
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            sitemap = b""
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+            
+            def log_message(self, *args):
+                pass
+            
+            def count(self, **deltas):
+                with site.counters.get_lock():
+                    for name, delta in deltas.items():
+                        site.counters[COUNTERS.index(name)] += delta
+            
+            def send_body(self, code: int, body: bytes = b"", headers: dict = None):
+                self.send_response(code)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+                    self.count(bytes=len(body))
+                if code == 200:
+                    self.count(ok=1)
+                elif code == 304:
+                    self.count(not_modified=1)
+                elif code == 429:
+                    self.count(throttled=1)
+                elif code >= 500:
+                    self.count(errors=1)
+            
+            def do_HEAD(self):
+                self.do_GET()
+            
+            def do_GET(self):
+                self.count(requests=1, **{self.command.lower(): 1})
+                site.note_arrival()
+                if site.latency:
+                    time.sleep(site.latency)
+                if self.path == "/sitemap.xml":
+                    return self.send_body(200, self.sitemap)
+                
+                name = self.path[len("/docs/en/"):-len(".md")] if self.path.endswith(".md") else ""
+                index = int(name[len("page-"):]) if name.startswith("page-") and name[5:].isdigit() else -1
+                if not 0 <= index < site.page_count:
+                    return self.send_body(404)
+                if site.take_throttle():
+                    return self.send_body(429, headers={"Retry-After": str(site.retry_after)})
+                if site.error_rate and rng.random() < site.error_rate:
+                    return self.send_body(500)
+                
+                body = site.page(index)
+                if not site.etag:
+                    return self.send_body(200, body)
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self.send_body(304, headers={"ETag": etag})
+                self.send_body(200, body, {"ETag": etag})
+        
+        return Handler
+    
+    def sitemap(self) -> str:
+        urls = "".join(f"<url><loc>{self.base_url}/docs/en/page-{i}</loc></url>"
+                       for i in range(self.page_count))
+        return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+    
+    def __enter__(self):
+        port_queue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=self.serve, args=(port_queue,), daemon=True)
+        self.process.start()
+        self.base_url = f"http://127.0.0.1:{port_queue.get(timeout=10)}"
+        return self
+    
+    def __exit__(self, *args):
+        self.process.terminate()
+        self.process.join()
+
+
+def write_config(site: MockDocSite, tmp: Path, engine: str, max_workers: int, concurrency: int) -> Path:
+    """Write a one-source docs-config.json pointing at the mock site."""
+    config_path = tmp / "docs-config.json"
+    config_path.write_text(json.dumps({"sources": [{
+        "name": "bench",
+        "sitemap": f"{site.base_url}/sitemap.xml",
+        "url_pattern": "/docs/en/",
+        "output_dir": str(tmp / "out"),
+        "manifest_file": str(tmp / "manifest.json"),
+        "engine": engine,
+        "max_workers": max_workers,
+        "concurrency": concurrency
+    }]}))
+    return config_path
+
+
+def scenario_worker(config_path: str, scenario: str, max_workers: int, concurrency: int, results):
+    """Child process entry point: run one scenario and report its own resource use."""
+    fetch_docs = load_fetch_docs()
+    fetcher = fetch_docs.DocumentationFetcher(
+        config_file=config_path, max_workers=max_workers, concurrency=concurrency
+    )
+    throttles = []
+    if scenario == "throttle":
+        record_throttles(fetcher.get_limiter(fetcher.config["sources"][0]["sitemap"]), throttles)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if scenario == "check":
+            updates = fetcher.check_updates("bench")["bench"]
+            stats = {key: len(value) for key, value in updates.items() if isinstance(value, list)}
+            documents = sum(updates["checks"].values())
+        else:
+            stats = fetcher.process_source(fetcher.config["sources"][0], disable_progress=True)
+            documents = stats["updated"] + stats["unchanged"] + stats["failed"]
+    elapsed = time.perf_counter() - start
+    end_usage = resource.getrusage(resource.RUSAGE_SELF)
+    
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    totals = fetcher.metrics.report()["totals"]
+    results.put({
+        "stats": stats,
+        "documents": documents,
+        "seconds": elapsed,
+        "cpu_seconds": (end_usage.ru_utime - usage.ru_utime) + (end_usage.ru_stime - usage.ru_stime),
+        "peak_rss_mb": end_usage.ru_maxrss * rss_unit / (1024 * 1024),
+        "client": {key: totals[key] for key in ("requests", "bytes", "retries", "failures")},
+        "throttles": throttles,
+    })
+
+
+def record_throttles(limiter, throttles: list):
+    """Log the limit before and after, and the pause, of every throttle() on limiter."""
+    throttle = limiter.throttle
+    
+    def recorded(retry_after=None):
+        limit = limiter.limit
+        pause = throttle(retry_after)
+        throttles.append({"limit_before": limit, "limit_after": limiter.limit,
+                          "min_concurrency": limiter.min_concurrency, "pause": round(pause, 3)})
+        return pause
+    
+    limiter.throttle = recorded
+
+
+def check_throttling(site: MockDocSite, server: dict, throttles: list) -> list:
+    """Problems with how a throttled run backed off the site."""
+    problems = []
+    if server["throttled"] != site.throttle:
+        problems.append(f"site sent {server['throttled']} of {site.throttle} 429s")
+    if len(throttles) != server["throttled"]:
+        problems.append(f"limiter saw {len(throttles)} of {server['throttled']} 429s")
+    for event in throttles:
+        expected = max(event["min_concurrency"], event["limit_before"] / 2)
+        if event["limit_after"] != expected:
+            problems.append(f"limit went {event['limit_before']:g} -> {event['limit_after']:g}, not {expected:g}")
+    gap = site.throttle_report()["longest_gap"]
+    if throttles and gap < site.retry_after * PAUSE_TOLERANCE:
+        problems.append(f"site was idle for {gap:.3f}s at most, Retry-After was {site.retry_after}s")
+    return problems
+
+
+def disk_state(root: Path) -> dict:
+    """(mtime, inode, size) of every file under root, by relative path."""
+    state = {}
+    for path in root.rglob("*"):
+        if path.is_file():
+            stat = path.stat()
+            state[str(path.relative_to(root))] = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+    return state
+
+
+def check_no_writes(before: dict, after: dict) -> list:
+    """Problems with a run that should have left the disk untouched."""
+    problems = [f"left temp file {name}" for name in sorted(after) if name.endswith(".tmp")]
+    written = sorted(name for name in before.keys() | after.keys()
+                     if before.get(name) != after.get(name) and not name.endswith(".tmp"))
+    if written:
+        problems.append(f"wrote {len(written)} files: {', '.join(written[:5])}")
+    return problems
+
+
+def run_scenario(site: MockDocSite, config_path: Path, scenario: str, engine: str,
+                 max_workers: int, concurrency: int) -> dict:
+    """Run one scenario in a fresh process and combine its report with server counters."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    files_before = disk_state(config_path.parent)
+    before = site.snapshot()
+    process = context.Process(target=scenario_worker,
+                              args=(str(config_path), scenario, max_workers, concurrency, results))
+    process.start()
+    result = results.get()
+    process.join()
+    after = site.snapshot()
+    files_after = disk_state(config_path.parent)
+    
+    failed_checks = []
+    server = {name: after[name] - before[name] for name in COUNTERS}
+    if scenario == "no-change":
+        # Every page is a 304 (or identical), so there is nothing to write
+        failed_checks = check_no_writes(files_before, files_after)
+    elif scenario == "throttle":
+        failed_checks = check_throttling(site, server, result["throttles"])
+        result["pause"] = site.throttle_report()["longest_gap"]
+    
+    return {
+        "scenario": scenario,
+        "engine": engine,
+        **result,
+        "docs_per_second": result["documents"] / result["seconds"] if result["seconds"] else 0.0,
+        "server_requests": server["requests"],
+        "server": server,
+        "failed_checks": failed_checks,
+    }
+
+
+def run_suite(args, fetch_docs) -> list:
+    """Run every requested scenario with every engine, args.repeat times each."""
+    runs = []
+    for engine in args.engines.split(","):
+        if engine == "async" and not fetch_docs.AIOHTTP_AVAILABLE:
+            print("Skipping async engine: aiohttp not installed (pip install aiohttp)", file=sys.stderr)
+            continue
+        for repeat in range(args.repeat):
+            site = MockDocSite(args.pages, args.page_size, args.latency, args.error_rate,
+                               not args.no_etag, args.change_rate, args.seed + repeat,
+                               args.throttle, args.retry_after)
+            with site, tempfile.TemporaryDirectory() as tmp:
+                config_path = write_config(site, Path(tmp), engine, args.max_workers, args.concurrency)
+                for scenario in SCENARIOS:
+                    if scenario == "warm":
+                        site.bump()
+                    elif scenario == "throttle":
+                        site.start_throttling()
+                    # Scenarios build on each other's state, so earlier ones always run
+                    result = run_scenario(site, config_path, scenario, engine,
+                                          args.max_workers, args.concurrency)
+                    if scenario in args.scenarios:
+                        runs.append(result)
+                        print(f"  {engine:<7} {scenario:<10} {result['seconds']:8.3f}s "
+                              f"{result['docs_per_second']:10.1f} docs/s", file=sys.stderr)
+                        for event in result["throttles"]:
+                            print(f"  {engine:<7} {scenario:<10} 429: limit {event['limit_before']:g} -> "
+                                  f"{event['limit_after']:g}, paused {event['pause']:.3f}s", file=sys.stderr)
+                        if "pause" in result:
+                            print(f"  {engine:<7} {scenario:<10} site idle for {result['pause']:.3f}s after the first 429",
+                                  file=sys.stderr)
+                        for problem in result["failed_checks"]:
+                            print(f"  {engine:<7} {scenario:<10} FAILED: {problem}", file=sys.stderr)
+    return aggregate(runs)
+
+
+def aggregate(runs: list) -> list:
+    """Collapse repeated runs of a (scenario, engine) pair into medians."""
+    groups = {}
+    for run in runs:
+        groups.setdefault((run["scenario"], run["engine"]), []).append(run)
+    
+    results = []
+    for (scenario, engine), group in groups.items():
+        result = dict(group[0])
+        for field in ("seconds", "cpu_seconds", "peak_rss_mb", "docs_per_second", "server_requests"):
+            result[field] = round(statistics.median(run[field] for run in group), 4)
+        result["repeats"] = len(group)
+        result["failed_checks"] = sorted({problem for run in group for problem in run["failed_checks"]})
+        results.append(result)
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: list):
+    print("\n" + "=" * 78)
+    print(f"{'Scenario':<11}{'Engine':<8}{'Docs':>6}{'Seconds':>9}{'Docs/s':>9}"
+          f"{'CPU s':>8}{'RSS MB':>8}{'Requests':>9}{'304s':>6}{'Failed':>7}")
+    for r in results:
+        print(f"{r['scenario']:<11}{r['engine']:<8}{r['documents']:>6}{r['seconds']:>9.3f}"
+              f"{r['docs_per_second']:>9.1f}{r['cpu_seconds']:>8.2f}{r['peak_rss_mb']:>8.1f}"
+              f"{r['server_requests']:>9.0f}{r['server']['not_modified']:>6}{r['stats'].get('failed', 0):>7}")
+    failed = [(r, problem) for r in results for problem in r["failed_checks"]]
+    if failed:
+        print(f"\n{len(failed)} failed checks:")
+        for r, problem in failed:
+            print(f"  {r['scenario']} ({r['engine']}): {problem}")
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    """Print per-metric changes between two reports; return the number of regressions."""
+    def key(result):
+        return result["scenario"], result["engine"]
+    
+    base_results = {key(r): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nComparing {baseline['meta']['revision']} -> {current['meta']['revision']} "
+          f"(regression threshold {threshold:.0%})")
+    params = [{k: v for k, v in report["meta"]["params"].items() if k != "repeat"}
+              for report in (baseline, current)]
+    if params[0] != params[1]:
+        print("Warning: the runs used different parameters; numbers may not be comparable")
+    print(f"{'Scenario':<11}{'Engine':<8}{'Metric':<17}{'Before':>11}{'After':>11}{'Change':>9}")
+    for result in current["results"]:
+        base = base_results.get(key(result))
+        if base is None:
+            continue
+        for field, higher_is_better in COMPARED:
+            before, after = base[field], result[field]
+            change = (after - before) / before if before else 0.0
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            elif worse < -threshold:
+                flag = "  improved"
+            print(f"{result['scenario']:<11}{result['engine']:<8}{field:<17}"
+                  f"{before:>11.3f}{after:>11.3f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fetch-docs.py against a local mock site")
+    parser.add_argument("--pages", type=int, default=200, help="Number of mock pages (default: 200)")
+    parser.add_argument("--page-size", type=int, default=8192, help="Bytes per page (default: 8192)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Per-request server latency in seconds (default: 0.02)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of page requests answered with a 500 (default: 0)")
+    parser.add_argument("--no-etag", action="store_true", help="Serve pages without ETags, so nothing is ever a 304")
+    parser.add_argument("--change-rate", type=float, default=0.1, help="Fraction of pages changed for the warm scenario (default: 0.1)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the error pattern (default: 0)")
+    parser.add_argument("--throttle", type=int, default=1, help="Page requests answered with a 429 in the throttle scenario (default: 1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with each 429 (default: 1)")
+    parser.add_argument("--max-workers", type=int, default=5, help="Threads for the thread engine (default: 5)")
+    parser.add_argument("--concurrency", type=int, default=100, help="In-flight requests for the async engine (default: 100)")
+    parser.add_argument("--engines", default="thread,async", help="Comma-separated engines to run (default: thread,async)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated scenarios to report (default: {','.join(SCENARIOS)})")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; medians are reported (default: 1)")
+    parser.add_argument("--output", "-o", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", nargs="+", metavar="JSON", help="Baseline results to compare against; with two files, compare them without running")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change counted as a regression (default: 0.1)")
+    args = parser.parse_args()
+    
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes a baseline file, or a baseline and a current file")
+    if args.compare and len(args.compare) == 2:
+        reports = [json.loads(Path(path).read_text()) for path in args.compare]
+        sys.exit(1 if compare(*reports, args.threshold) else 0)
+    
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    args.scenarios = args.scenarios.split(",")
+    
+    fetch_docs = load_fetch_docs()
+    results = run_suite(args, fetch_docs)
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {name: getattr(args, name) for name in (
+                "pages", "page_size", "latency", "error_rate", "no_etag", "change_rate",
+                "seed", "throttle", "retry_after", "max_workers", "concurrency", "repeat")},
+        },
+        "results": results,
+    }
+    print_results(results)
+    
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nResults written to {args.output}")
+    failed = any(r["failed_checks"] for r in results)
+    if args.compare:
+        baseline = json.loads(Path(args.compare[0]).read_text())
+        failed = compare(baseline, report, args.threshold) or failed
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Regenerate the computed parts of PROJECT_INDEX.json from the tree.
+
+Hand-written parts of the index (descriptions, categories, tips) are kept;
+everything that can be derived from the files is recomputed:
+- File lists per directory: new files are added (described by their title or
+  docstring), deleted files are dropped, new directories get an entry
+- File counts, including the counts quoted in description strings
+- file_metadata: title, line count, content hash and H2 headings per
+  markdown file
+
+Per-file metadata is cached in .project-index-cache.json keyed by mtime,
+size and content hash, so a rebuild after a sync only reparses the files
+that changed. The index is rewritten only when its content changes.
+fetch-docs.py runs this after every sync.
+
+Usage:
+    python build-project-index.py           # update PROJECT_INDEX.json
+    python build-project-index.py --check   # exit 1 if it is out of date
+"""
+
+import argparse
+import ast
+import copy
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from markdown_sections import HeadingScanner
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+INDEX_FILE = "PROJECT_INDEX.json"
+CACHE_FILE = ".project-index-cache.json"
+CACHE_VERSION = 1
+
+CLAUDE_CODE_DIR = "tools/claude-code/"
+MAX_HEADINGS = 10
+MAX_LINE = 160
+
+# Counts quoted inside hand-written strings: (key path, pattern, count name)
+COUNT_PATTERNS = (
+    (("structure", "directories", CLAUDE_CODE_DIR, "curated_guides", "key_files", "README.md"),
+     r"\b\d+ official docs\b", "{official} official docs"),
+    (("navigation_tips", "official_docs"), r"- \d+ files\b", "- {official} files"),
+    (("navigation_tips", "curated_insights"), r"^\d+ files\b", "{curated} files"),
+)
+
+FILE_TYPES = {".py": "Python script", ".json": "JSON file", ".txt": "Text file", ".md": "Markdown document"}
+
+
+def markdown_metadata(text: str) -> dict:
+    """Title (first H1, else first heading), H2 headings and line count."""
+    title = None
+    first_heading = None
+    headings = []
+    scanner = HeadingScanner()
+    lines = text.splitlines()
+    for line in lines:
+        match = scanner.scan(line)
+        if not match:
+            continue
+        level, heading = len(match.group(1)), match.group(2).strip()
+        first_heading = first_heading or heading
+        if level == 1 and title is None:
+            title = heading
+        elif level == 2:
+            headings.append(heading)
+    return {"title": title or first_heading, "headings": headings, "lines": len(lines)}
+
+
+def python_metadata(text: str) -> dict:
+    """First line of the module docstring as the title, plus line count."""
+    try:
+        docstring = ast.get_docstring(ast.parse(text)) or ""
+    except SyntaxError:
+        docstring = ""
+    first_line = next((line.strip() for line in docstring.splitlines() if line.strip()), None)
+    return {"title": first_line and first_line.rstrip("."), "headings": [], "lines": len(text.splitlines())}
+
+
+def file_metadata(path: Path) -> dict:
+    data = path.read_bytes()
+    text = data.decode("utf-8", errors="replace")
+    if path.suffix == ".md":
+        meta = markdown_metadata(text)
+    elif path.suffix == ".py":
+        meta = python_metadata(text)
+    else:
+        meta = {"title": None, "headings": [], "lines": len(text.splitlines())}
+    meta["sha256"] = hashlib.sha256(data).hexdigest()
+    return meta
+
+
+class MetadataCache:
+    """Per-file metadata keyed by path, reused while mtime/size or hash match."""
+    
+    def __init__(self, repo_root: Path):
+        self.path = repo_root / CACHE_FILE
+        self.entries: Dict[str, dict] = {}
+        self.parsed = 0
+        self.dirty = False
+        try:
+            cache = json.loads(self.path.read_text())
+            if cache.get("version") == CACHE_VERSION:
+                self.entries = cache["files"]
+        except (OSError, ValueError):
+            pass
+    
+    def get(self, rel: str, path: Path) -> dict:
+        stat = path.stat()
+        entry = self.entries.get(rel)
+        if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry
+        
+        data = path.read_bytes()
+        content_hash = hashlib.sha256(data).hexdigest()
+        if not entry or entry["sha256"] != content_hash:
+            entry = file_metadata(path)
+            self.parsed += 1
+        entry = {**entry, "mtime": stat.st_mtime_ns, "size": stat.st_size}
+        self.entries[rel] = entry
+        self.dirty = True
+        return entry
+    
+    def save(self, live: set):
+        stale = set(self.entries) - live
+        for rel in stale:
+            del self.entries[rel]
+        if not (self.dirty or stale):
+            return
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps({"version": CACHE_VERSION, "files": self.entries}, separators=(",", ":")))
+        os.replace(tmp_path, self.path)
+
+
+def list_files(repo_root: Path) -> List[str]:
+    """Tracked and untracked-but-not-ignored files, without hidden paths."""
+    try:
+        output = subprocess.run(
+            ["git", "ls-files", "--cached", "--others", "--exclude-standard", "-z"],
+            cwd=repo_root, capture_output=True, check=True
+        ).stdout.decode()
+        files = [rel for rel in output.split("\0") if rel]
+    except (OSError, subprocess.CalledProcessError):
+        files = [path.relative_to(repo_root).as_posix() for path in repo_root.rglob("*") if path.is_file()]
+    return sorted(rel for rel in files
+                  if not any(part.startswith(".") for part in rel.split("/"))
+                  and (repo_root / rel).is_file())
+
+
+def describe(rel: str, meta: dict) -> str:
+    return meta.get("title") or FILE_TYPES.get(Path(rel).suffix, "File")
+
+
+def sync_files(existing: dict, names: List[str], directory: str, metadata: Dict[str, dict]) -> dict:
+    """Keep descriptions of files still present, add new ones, drop deleted ones."""
+    synced = {name: description for name, description in existing.items() if name in names}
+    for name in names:
+        if name not in synced:
+            synced[name] = describe(directory + name, metadata[directory + name])
+    return synced
+
+
+def directory_files(files: List[str], directory: str) -> List[str]:
+    """Names of the files directly inside directory ("" for the repo root)."""
+    names = []
+    for rel in files:
+        if rel.startswith(directory):
+            name = rel[len(directory):]
+            if "/" not in name:
+                names.append(name)
+    return names
+
+
+def update_claude_code(entry: dict, files: List[str], metadata: Dict[str, dict]) -> Dict[str, int]:
+    """Refresh the tools/claude-code/ entry; returns the counts quoted elsewhere."""
+    base = CLAUDE_CODE_DIR
+    subtree = [rel for rel in files if rel.startswith(base)]
+    entry["total_files"] = len(subtree)
+    entry["subdirectories"] = sorted({rel[len(base):].split("/")[0] + "/" for rel in subtree
+                                      if "/" in rel[len(base):]})
+    
+    curated = entry.setdefault("curated_guides", {})
+    guides = [name for name in directory_files(files, base) if name.endswith(".md")]
+    curated["key_files"] = sync_files(curated.get("key_files", {}), guides, base, metadata)
+    curated["count"] = len(curated["key_files"])
+    
+    official = entry.setdefault("official_docs", {})
+    gen_dir = base + official.get("location", "gen/")
+    docs = [name for name in directory_files(files, gen_dir) if name.endswith(".md")]
+    official["count"] = len(docs)
+    categories = official.setdefault("categories", {})
+    categories.pop("uncategorized", None)
+    for category, names in categories.items():
+        categories[category] = [name for name in names if name in docs]
+    placed = {name for names in categories.values() for name in names}
+    uncategorized = [name for name in docs if name not in placed]
+    if uncategorized:
+        categories["uncategorized"] = uncategorized
+    
+    if "frameworks" in entry:
+        entry["frameworks"] = sync_files(entry["frameworks"], directory_files(files, base + "frameworks/"),
+                                         base + "frameworks/", metadata)
+    return {"official": official["count"], "curated": curated["count"]}
+
+
+def update_quoted_counts(index: dict, counts: Dict[str, int]):
+    for path, pattern, template in COUNT_PATTERNS:
+        parent = index
+        for key in path[:-1]:
+            parent = parent.get(key, {}) if isinstance(parent, dict) else {}
+        value = parent.get(path[-1]) if isinstance(parent, dict) else None
+        if isinstance(value, str):
+            parent[path[-1]] = re.sub(pattern, template.format(**counts), value)
+
+
+def build_index(existing: dict, files: List[str], metadata: Dict[str, dict]) -> dict:
+    """Return a copy of existing with every derivable part recomputed."""
+    index = copy.deepcopy(existing)
+    structure = index.setdefault("structure", {})
+    
+    root_names = directory_files(files, "")
+    structure["root_files"] = sync_files(structure.get("root_files", {}), root_names, "", metadata)
+    
+    directories = structure.setdefault("directories", {})
+    counts = {"official": 0, "curated": 0}
+    for directory, entry in directories.items():
+        if directory == CLAUDE_CODE_DIR:
+            counts = update_claude_code(entry, files, metadata)
+        elif "files" in entry:
+            entry["files"] = sync_files(entry["files"], directory_files(files, directory), directory, metadata)
+    
+    # Directories with files that no entry covers yet
+    uncovered = {rel.rsplit("/", 1)[0] + "/" for rel in files if "/" in rel} - set(directories)
+    for directory in sorted(uncovered):
+        if directory.startswith(CLAUDE_CODE_DIR):
+            continue
+        names = directory_files(files, directory)
+        landing = next((directory + name for name in ("INDEX.md", "README.md") if name in names), None)
+        directories[directory] = {
+            "description": (landing and metadata[landing].get("title")) or directory.rstrip("/").split("/")[-1],
+            "files": sync_files({}, names, directory, metadata),
+        }
+    # Drop entries of directories that no longer hold any files
+    for directory in [d for d in directories if d != CLAUDE_CODE_DIR and "files" in directories[d]]:
+        if not directories[directory]["files"]:
+            del directories[directory]
+    
+    update_quoted_counts(index, counts)
+    
+    index["file_metadata"] = {
+        rel: {
+            "title": metadata[rel].get("title"),
+            "lines": metadata[rel]["lines"],
+            "sha256": metadata[rel]["sha256"][:12],
+            "headings": metadata[rel]["headings"][:MAX_HEADINGS],
+        }
+        for rel in files if rel.endswith(".md")
+    }
+    return index
+
+
+def render(value, depth: int = 0, spaced: bool = False, indent: int = 0) -> str:
+    """JSON in the index's house style: two-space indent, short scalar lists
+    on one line, blank lines between top-level members and between the
+    nested objects of "structure"."""
+    pad = "  " * (depth + 1)
+    if isinstance(value, dict):
+        if not value:
+            return "{}"
+        parts = []
+        previous = None
+        for key, item in value.items():
+            if previous is not None:
+                if depth == 0:
+                    blank = isinstance(item, dict) or isinstance(previous, dict)
+                else:
+                    blank = spaced and isinstance(item, dict) and isinstance(previous, (dict, list))
+                if blank:
+                    parts.append("")
+            prefix = f"{pad}{json.dumps(key, ensure_ascii=False)}: "
+            child_spaced = spaced and depth < 3 or (depth == 0 and key == "structure")
+            parts.append(prefix + render(item, depth + 1, child_spaced, len(prefix)) + ",")
+            previous = item
+        lines = "\n".join(parts).rstrip(",")
+        return "{\n" + lines + "\n" + "  " * depth + "}"
+    if isinstance(value, list):
+        inline = "[" + ", ".join(json.dumps(item, ensure_ascii=False) for item in value) + "]"
+        if all(not isinstance(item, (dict, list)) for item in value) and indent + len(inline) <= MAX_LINE:
+            return inline
+        items = ",\n".join(pad + render(item, depth + 1) for item in value)
+        return "[\n" + items + "\n" + "  " * depth + "]"
+    return json.dumps(value, ensure_ascii=False)
+
+
+def update_project_index(repo_root: Path = REPO_ROOT, check: bool = False,
+                         verbose: bool = False) -> Tuple[bool, int]:
+    """Recompute PROJECT_INDEX.json; returns (changed, files reparsed).
+    
+    With check=True nothing is written.
+    """
+    index_path = repo_root / INDEX_FILE
+    existing = json.loads(index_path.read_text()) if index_path.exists() else {}
+    files = list_files(repo_root)
+    
+    cache = MetadataCache(repo_root)
+    metadata = {rel: cache.get(rel, repo_root / rel) for rel in files}
+    if not check:
+        cache.save(set(files))
+    
+    index = build_index(existing, files, metadata)
+    comparable = {key: value for key, value in existing.items() if key != "last_updated"}
+    changed = {key: value for key, value in index.items() if key != "last_updated"} != comparable
+    if changed and not check:
+        index["last_updated"] = date.today().isoformat()
+        tmp_path = index_path.with_name(index_path.name + ".tmp")
+        tmp_path.write_text(render(index) + "\n")
+        os.replace(tmp_path, index_path)
+    if verbose:
+        state = "out of date" if check and changed else "updated" if changed else "up to date"
+        print(f"{INDEX_FILE} {state} ({len(files)} files, {cache.parsed} reparsed)")
+    return changed, cache.parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the computed parts of PROJECT_INDEX.json")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if the index is out of date; write nothing")
+    parser.add_argument("--quiet", "-q", action="store_true", help="No output")
+    args = parser.parse_args()
+    
+    changed, _ = update_project_index(check=args.check, verbose=not args.quiet)
+    if args.check and changed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Check the cold-start cost of fetch-docs.py's quick commands.
+
+Hooks call fetch-docs.py many times a day, so commands that never touch the
+network must not pay for importing it. Each case below runs fetch-docs.py in
+a fresh interpreter with -X importtime and fails if:
+
+- a module from HEAVY_MODULES (requests, aiohttp, asyncio, tqdm, ...) was
+  imported; these load lazily on the code paths that need them
+- the script's own imports (everything the bare interpreter does not import
+  at startup) took longer than the budget, as a median over several runs
+
+The module check is exact; the budget is a timing guard with generous
+headroom, so a new eager import shows up before it becomes a habit.
+
+Usage:
+    python check-startup.py
+    python check-startup.py --budget-ms 30 --runs 9 --verbose
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+SCRIPT = Path(__file__).parent / "fetch-docs.py"
+
+# Modules a quick command must not import (submodules included)
+HEAVY_MODULES = (
+    "requests", "urllib3", "aiohttp", "asyncio", "ssl", "tqdm", "zstandard",
+    "xml.etree", "concurrent.futures", "sqlite3", "email.utils", "difflib",
+)
+
+DEFAULT_BUDGET_MS = 40.0
+DEFAULT_RUNS = 5
+
+
+def quick_cases(blob_dir: str) -> dict:
+    """Commands that should return without loading the network stack."""
+    return {
+        "help": ["--help"],
+        "usage-error": [],
+        "history": ["--source", "claude-code", "--blob-store", blob_dir, "--history", "overview"],
+    }
+
+
+def parse_importtime(stderr: str) -> list:
+    """Return (module, cumulative_us, top_level) for each -X importtime line."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        module = name.strip()
+        imports.append((module, int(cumulative), name[1:] == module))
+    return imports
+
+
+def run_importtime(args: list) -> tuple:
+    """Run python -X importtime with args; return (wall_ms, imports)."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", *args],
+                            capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    return wall_ms, parse_importtime(result.stderr)
+
+
+def heavy_imports(imports: list) -> list:
+    """The HEAVY_MODULES entries that were imported, directly or via a submodule."""
+    modules = {module for module, _, _ in imports}
+    return [heavy for heavy in HEAVY_MODULES
+            if any(module == heavy or module.startswith(heavy + ".") for module in modules)]
+
+
+def measure(args: list, baseline: set, runs: int) -> dict:
+    """Median wall and import time of a case, over runs fresh interpreters."""
+    walls, import_ms = [], []
+    for _ in range(runs):
+        wall_ms, imports = run_importtime([str(SCRIPT), *args])
+        top = [(module, us) for module, us, top_level in imports if top_level and module not in baseline]
+        walls.append(wall_ms)
+        import_ms.append(sum(us for _, us in top) / 1000)
+    return {
+        "wall_ms": statistics.median(walls),
+        "import_ms": statistics.median(import_ms),
+        "modules": len(imports),
+        "heavy": heavy_imports(imports),
+        "slowest": sorted(top, key=lambda item: -item[1])[:10],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check fetch-docs.py startup cost for quick commands")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Maximum median import time of the script's own imports (default: {DEFAULT_BUDGET_MS:g})")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS,
+                        help=f"Fresh interpreters per case; medians are reported (default: {DEFAULT_RUNS})")
+    parser.add_argument("--verbose", "-v", action="store_true", help="List the slowest top-level imports per case")
+    args = parser.parse_args()
+    
+    # Whatever the bare interpreter imports (site, encodings, ...) is not ours
+    _, startup = run_importtime(["-c", "pass"])
+    baseline = {module for module, _, top_level in startup if top_level}
+    
+    failures = 0
+    print(f"{'Case':<13}{'Wall ms':>9}{'Import ms':>11}{'Modules':>9}  Result")
+    with tempfile.TemporaryDirectory() as blob_dir:
+        for name, case_args in quick_cases(blob_dir).items():
+            result = measure(case_args, baseline, max(args.runs, 1))
+            problems = []
+            if result["heavy"]:
+                problems.append(f"imports {', '.join(result['heavy'])}")
+            if result["import_ms"] > args.budget_ms:
+                problems.append(f"over the {args.budget_ms:g} ms budget")
+            failures += bool(problems)
+            print(f"{name:<13}{result['wall_ms']:>9.1f}{result['import_ms']:>11.1f}{result['modules']:>9}  "
+                  f"{'; '.join(problems) or 'ok'}")
+            if args.verbose:
+                for module, us in result["slowest"]:
+                    print(f"{'':<13}{us / 1000:>9.1f} ms  {module}")
+    
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
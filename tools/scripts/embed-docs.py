@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Semantic retrieval over the knowledge base markdown (kb/ and tools/).
+
+Answers a question with the few heading-bounded chunks that match it best,
+instead of whole multi-thousand-line guides.
+
+Features:
+- Heading-bounded chunks (long sections split at paragraph boundaries)
+- Local CPU embeddings with sentence-transformers if installed, else a
+  hashed TF-IDF embedder that needs nothing but NumPy
+- Vectors in a memory-mapped float32 matrix, brute-force top-k search
+- Incremental updates: only chunks whose content hash changed are embedded
+- Output capped to a character budget, so an answer costs a few KB of context
+
+Usage:
+    python embed-docs.py "how do hooks block a tool call"
+    python embed-docs.py --in kb/ -k 3 "option chain data sources"
+    python embed-docs.py --update          # refresh the vectors only
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import math
+import os
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from markdown_sections import HeadingScanner
+
+# sentence-transformers pulls in torch, so only check for it here and
+# import it when an embedder is actually built
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
+
+def load_search_docs():
+    """Import search-docs.py as a module (its file name is not importable)."""
+    path = Path(__file__).parent / "search-docs.py"
+    spec = importlib.util.spec_from_file_location("search_docs", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+search_docs = load_search_docs()
+
+REPO_ROOT = search_docs.REPO_ROOT
+CORPUS_DIRS = search_docs.CORPUS_DIRS
+INDEX_DIR = REPO_ROOT / ".semantic-index"
+INDEX_VERSION = 1
+
+MAX_CHUNK_CHARS = 2000   # longer sections are split at blank lines
+MIN_CHUNK_CHARS = 40     # heading-only stubs below this are not embedded
+HASH_DIM = 1024          # width of the hashed TF-IDF vectors
+BIGRAM_WEIGHT = 0.5
+LOCAL_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_BUDGET = 6000    # characters of chunk text printed per answer
+GENERATION_BYTES = 16    # update tag after the matrix in vectors.f32 (hex)
+
+
+class HashedTfidfEmbedder:
+    """Signed feature hashing of stemmed unigrams and bigrams.
+    
+    Vectors hold sublinear term frequencies only; the IDF weights depend on
+    the whole corpus, so they are computed from the matrix at query time and
+    a new document never forces the others to be re-embedded.
+    """
+    
+    name = f"hashed-tfidf-{HASH_DIM}"
+    dim = HASH_DIM
+    uses_idf = True
+    
+    @staticmethod
+    def features(text: str) -> Dict[str, float]:
+        tokens = search_docs.tokenize(text)
+        features: Dict[str, float] = {}
+        for token in tokens:
+            features[token] = features.get(token, 0.0) + 1.0
+        for pair in zip(tokens, tokens[1:]):
+            key = " ".join(pair)
+            features[key] = features.get(key, 0.0) + BIGRAM_WEIGHT
+        return features
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, tf in self.features(text).items():
+                # crc32 is stable across runs, unlike hash()
+                code = zlib.crc32(feature.encode())
+                sign = 1.0 if code & 0x80000000 else -1.0
+                weight = 1.0 + math.log(tf) if tf >= 1 else tf
+                vectors[row, code % self.dim] += sign * weight
+        return vectors
+
+
+class LocalModelEmbedder:
+    """Small sentence-transformers model, run on the CPU."""
+    
+    uses_idf = False
+    
+    def __init__(self, model_name: str = LOCAL_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.name = f"st-{model_name}"
+        self.dim = self.model.get_sentence_embedding_dimension()
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=32, normalize_embeddings=True,
+                                 convert_to_numpy=True).astype(np.float32)
+
+
+def make_embedder(kind: str = "auto"):
+    if kind == "model" or (kind == "auto" and SENTENCE_TRANSFORMERS_AVAILABLE):
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            raise ValueError("--embedder model needs sentence-transformers: pip install sentence-transformers")
+        return LocalModelEmbedder()
+    return HashedTfidfEmbedder()
+
+
+def split_paragraphs(lines: List[str], start: int) -> Iterator[Tuple[int, int]]:
+    """Split a long section into line ranges of at most MAX_CHUNK_CHARS,
+    breaking at blank lines outside code fences where possible."""
+    chunk_start, size = 0, 0
+    last_break = None
+    scanner = HeadingScanner()
+    for number, line in enumerate(lines):
+        scanner.scan(line)
+        if size + len(line) > MAX_CHUNK_CHARS and number > chunk_start:
+            cut = last_break if last_break and last_break > chunk_start else number
+            yield start + chunk_start, start + cut
+            chunk_start, last_break = cut, None
+            size = sum(len(l) + 1 for l in lines[chunk_start:number])
+        size += len(line) + 1
+        if not line.strip() and scanner.fence is None:
+            last_break = number + 1
+    if chunk_start < len(lines):
+        yield start + chunk_start, start + len(lines)
+
+
+def split_chunks(text: str) -> Iterator[dict]:
+    """Heading-bounded chunks with the heading path prepended for embedding."""
+    lines = text.splitlines()
+    for section in search_docs.split_sections(text):
+        ranges = ([(section["start"], section["end"])] if len(section["text"]) <= MAX_CHUNK_CHARS
+                  else split_paragraphs(lines[section["start"]:section["end"]], section["start"]))
+        for part, (start, end) in enumerate(ranges):
+            body = "\n".join(lines[start:end]).strip()
+            if len(body) < MIN_CHUNK_CHARS:
+                continue
+            context = " > ".join(section["path"])
+            yield {
+                "anchor": section["anchor"], "path": section["path"], "part": part,
+                "start": start, "end": end,
+                "embed_text": f"{context}\n{body}" if context else body,
+            }
+
+
+class ChunkStore:
+    """On-disk chunk table and vector matrix.
+    
+    Files in the index directory:
+    - files.json:  per-file cache (hash, mtime, size and its chunks with
+                   their content hashes), so unchanged files are not re-read
+    - chunks.json: [file, anchor, heading path, start line, end line, hash]
+                   per row of the matrix
+    - vectors.f32: native-endian float32 matrix, one row per chunk,
+                   memory-mapped at query time, then the update's
+                   generation tag (GENERATION_BYTES)
+    - meta.json:   embedder name, dimension, row count, generation tag and
+                   the sha256 of chunks.json
+    
+    An update writes chunks.json and meta.json first and replaces
+    vectors.f32 last, so vectors.f32 is the commit point: read_index()
+    accepts the files only if the matrix carries meta.json's generation and
+    chunks.json matches its hash. An interrupted update is re-embedded by
+    the next one instead of pairing a matrix with another update's rows.
+    """
+    
+    def __init__(self, index_dir: Path = INDEX_DIR, repo_root: Path = REPO_ROOT,
+                 corpus_dirs: Tuple[str, ...] = CORPUS_DIRS, embedder=None):
+        self.index_dir = Path(index_dir)
+        self.repo_root = Path(repo_root)
+        self.corpus_dirs = corpus_dirs
+        self._embedder = embedder
+        self.meta: dict = {}
+        self.chunks: List[list] = []
+        self.vectors: Optional[np.ndarray] = None
+        self._idf: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+    
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = make_embedder()
+        return self._embedder
+    
+    # Building
+    
+    def corpus_files(self) -> Iterator[Path]:
+        for directory in self.corpus_dirs:
+            root = self.repo_root / directory
+            for path in sorted(root.rglob("*.md")):
+                if not any(part.startswith(".") for part in path.relative_to(self.repo_root).parts):
+                    yield path
+    
+    def load_file_cache(self) -> dict:
+        try:
+            cache = json.loads((self.index_dir / "files.json").read_text())
+        except (OSError, ValueError):
+            return {}
+        if cache.get("version") != INDEX_VERSION or cache.get("embedder") != self.embedder.name:
+            return {}
+        return cache["files"]
+    
+    def parse_file(self, path: Path) -> Tuple[List[dict], Dict[str, str]]:
+        """Chunks of a file (without text) and their embedding texts by hash."""
+        text = path.read_text(encoding="utf-8", errors="replace")
+        chunks, texts = [], {}
+        for chunk in split_chunks(text):
+            embed_text = chunk.pop("embed_text")
+            chunk["hash"] = hashlib.sha256(embed_text.encode()).hexdigest()[:32]
+            texts[chunk["hash"]] = embed_text
+            chunks.append(chunk)
+        return chunks, texts
+    
+    def update(self, force: bool = False, verbose: bool = False) -> Dict[str, int]:
+        """Bring the store up to date; returns file counts and the number of
+        chunks embedded versus reused from the existing matrix."""
+        cache = {} if force else self.load_file_cache()
+        manifest = search_docs.ManifestHashes(self.repo_root)
+        counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0, "embedded": 0, "reused": 0}
+        files, texts = {}, {}
+        
+        for path in self.corpus_files():
+            rel = path.relative_to(self.repo_root).as_posix()
+            stat = path.stat()
+            entry = cache.get(rel)
+            if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                files[rel] = entry
+                counts["unchanged"] += 1
+                continue
+            content_hash = manifest.get(rel, stat.st_mtime_ns) or search_docs.file_sha256(path)
+            if entry and entry["hash"] == content_hash:
+                files[rel] = {**entry, "mtime": stat.st_mtime_ns, "size": stat.st_size}
+                counts["unchanged"] += 1
+                continue
+            counts["changed" if entry else "added"] += 1
+            if verbose:
+                print(f"  Chunking {rel}")
+            chunks, file_texts = self.parse_file(path)
+            texts.update(file_texts)
+            files[rel] = {"hash": content_hash, "mtime": stat.st_mtime_ns, "size": stat.st_size,
+                          "chunks": chunks}
+        counts["removed"] = len(set(cache) - set(files))
+        
+        index = None if force else self.read_index()
+        if not (force or counts["added"] or counts["changed"] or counts["removed"] or index is None):
+            self.write_file_cache(files)
+            counts["reused"] = self.count()
+            return counts
+        
+        # Reuse the rows of chunks whose text is unchanged, embed the rest
+        old_rows = self.existing_rows(index)
+        old_vectors = self.open_vectors(index[0]) if old_rows else None
+        for rel, entry in files.items():
+            # A file skipped through files.json has no texts; re-read it if the
+            # matrix cannot supply its rows (lost, rebuilt or another embedder)
+            if any(chunk["hash"] not in old_rows and chunk["hash"] not in texts for chunk in entry["chunks"]):
+                chunks, file_texts = self.parse_file(self.repo_root / rel)
+                texts.update(file_texts)
+                files[rel] = {**entry, "chunks": chunks}
+        rows: List[list] = []
+        for rel in sorted(files):
+            for chunk in files[rel]["chunks"]:
+                rows.append([rel, chunk["anchor"], chunk["path"], chunk["start"], chunk["end"], chunk["hash"]])
+        missing = list(dict.fromkeys(row[5] for row in rows if row[5] not in old_rows))
+        embedded = self.embed_texts([texts[h] for h in missing], verbose) if missing else None
+        new_rows = {h: i for i, h in enumerate(missing)}
+        
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_dir / "vectors.f32.tmp"
+        dim = self.embedder.dim
+        if rows:
+            matrix = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=(len(rows), dim))
+            for i, row in enumerate(rows):
+                chunk_hash = row[5]
+                if chunk_hash in new_rows:
+                    matrix[i] = embedded[new_rows[chunk_hash]]
+                else:
+                    matrix[i] = old_vectors[old_rows[chunk_hash]]
+            matrix.flush()
+            del matrix
+        else:
+            tmp_path.write_bytes(b"")
+        counts["embedded"] = len(missing)
+        counts["reused"] = len(rows) - sum(1 for row in rows if row[5] in new_rows)
+        
+        generation = os.urandom(GENERATION_BYTES // 2).hex()
+        with open(tmp_path, "ab") as f:
+            f.write(generation.encode())
+        
+        # Row files first; replacing vectors.f32 commits the update
+        self.close()
+        chunks_data = json.dumps(rows, separators=(",", ":")).encode()
+        meta = {"version": INDEX_VERSION, "embedder": self.embedder.name, "dim": dim,
+                "rows": len(rows), "byteorder": sys.byteorder, "generation": generation,
+                "chunks": hashlib.sha256(chunks_data).hexdigest()}
+        search_docs.write_atomic(self.index_dir / "chunks.json", chunks_data)
+        search_docs.write_atomic(self.index_dir / "meta.json", json.dumps(meta).encode())
+        os.replace(tmp_path, self.index_dir / "vectors.f32")
+        self.write_file_cache(files)
+        return counts
+    
+    def embed_texts(self, texts: List[str], verbose: bool) -> np.ndarray:
+        if verbose:
+            print(f"  Embedding {len(texts)} chunks with {self.embedder.name}")
+        return self.embedder.embed(texts)
+    
+    def read_index(self) -> Optional[Tuple[dict, List[list]]]:
+        """(meta, chunk rows) if the three index files belong to one completed update."""
+        try:
+            meta = json.loads((self.index_dir / "meta.json").read_text())
+            chunks_data = (self.index_dir / "chunks.json").read_bytes()
+            with open(self.index_dir / "vectors.f32", "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(size - GENERATION_BYTES, 0))
+                generation = f.read().decode("ascii", errors="replace")
+            rows = json.loads(chunks_data)
+            expected_size = meta["rows"] * meta["dim"] * 4 + GENERATION_BYTES
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if (size != expected_size or generation != meta.get("generation")
+                or hashlib.sha256(chunks_data).hexdigest() != meta.get("chunks")):
+            return None
+        return meta, rows
+    
+    def existing_rows(self, index: Optional[Tuple[dict, List[list]]]) -> Dict[str, int]:
+        """Chunk hash -> row of the current matrix, if it was built by this embedder."""
+        if index is None:
+            return {}
+        meta, rows = index
+        if meta.get("embedder") != self.embedder.name or meta.get("byteorder") != sys.byteorder:
+            return {}
+        return {row[5]: i for i, row in enumerate(rows)}
+    
+    def write_file_cache(self, files: dict):
+        cache = {"version": INDEX_VERSION, "embedder": self.embedder.name, "files": files}
+        search_docs.write_atomic(self.index_dir / "files.json", json.dumps(cache, separators=(",", ":")).encode())
+    
+    def exists(self) -> bool:
+        return all((self.index_dir / name).exists()
+                   for name in ("files.json", "chunks.json", "vectors.f32", "meta.json"))
+    
+    def count(self) -> int:
+        try:
+            return json.loads((self.index_dir / "meta.json").read_text())["rows"]
+        except (OSError, ValueError, KeyError):
+            return 0
+    
+    # Querying
+    
+    def open_vectors(self, meta: dict) -> Optional[np.ndarray]:
+        if not meta["rows"]:
+            return np.zeros((0, meta["dim"]), dtype=np.float32)
+        return np.memmap(self.index_dir / "vectors.f32", dtype=np.float32, mode="r",
+                         shape=(meta["rows"], meta["dim"]))
+    
+    def load(self):
+        """Load the chunk table and memory-map the vectors."""
+        if self.vectors is not None:
+            return
+        index = self.read_index()
+        if index is None:
+            raise ValueError("index is missing or from an interrupted update; run --update")
+        self.meta, chunks = index
+        if self.meta.get("byteorder") != sys.byteorder:
+            raise ValueError("index was built on another platform; run --rebuild")
+        if self.meta.get("embedder") != self.embedder.name:
+            raise ValueError(f"index was built with {self.meta.get('embedder')}, "
+                             f"not {self.embedder.name}; run --update")
+        self.chunks = chunks
+        self.vectors = self.open_vectors(self.meta)
+        if self.embedder.uses_idf:
+            # Smoothed IDF per hashed dimension, then row norms of the weighted matrix
+            df = np.count_nonzero(self.vectors, axis=0)
+            self._idf = np.log((1 + len(self.chunks)) / (1 + df)).astype(np.float32) + 1.0
+            self._norms = np.linalg.norm(self.vectors * self._idf, axis=1)
+        else:
+            self._norms = np.linalg.norm(self.vectors, axis=1)
+        self._norms[self._norms == 0] = 1.0
+    
+    def close(self):
+        self.vectors = None
+        self._idf = None
+        self._norms = None
+    
+    def search(self, query: str, k: int = 5, prefix: Optional[str] = None) -> List[Tuple[float, int]]:
+        """Return up to k (cosine score, chunk id) pairs, best first."""
+        self.load()
+        if not self.chunks:
+            return []
+        q = self.embedder.embed([query])[0]
+        if self._idf is not None:
+            # cosine of the IDF-weighted vectors: (V*idf) . (q*idf) = V . (q*idf^2)
+            q = q * self._idf
+            q_norm = np.linalg.norm(q) or 1.0
+            q = q * self._idf
+        else:
+            q_norm = np.linalg.norm(q) or 1.0
+        scores = (self.vectors @ q) / (self._norms * q_norm)
+        if prefix:
+            mask = np.fromiter((row[0].startswith(prefix) for row in self.chunks), dtype=bool, count=len(self.chunks))
+            scores = np.where(mask, scores, -np.inf)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), int(i)) for i in top if np.isfinite(scores[i]) and scores[i] > 0]
+    
+    def chunk(self, chunk_id: int, with_text: bool = True) -> dict:
+        rel, anchor, path, start, end, _ = self.chunks[chunk_id]
+        info = {"file": rel, "anchor": anchor, "headings": path, "start": start, "end": end}
+        if with_text:
+            try:
+                lines = (self.repo_root / rel).read_text(encoding="utf-8", errors="replace").splitlines()
+                info["text"] = "\n".join(lines[start:end]).strip()
+            except OSError:
+                info["text"] = ""
+        return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic search over the kb/ and tools/ markdown")
+    parser.add_argument("query", nargs="*", help="Question or search terms")
+    parser.add_argument("-k", type=int, default=5, help="Number of chunks (default: 5)")
+    parser.add_argument("--in", dest="prefix", metavar="PATH", help="Only return files under this path, e.g. kb/")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET,
+                        help=f"Maximum characters of chunk text to print (default: {DEFAULT_BUDGET})")
+    parser.add_argument("--embedder", choices=["auto", "model", "hashed"], default="auto",
+                        help="Local sentence-transformers model, hashed TF-IDF, or the model if installed (default)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--update", action="store_true", help="Update the vectors and exit")
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed every chunk")
+    parser.add_argument("--no-update", action="store_true", help="Search the store as is, without checking for changed files")
+    parser.add_argument("--verbose", "-v", action="store_true", help="List re-chunked files")
+    args = parser.parse_args()
+    
+    try:
+        store = ChunkStore(embedder=make_embedder(args.embedder))
+    except ValueError as e:
+        parser.error(str(e))
+    if args.rebuild or args.update or not args.no_update or not store.exists():
+        counts = store.update(force=args.rebuild, verbose=args.verbose)
+        if args.update or args.rebuild or args.verbose:
+            print(f"Store: {counts['added']} added, {counts['changed']} changed, {counts['removed']} removed, "
+                  f"{counts['unchanged']} unchanged files; {counts['embedded']} chunks embedded, "
+                  f"{counts['reused']} reused")
+    if not args.query:
+        if not (args.update or args.rebuild):
+            parser.error("no question given")
+        return
+    
+    query = " ".join(args.query)
+    results = []
+    remaining = args.budget
+    for score, chunk_id in store.search(query, args.k, args.prefix):
+        info = store.chunk(chunk_id)
+        if len(info["text"]) > remaining:
+            info["text"] = info["text"][:max(remaining - 3, 0)] + "..."
+        remaining -= len(info["text"])
+        results.append({**info, "score": round(score, 4)})
+        if remaining <= 0:
+            break
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    if not results:
+        print("No matches")
+        return
+    for rank, result in enumerate(results, 1):
+        location = f"{result['file']}#{result['anchor']}" if result["anchor"] else result["file"]
+        print(f"{rank}. {location}  (score {result['score']:.3f}, lines {result['start'] + 1}-{result['end']})")
+        print(result["text"])
+        print()
+
+
+if __name__ == "__main__":
+    main()
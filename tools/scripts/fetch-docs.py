@@ -8,74 +8,1303 @@ Features:
 - Retry logic with exponential backoff
 - Progress bar for visual feedback
 - Hash-based change detection
+- Conditional requests (ETag / Last-Modified) to skip unchanged bodies
+- Incremental sync driven by sitemap <lastmod>
+- Optional asyncio engine with a pooled keep-alive client
+- Per-host token-bucket rate limiting with adaptive (AIMD) concurrency
+- Streaming hash-and-write with atomic replacement of changed documents
+- Pluggable manifest store (JSON file or crash-safe SQLite)
+- All sources scheduled together on one global work queue
+- Header-only update checks (HEAD / range probe + sitemap lastmod)
+- Streaming sitemap reader (gzip, sitemap indexes followed concurrently)
+- Fetch telemetry: per-host latency histograms, bytes, retries, failure reasons
+  (JSON run report and Prometheus text format)
+- Optional content-addressed blob store with revision history, diff and rollback
+- Post-sync refresh of PROJECT_INDEX.json (build-project-index.py)
+- Markdown normalization before hashing (raw + semantic hash), so cosmetic
+  churn is not an update, and a per-section delta of each real change
+- Watch mode: long-running daemon with warm connection pools, per-source
+  poll intervals with jitter and a JSONL event feed (stdout or Unix socket)
+- Lazy imports: the network stack loads only on paths that use it, so --help
+  and the revision commands start fast (guarded by check-startup.py)
 """
 
 import argparse
+import codecs
 import hashlib
+import importlib.util
 import json
+import os
+import queue
+import random
+import re
 import sys
+import tempfile
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager, redirect_stdout
+from itertools import zip_longest
+from datetime import datetime, timezone
 from pathlib import Path
-from threading import Lock
-from typing import Dict, List, Optional, Tuple
-import xml.etree.ElementTree as ET
-
-try:
-    import requests
-except ImportError:
-    print("Error: requests library not installed. Run: pip install requests")
-    sys.exit(1)
-
-# Try to import tqdm for progress bars, but make it optional
-try:
-    from tqdm import tqdm
-    TQDM_AVAILABLE = True
-except ImportError:
-    TQDM_AVAILABLE = False
-    # Fallback progress indicator
-    class tqdm:
-        def __init__(self, iterable=None, total=None, desc=None, disable=False, **kwargs):
-            self.iterable = iterable
-            self.total = total or (len(iterable) if iterable else 0)
-            self.desc = desc
-            self.disable = disable
-            self.n = 0
-            
-        def __iter__(self):
-            if not self.disable and self.desc:
-                print(f"{self.desc}: Processing {self.total} items...")
-            for item in self.iterable:
-                yield item
-                self.n += 1
-                
-        def update(self, n=1):
-            self.n += n
+from threading import BoundedSemaphore, Event, Lock, Thread
+from urllib.parse import urlparse
+from typing import Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+from markdown_sections import HeadingScanner, slugify
+
+
+class LazyModule:
+    """A module that is imported on first attribute access.
+    
+    The script runs from hooks many times a day, and most of its startup time
+    went to importing the network stack. Heavy modules are bound through this
+    proxy so --help, argument errors and the revision commands never load them
+    (check-startup.py keeps it that way). With an install hint, a missing module
+    prints it and exits like the old import-time check did.
+    """
+    
+    def __init__(self, name: str, install_hint: Optional[str] = None):
+        self._name = name
+        self._install_hint = install_hint
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module is None:
+            try:
+                self._module = importlib.import_module(self._name)
+            except ImportError:
+                if self._install_hint is None:
+                    raise
+                print(f"Error: {self._name} library not installed. Run: {self._install_hint}")
+                sys.exit(1)
+        return getattr(self._module, attr)
+
+
+def module_available(name: str) -> bool:
+    """Whether an optional module is installed, without importing it."""
+    return importlib.util.find_spec(name) is not None
+
+
+asyncio = LazyModule('asyncio')
+ET = LazyModule('xml.etree.ElementTree')
+requests = LazyModule('requests', install_hint='pip install requests')
+
+# aiohttp (async engine), zstandard (blob compression) and tqdm (progress
+# bars) are optional
+aiohttp = LazyModule('aiohttp')
+AIOHTTP_AVAILABLE = module_available('aiohttp')
+zstandard = LazyModule('zstandard')
+ZSTD_AVAILABLE = module_available('zstandard')
+TQDM_AVAILABLE = module_available('tqdm')
+
+
+def make_progress_bar(**kwargs):
+    """Return a tqdm bar (importing tqdm here) or the plain fallback."""
+    if TQDM_AVAILABLE:
+        from tqdm import tqdm
+        return tqdm(**kwargs)
+    return SimpleProgress(**kwargs)
+
+
+class SimpleProgress:
+    """Fallback progress indicator when tqdm is not installed."""
+    
+    def __init__(self, iterable=None, total=None, desc=None, disable=False, **kwargs):
+        self.iterable = iterable
+        self.total = total or (len(iterable) if iterable else 0)
+        self.desc = desc
+        self.disable = disable
+        self.n = 0
+    
+    def __iter__(self):
+        if not self.disable and self.desc:
+            print(f"{self.desc}: Processing {self.total} items...")
+        for item in self.iterable:
+            yield item
+            self.n += 1
+    
+    def update(self, n=1):
+        self.n += n
+    
+    def set_description(self, desc):
+        if not self.disable:
+            print(desc)
+    
+    def close(self):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+
+
+SITEMAP_FIELDS = ('lastmod', 'changefreq', 'priority')
+SITEMAP_MAX_DEPTH = 3
+SITEMAP_QUEUE_SIZE = 1000
+
+
+CHUNK_SIZE = 64 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def iter_decompressed(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Pass chunks through, gunzipping them if the stream starts with the gzip magic.
+    
+    Decompressed output is handed out at most CHUNK_SIZE bytes at a time, so a
+    highly compressed chunk cannot balloon into one huge buffer.
+    """
+    decompressor = None
+    for index, chunk in enumerate(chunks):
+        if index == 0 and chunk[:2] == GZIP_MAGIC:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if decompressor is None:
+            yield chunk
+            continue
+        while chunk:
+            yield decompressor.decompress(chunk, CHUNK_SIZE)
+            chunk = decompressor.unconsumed_tail
+
+# mkstemp creates 0600 files; documents get the usual umask-derived mode instead
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+class FetchedResponse(NamedTuple):
+    """Fully read response from the async engine, shaped like requests.Response."""
+    status_code: int
+    headers: Mapping[str, str]
+    content: bytes
+    encoding: str = 'utf-8'
+    
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors='replace')
+
+
+class StreamingDocumentWriter:
+    """Hash a document body chunk by chunk while spooling it to a temp file.
+    
+    The temp file lives next to the target so commit() can atomically rename
+    it over the document, and is only created once the first chunk arrives,
+    so a 304 never touches the disk. With path=None (dry run) chunks are
+    hashed but not written. With a normalizer the chunks also feed a
+    SemanticDigest, so the semantic hash is ready when the body ends. Use it
+    as a context manager: whatever was not committed is discarded on exit,
+    however the block ends.
+    """
+    
+    def __init__(self, path: Optional[Path], normalizer: Optional["DocumentNormalizer"] = None):
+        self.path = path
+        self.normalizer = normalizer
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.file = None
+        self.temp_path = None
+        self.digest = SemanticDigest(normalizer) if normalizer else None
+    
+    def __enter__(self) -> "StreamingDocumentWriter":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.discard()
+    
+    def write(self, chunk: bytes):
+        """Feed one chunk to the hasher and the temp file."""
+        self.hasher.update(chunk)
+        self.size += len(chunk)
+        if self.digest is not None:
+            self.digest.update(chunk)
+        if self.path is None:
+            return
+        if self.file is None:
+            fd, temp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+            self.file = os.fdopen(fd, 'wb')
+            self.temp_path = Path(temp_path)
+        self.file.write(chunk)
+    
+    def reset(self):
+        """Start over, e.g. before a retried request streams the body again."""
+        self.discard()
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        if self.digest is not None:
+            self.digest = SemanticDigest(self.normalizer)
+    
+    def discard(self):
+        """Close and remove the temp file, if any."""
+        if self.file is not None:
+            self.file.close()
+            self.temp_path.unlink(missing_ok=True)
+            self.file = None
+            self.temp_path = None
+    
+    def commit(self, existing_hash: Optional[str]) -> Tuple[bool, str]:
+        """Replace the target if the content hash differs. Returns (changed, hash)."""
+        new_hash = self.hasher.hexdigest()
+        if new_hash == existing_hash or self.path is None:
+            self.discard()
+            return new_hash != existing_hash, new_hash
+        if self.file is None:
+            # Empty body: nothing was spooled
+            self.write(b"")
+        self.file.close()
+        self.file = None
+        os.chmod(self.temp_path, 0o666 & ~UMASK)
+        os.replace(self.temp_path, self.path)
+        self.temp_path = None
+        return True, new_hash
+
+
+def file_sha256(path: Path) -> str:
+    """SHA256 of a file, read in chunks."""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# Normalization rules applied before the semantic hash, in this order
+NORMALIZE_RULES = ('whitespace', 'html_attributes', 'build_ids')
+BUILD_ID_PATTERNS = (
+    (r'/_next/static/[\w-]{8,}/', '/_next/static/<build>/'),
+    (r'"buildId"\s*:\s*"[^"]*"', '"buildId":"<build>"'),
+    (r'\bdpl_[A-Za-z0-9]+', 'dpl_<build>'),
+    (r'([?&](?:v|ver|version|hash|build|cb|ts|dpl)=)[\w.-]+', r'\1<build>'),
+)
+HTML_TAG_RE = re.compile(r'<([A-Za-z][\w-]*)(\s+[^<>]*?)\s*(/?)>')
+HTML_ATTR_RE = re.compile(r'([^\s=/>]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s"\'=<>`]+))?')
+# The tail of a text that may still become an HTML tag once more lines arrive
+OPEN_TAG_RE = re.compile(r'<[A-Za-z][\w-]*(?:\s[^<>]*)?\Z')
+
+
+def sort_html_attributes(match) -> str:
+    """Rewrite one HTML tag with its attributes in sorted order."""
+    tag, attributes, closing = match.groups()
+    pairs = sorted(HTML_ATTR_RE.findall(attributes))
+    rendered = " ".join(f"{name}={value}" if value else name for name, value in pairs)
+    return f"<{tag} {rendered}{' /' if closing else ''}>"
+
+
+class DocumentNormalizer:
+    """Canonical form of a markdown document, used for the semantic hash.
+    
+    Rules (the source's "normalize" setting: true for all, false for none, or
+    a list of rule names):
+    - whitespace:      line endings, trailing whitespace, runs of blank lines
+    - html_attributes: attributes of inline HTML tags in sorted order
+    - build_ids:       rotating build IDs and cache-busting query parameters,
+                       plus the source's own "normalize_patterns"
+                       ([regex, replacement] pairs)
+    
+    Rules apply line by line (see NormalizedLines), so a body can be
+    normalized as it streams; an HTML tag spanning lines is kept together,
+    other patterns match within a line.
+    """
+    
+    def __init__(self, rules: Tuple[str, ...] = NORMALIZE_RULES, patterns: Tuple[tuple, ...] = ()):
+        unknown = set(rules) - set(NORMALIZE_RULES)
+        if unknown:
+            raise ValueError(f"unknown normalize rule(s): {', '.join(sorted(unknown))}")
+        self.rules = tuple(rule for rule in NORMALIZE_RULES if rule in rules)
+        self.patterns = [(re.compile(pattern), replacement) for pattern, replacement in
+                         (BUILD_ID_PATTERNS if 'build_ids' in self.rules else ()) + tuple(patterns)]
+    
+    @classmethod
+    def from_source(cls, source: dict) -> Optional["DocumentNormalizer"]:
+        setting = source.get('normalize', True)
+        if setting is False:
+            return None
+        rules = NORMALIZE_RULES if setting is True else tuple(setting)
+        return cls(rules, tuple(tuple(pair) for pair in source.get('normalize_patterns', [])))
+    
+    def rewrite(self, text: str) -> str:
+        """Apply the html_attributes and pattern rules to one or more whole lines."""
+        if 'html_attributes' in self.rules:
+            text = HTML_TAG_RE.sub(sort_html_attributes, text)
+        for pattern, replacement in self.patterns:
+            text = pattern.sub(replacement, text)
+        return text
+    
+    def normalize(self, text: str) -> str:
+        lines: List[str] = []
+        pipeline = NormalizedLines(self, lines.append)
+        for line in text.split('\n'):
+            pipeline.push(line)
+        pipeline.close()
+        return '\n'.join(lines)
+
+
+class NormalizedLines:
+    """Push-style line pipeline behind DocumentNormalizer.
+    
+    push() raw lines (split on newlines) and normalized lines are passed to emit
+    as soon as they are final: the whitespace rule only needs to know whether
+    a blank run continues, and lines are held back only while an HTML tag is
+    still open (at most TAG_LINE_LIMIT lines).
+    """
+    
+    TAG_LINE_LIMIT = 64
+    
+    def __init__(self, normalizer: DocumentNormalizer, emit: Callable[[str], None]):
+        self.normalizer = normalizer
+        self.emit = emit
+        self.whitespace = 'whitespace' in normalizer.rules
+        self.started = False
+        self.blank = False
+        self.held: List[str] = []
+    
+    def push(self, line: str):
+        if not self.whitespace:
+            self.hold(line)
+            return
+        # \r\n and lone \r end lines too; blank runs collapse to one blank
+        # line, and leading and trailing blank lines go
+        if line.endswith('\r'):
+            line = line[:-1]
+        for part in line.split('\r'):
+            part = part.rstrip()
+            if not part:
+                self.blank = True
+                continue
+            if self.blank and self.started:
+                self.hold('')
+            self.blank = False
+            self.started = True
+            self.hold(part)
+    
+    def hold(self, line: str):
+        self.held.append(line)
+        if len(self.held) < self.TAG_LINE_LIMIT and OPEN_TAG_RE.search('\n'.join(self.held)):
+            return
+        self.release()
+    
+    def release(self):
+        if self.held:
+            for line in self.normalizer.rewrite('\n'.join(self.held)).split('\n'):
+                self.emit(line)
+            self.held = []
+    
+    def close(self):
+        self.release()
+
+
+class SectionHasher:
+    """Section hashes (see section_hashes) of a document fed one line at a time."""
+    
+    def __init__(self):
+        self.sections: Dict[str, str] = {}
+        self.seen: Dict[str, int] = {}
+        self.anchor = ""
+        self.hasher = hashlib.sha256()
+        self.lines = 0
+        self.headings = HeadingScanner()
+    
+    def add(self, line: str):
+        match = self.headings.scan(line)
+        if match:
+            self.close_section()
+            anchor = slugify(match.group(2).strip())
+            count = self.seen.get(anchor, 0)
+            self.seen[anchor] = count + 1
+            self.anchor = f"{anchor}-{count}" if count else anchor
+            self.hasher, self.lines = hashlib.sha256(), 0
+        if line.strip():
+            self.lines += 1
+        self.hasher.update(line.encode('utf-8') + b'\n')
+    
+    def close_section(self):
+        if self.anchor or self.lines:
+            self.sections[self.anchor] = self.hasher.hexdigest()[:12]
+    
+    def result(self) -> Dict[str, str]:
+        self.close_section()
+        return self.sections
+
+
+class SemanticDigest:
+    """Semantic hash and section hashes of a body, computed as it streams.
+    
+    Chunks are decoded incrementally and normalized line by line, so the
+    result equals hashing normalizer.normalize() of the whole decoded body
+    without ever holding it in memory.
+    """
+    
+    def __init__(self, normalizer: DocumentNormalizer):
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.partial: List[str] = []
+        self.hasher = hashlib.sha256()
+        self.sections = SectionHasher()
+        self.emitted = False
+        self.lines = NormalizedLines(normalizer, self.emit)
+    
+    def update(self, chunk: bytes, final: bool = False):
+        text = self.decoder.decode(chunk, final)
+        if '\n' not in text:
+            self.partial.append(text)
+            return
+        first, *lines, last = text.split('\n')
+        self.lines.push(''.join(self.partial) + first)
+        for line in lines:
+            self.lines.push(line)
+        self.partial = [last]
+    
+    def emit(self, line: str):
+        if self.emitted:
+            self.hasher.update(b'\n')
+        self.hasher.update(line.encode('utf-8'))
+        self.sections.add(line)
+        self.emitted = True
+    
+    def finish(self) -> Tuple[str, Dict[str, str]]:
+        """Returns (semantic_hash, sections) once the whole body was fed."""
+        self.update(b'', final=True)
+        self.lines.push(''.join(self.partial))
+        self.lines.close()
+        return self.hasher.hexdigest(), self.sections.result()
+
+
+def section_hashes(text: str) -> Dict[str, str]:
+    """Short content hash per heading-bounded section, keyed by GitHub-style anchor.
+    
+    Text before the first heading is keyed "" (and omitted when empty).
+    Headings inside code fences do not start sections.
+    """
+    hasher = SectionHasher()
+    for line in text.split('\n'):
+        hasher.add(line)
+    return hasher.result()
+
+
+def section_delta(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, List[str]]:
+    """Anchors of the sections added, removed and changed between two section_hashes()."""
+    return {
+        'added': [anchor for anchor in new if anchor not in old],
+        'removed': [anchor for anchor in old if anchor not in new],
+        'changed': [anchor for anchor in new if anchor in old and old[anchor] != new[anchor]],
+    }
+
+
+def describe_delta(delta: Dict[str, List[str]]) -> str:
+    parts = [f"{key} {', '.join(anchor or '(intro)' for anchor in anchors)}"
+             for key, anchors in delta.items() if anchors]
+    return "; ".join(parts) if parts else "no section changes"
+
+
+def parse_w3c_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse a W3C datetime (sitemap <lastmod> or manifest timestamp) as aware UTC."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+THROTTLE_STATUSES = (429, 503)
+HEAD_UNSUPPORTED = (405, 501)  # Method Not Allowed / Not Implemented
+JITTER = 0.25
+
+
+def is_retryable(status: Optional[int]) -> bool:
+    """Whether a failed request is worth retrying, in either engine.
+    
+    Connection errors and timeouts (no status), 408, 429 and 5xx are; any
+    other client error (404, 410, ...) will not change on a retry.
+    """
+    return status is None or status == 408 or status in THROTTLE_STATUSES or status >= 500
+
+
+def jittered(delay: float) -> float:
+    """Spread a delay by +/-JITTER so workers do not retry in lockstep."""
+    return delay * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    from email.utils import parsedate_to_datetime
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostRateLimiter:
+    """Shared per-host token bucket with AIMD concurrency control.
+    
+    Every request to the host takes a token (refilled at requests_per_second,
+    up to burst) and a concurrency slot. Successful responses grow the
+    concurrency limit additively; a 429/503 halves it and pauses the whole
+    host for Retry-After (or an exponential backoff), so all workers back off
+    together. Thread-safe; try_acquire() never blocks, so the same limiter
+    serves both the thread and async engines.
+    """
+    
+    POLL_INTERVAL = 0.01
+    
+    def __init__(self, requests_per_second: Optional[float] = None, burst: Optional[int] = None,
+                 min_concurrency: int = 1, max_concurrency: int = 100,
+                 initial_concurrency: Optional[int] = None, backoff: float = 1.0,
+                 max_backoff: float = 60.0):
+        self.rate = requests_per_second
+        self.burst = burst or max(1, int(requests_per_second or 1))
+        self.tokens = float(self.burst)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max(min_concurrency, max_concurrency)
+        self.limit = float(min(self.max_concurrency, initial_concurrency or self.max_concurrency))
+        self.base_backoff = backoff
+        self.max_backoff = max_backoff
+        self.backoff = backoff
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.throttled = 0
+        self.updated = time.monotonic()
+        self.lock = Lock()
+    
+    def try_acquire(self) -> float:
+        """Take a slot and a token; return 0 on success or seconds to wait before retrying."""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.in_flight >= int(self.limit):
+                return self.POLL_INTERVAL
+            if self.rate:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens < 1:
+                    return (1 - self.tokens) / self.rate
+                self.tokens -= 1
+            self.in_flight += 1
+            return 0.0
+    
+    def acquire(self):
+        """Block the calling thread until a slot and token are available."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+    
+    async def acquire_async(self):
+        """Wait on the event loop until a slot and token are available."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+    
+    def release(self):
+        """Return the concurrency slot taken by acquire()."""
+        with self.lock:
+            self.in_flight -= 1
+    
+    def success(self):
+        """Additive increase: roughly +1 concurrency per window of successes."""
+        with self.lock:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self.backoff = self.base_backoff
+    
+    def throttle(self, retry_after: Optional[float] = None):
+        """Multiplicative decrease and a host-wide pause after a 429/503."""
+        with self.lock:
+            self.throttled += 1
+            self.limit = max(self.min_concurrency, self.limit / 2)
+            if retry_after is not None:
+                pause = retry_after * random.uniform(1, 1 + JITTER)
+            else:
+                pause = jittered(self.backoff)
+                self.backoff = min(self.max_backoff, self.backoff * 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            return pause
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; quantiles are interpolated within a bucket."""
+    
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, seconds: float):
+        index = 0
+        while index < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+    
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(LATENCY_BUCKETS):
+                    return self.max
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                upper = min(LATENCY_BUCKETS[index], self.max)
+                return lower + (upper - lower) * max(0.0, rank - seen) / count
+            seen += count
+        return self.max
+    
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.50), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6),
+        }
+
+
+def failure_reason(error: BaseException) -> str:
+    """Classify a request failure: "HTTP <status>", "DNS", or the exception type."""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(error, 'status', None)
+    if status:
+        return f"HTTP {status}"
+    if 'NameResolutionError' in str(error) or 'gaierror' in repr(getattr(error, 'os_error', '')):
+        return "DNS"
+    return type(error).__name__
+
+
+class HostMetrics:
+    """Counters and per-phase histograms for one host."""
+    
+    def __init__(self):
+        self.phases = defaultdict(LatencyHistogram)
+        self.status = defaultdict(int)
+        self.bytes = 0
+        self.retries = defaultdict(int)
+        self.backoff = 0.0
+        self.failures = defaultdict(int)
+    
+    def to_dict(self) -> dict:
+        return {
+            "requests": sum(self.status.values()),
+            "status": {str(code): count for code, count in sorted(self.status.items())},
+            "bytes": self.bytes,
+            "retries": dict(self.retries),
+            "backoff_seconds": round(self.backoff, 6),
+            "failures": dict(self.failures),
+            "latency": {phase: hist.to_dict() for phase, hist in sorted(self.phases.items())},
+        }
+
+
+class FetchMetrics:
+    """Thread-safe telemetry for one fetcher run.
+    
+    Per-request phases are recorded per host: "wait" (rate limiter), "ttfb"
+    (request sent to headers received, including connection setup), "body"
+    (streaming the body), "write" (finalizing the file) and "request" (one
+    attempt end to end); the async engine also records "dns" and "connect".
+    Run phases (sitemap, fetch, manifest, check) are wall-clock totals.
+    """
+    
+    MAX_FAILED_URLS = 100
+    
+    def __init__(self):
+        self.started = datetime.utcnow()
+        self.run_phases: Dict[str, float] = defaultdict(float)
+        self.hosts: Dict[str, HostMetrics] = defaultdict(HostMetrics)
+        self.failed_urls: Dict[str, str] = {}
+        self.lock = Lock()
+    
+    @contextmanager
+    def phase(self, name: str):
+        """Time a run phase (wall clock)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.run_phases[name] += time.perf_counter() - start
+    
+    def observe(self, url: str, phase: str, seconds: float):
+        with self.lock:
+            self.hosts[urlparse(url).netloc].phases[phase].observe(seconds)
+    
+    def response(self, url: str, status: int, nbytes: int = 0):
+        with self.lock:
+            host = self.hosts[urlparse(url).netloc]
+            host.status[status] += 1
+            host.bytes += nbytes
+    
+    def add_bytes(self, url: str, nbytes: int):
+        with self.lock:
+            self.hosts[urlparse(url).netloc].bytes += nbytes
+    
+    def retry(self, url: str, reason: str, backoff: float = 0.0):
+        with self.lock:
+            host = self.hosts[urlparse(url).netloc]
+            host.retries[reason] += 1
+            host.backoff += backoff
+    
+    def failure(self, url: str, reason: str):
+        """Record a request that failed for good; the reason is kept per URL."""
+        with self.lock:
+            self.hosts[urlparse(url).netloc].failures[reason] += 1
+            if url in self.failed_urls or len(self.failed_urls) < self.MAX_FAILED_URLS:
+                self.failed_urls[url] = reason
+    
+    def failure_for(self, url: str) -> Optional[str]:
+        with self.lock:
+            return self.failed_urls.get(url)
+    
+    def report(self, **extra) -> dict:
+        """Build the machine-readable run report; extra keys are merged in."""
+        with self.lock:
+            hosts = {name: host.to_dict() for name, host in sorted(self.hosts.items())}
+            phases = {name: round(seconds, 6) for name, seconds in self.run_phases.items()}
+            failed_urls = dict(self.failed_urls)
+        finished = datetime.utcnow()
+        return {
+            "started": self.started.isoformat() + "Z",
+            "finished": finished.isoformat() + "Z",
+            "duration_seconds": round((finished - self.started).total_seconds(), 6),
+            **extra,
+            "phases": phases,
+            "totals": {
+                "requests": sum(h["requests"] for h in hosts.values()),
+                "bytes": sum(h["bytes"] for h in hosts.values()),
+                "retries": sum(sum(h["retries"].values()) for h in hosts.values()),
+                "backoff_seconds": round(sum(h["backoff_seconds"] for h in hosts.values()), 6),
+                "failures": sum(sum(h["failures"].values()) for h in hosts.values()),
+            },
+            "hosts": hosts,
+            "failed_urls": failed_urls,
+        }
+    
+    def to_prometheus(self, sources: Optional[Dict[str, dict]] = None) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        def render(labels: dict) -> str:
+            escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                       for v in labels.values())
+            return ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped))
+        
+        lines = []
+        
+        def metric(name: str, kind: str, help_text: str, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{{{render(labels)}}} {value}" if labels else f"{name} {value}")
+        
+        with self.lock:
+            hosts = sorted(self.hosts.items())
+            name = "fetch_docs_phase_duration_seconds"
+            lines.append(f"# HELP {name} Per-request phase latency by host")
+            lines.append(f"# TYPE {name} histogram")
+            for host, metrics in hosts:
+                for phase, hist in sorted(metrics.phases.items()):
+                    labels = {"host": host, "phase": phase}
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), hist.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f"{name}_bucket{{{render({**labels, 'le': le})}}} {cumulative}")
+                    lines.append(f"{name}_sum{{{render(labels)}}} {round(hist.sum, 6)}")
+                    lines.append(f"{name}_count{{{render(labels)}}} {hist.count}")
             
-        def set_description(self, desc):
-            if not self.disable:
-                print(desc)
-                
-        def close(self):
+            metric("fetch_docs_requests_total", "counter", "HTTP responses by host and status",
+                   [({"host": host, "status": code}, count)
+                    for host, m in hosts for code, count in sorted(m.status.items())])
+            metric("fetch_docs_bytes_total", "counter", "Body bytes received by host",
+                   [({"host": host}, m.bytes) for host, m in hosts])
+            metric("fetch_docs_retries_total", "counter", "Retried attempts by host and reason",
+                   [({"host": host, "reason": reason}, count)
+                    for host, m in hosts for reason, count in sorted(m.retries.items())])
+            metric("fetch_docs_backoff_seconds_total", "counter", "Time spent backing off by host",
+                   [({"host": host}, round(m.backoff, 6)) for host, m in hosts])
+            metric("fetch_docs_failures_total", "counter", "Requests that failed for good by host and reason",
+                   [({"host": host, "reason": reason}, count)
+                    for host, m in hosts for reason, count in sorted(m.failures.items())])
+            metric("fetch_docs_run_phase_seconds", "gauge", "Wall-clock time per run phase",
+                   [({"phase": phase}, round(seconds, 6)) for phase, seconds in sorted(self.run_phases.items())])
+        if sources:
+            metric("fetch_docs_documents", "gauge", "Documents per source by outcome",
+                   [({"source": source, "status": key}, value)
+                    for source, stats in sorted(sources.items())
+                    for key, value in stats.items() if isinstance(value, int)])
+        return "\n".join(lines) + "\n"
+
+
+WATCH_INTERVAL = 900      # default seconds between polls of a source in --watch mode
+WATCH_JITTER = 0.1        # +/- fraction applied to each poll interval
+HTTP_POOL_SIZE = 64       # keep-alive connections kept per host
+EVENT_SEND_TIMEOUT = 1.0  # seconds before a stalled event subscriber is dropped
+
+
+class EventStream:
+    """JSONL event feed for --watch: one JSON object per line.
+    
+    Events go to stream (stdout) or, with socket_path, to every client
+    connected to a Unix socket there. Subscribers that stall or disconnect
+    are dropped; events are not buffered for them.
+    """
+    
+    def __init__(self, stream=None, socket_path: Optional[str] = None):
+        import socket
+        self.stream = stream
+        self.clients: List[socket.socket] = []
+        self.lock = Lock()
+        self.server = None
+        self.socket_path = Path(socket_path) if socket_path else None
+        if self.socket_path is not None:
+            if self.socket_path.is_socket():
+                self.socket_path.unlink()
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server.bind(str(self.socket_path))
+            self.server.listen(16)
+            Thread(target=self.accept_clients, daemon=True).start()
+    
+    def accept_clients(self):
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                return  # server closed
+            client.settimeout(EVENT_SEND_TIMEOUT)
+            with self.lock:
+                self.clients.append(client)
+    
+    def emit(self, event: str, **fields):
+        line = json.dumps({"event": event, "time": datetime.utcnow().isoformat() + "Z", **fields}) + "\n"
+        if self.stream is not None:
+            self.stream.write(line)
+            self.stream.flush()
+        with self.lock:
+            for client in list(self.clients):
+                try:
+                    client.sendall(line.encode('utf-8'))
+                except OSError:
+                    self.clients.remove(client)
+                    client.close()
+    
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+            self.socket_path.unlink(missing_ok=True)
+        with self.lock:
+            for client in self.clients:
+                client.close()
+            self.clients = []
+
+
+class JSONManifestStore:
+    """Manifest kept in memory and written as one JSON file on flush().
+    
+    The original .docs-manifest.json format:
+    {"last_updated": ..., "source": ..., "documents": {name: entry}}.
+    """
+    
+    def __init__(self, manifest_file: str):
+        self.path = Path(manifest_file)
+        self.manifest = {"last_updated": None, "source": None, "documents": {}}
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                self.manifest = json.load(f)
+        self.lock = Lock()
+    
+    def get(self, doc_name: str) -> Optional[dict]:
+        return self.manifest['documents'].get(doc_name)
+    
+    def get_by_url(self, url: str) -> Optional[Tuple[str, dict]]:
+        for doc_name, entry in self.manifest['documents'].items():
+            if entry.get('url') == url:
+                return doc_name, entry
+        return None
+    
+    def names(self) -> List[str]:
+        return list(self.manifest['documents'])
+    
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        return iter(list(self.manifest['documents'].items()))
+    
+    def put(self, doc_name: str, entry: dict):
+        with self.lock:
+            self.manifest['documents'][doc_name] = entry
+    
+    def update(self, doc_name: str, fields: dict):
+        with self.lock:
+            self.manifest['documents'].setdefault(doc_name, {}).update(fields)
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        return self.manifest.get(key)
+    
+    def set_meta(self, key: str, value: Optional[str]):
+        with self.lock:
+            self.manifest[key] = value
+    
+    def to_dict(self) -> dict:
+        return self.manifest
+    
+    def flush(self):
+        """Write the JSON file atomically (temp file + rename)."""
+        export_manifest_json(self.path, self.to_dict())
+    
+    def close(self):
+        pass
+
+
+class SQLiteManifestStore:
+    """Transactional manifest in SQLite, committed one document at a time.
+    
+    Each put()/update() is its own transaction, so a crash mid-sync keeps every
+    hash recorded so far and the next run resumes from there. Documents are
+    indexed by name (primary key) and URL. On first use the existing JSON
+    manifest is imported; flush() exports it back in the same format so the
+    committed .docs-manifest.json stays current. The JSON file's stamp
+    (mtime and size) is kept after every import and export; if the file no
+    longer matches it, something else wrote it since (a JSON-backend run, a
+    git checkout) and it replaces the database contents on open.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS documents (
+            name TEXT PRIMARY KEY,
+            url TEXT,
+            hash TEXT,
+            last_fetched TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS documents_url ON documents (url);
+    """
+    
+    def __init__(self, manifest_file: str, db_file: Optional[str] = None):
+        self.json_path = Path(manifest_file)
+        self.path = Path(db_file) if db_file else self.json_path.with_suffix('.sqlite')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = Lock()
+        import sqlite3
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(self.SCHEMA)
+        if self.json_path.exists() and self.json_stamp() != self.get_meta('json_stamp'):
+            with open(self.json_path, 'r') as f:
+                self.import_dict(json.load(f))
+            self.set_meta('json_stamp', self.json_stamp())
+    
+    def json_stamp(self) -> Optional[str]:
+        """mtime and size of the JSON manifest, None if there is none."""
+        try:
+            stat = self.json_path.stat()
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+    
+    def import_dict(self, manifest: dict):
+        """Replace the contents with a manifest in the JSON format, in one transaction."""
+        with self.lock, self.conn:
+            for key in ('last_updated', 'source'):
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, manifest.get(key)))
+            self.conn.execute("DELETE FROM documents")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+                [self._row(name, entry) for name, entry in manifest.get('documents', {}).items()]
+            )
+    
+    def _row(self, doc_name: str, entry: dict) -> tuple:
+        return (doc_name, entry.get('url'), entry.get('hash'), entry.get('last_fetched'), json.dumps(entry))
+    
+    def get(self, doc_name: str) -> Optional[dict]:
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM documents WHERE name = ?", (doc_name,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def get_by_url(self, url: str) -> Optional[Tuple[str, dict]]:
+        with self.lock:
+            row = self.conn.execute("SELECT name, data FROM documents WHERE url = ?", (url,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+    
+    def names(self) -> List[str]:
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT name FROM documents ORDER BY name")]
+    
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        with self.lock:
+            rows = self.conn.execute("SELECT name, data FROM documents ORDER BY name").fetchall()
+        return ((name, json.loads(data)) for name, data in rows)
+    
+    def put(self, doc_name: str, entry: dict):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)", self._row(doc_name, entry))
+    
+    def update(self, doc_name: str, fields: dict):
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT data FROM documents WHERE name = ?", (doc_name,)).fetchone()
+            entry = {**(json.loads(row[0]) if row else {}), **fields}
+            self.conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)", self._row(doc_name, entry))
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def set_meta(self, key: str, value: Optional[str]):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+    
+    def to_dict(self) -> dict:
+        return {
+            "last_updated": self.get_meta('last_updated'),
+            "source": self.get_meta('source'),
+            "documents": dict(self.items())
+        }
+    
+    def flush(self):
+        """Export the JSON manifest so the committed file stays current."""
+        export_manifest_json(self.json_path, self.to_dict())
+        self.set_meta('json_stamp', self.json_stamp())
+    
+    def close(self):
+        self.conn.close()
+
+
+MANIFEST_BACKENDS = {'json': JSONManifestStore, 'sqlite': SQLiteManifestStore}
+
+
+def export_manifest_json(manifest_file, manifest: dict):
+    """Atomically write a manifest dict in the .docs-manifest.json format."""
+    manifest_path = Path(manifest_file)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    fd, temp_path = tempfile.mkstemp(dir=manifest_path.parent, prefix=f".{manifest_path.name}.", suffix=".tmp")
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.chmod(temp_path, 0o666 & ~UMASK)
+    os.replace(temp_path, manifest_path)
+
+
+class BlobStore:
+    """Content-addressed store of document bodies keyed by their SHA256.
+    
+    Blobs live under objects/<first two hex digits>/<hash><ext> and are
+    compressed with zstd (".zst", needs zstandard), gzip (".gz") or stored
+    as-is (compression "none"). Identical content is stored once however many
+    documents or sources share it. With compression "none", working copies
+    are hard links to their (read-only) blob, so the current version costs
+    no extra disk; the fetcher always replaces working copies by rename,
+    never in place. Otherwise working copies are ordinary files.
+    
+    Each document also gets a compact revision log, one
+    "<fetched> <hash> <size>" line per distinct version, under
+    revisions/<source>/<doc_name>.log.
+    """
+    
+    EXTENSIONS = {'zstd': '.zst', 'gzip': '.gz', 'none': ''}
+    
+    def __init__(self, root: str, compression: Optional[str] = None):
+        if compression is None:
+            compression = 'zstd' if ZSTD_AVAILABLE else 'gzip'
+        if compression not in self.EXTENSIONS:
+            raise ValueError(f"Unknown blob compression: {compression}")
+        if compression == 'zstd' and not ZSTD_AVAILABLE:
+            print("Note: zstandard not installed, compressing blobs with gzip: pip install zstandard")
+            compression = 'gzip'
+        self.root = Path(root)
+        self.compression = compression
+        (self.root / 'objects').mkdir(parents=True, exist_ok=True)
+    
+    def blob_path(self, content_hash: str, compression: Optional[str] = None) -> Path:
+        extension = self.EXTENSIONS[compression or self.compression]
+        return self.root / 'objects' / content_hash[:2] / f"{content_hash}{extension}"
+    
+    def find(self, content_hash: str) -> Optional[Path]:
+        """Return the path of the stored blob, whichever compression it was written with."""
+        for compression in (self.compression, *self.EXTENSIONS):
+            path = self.blob_path(content_hash, compression)
+            if path.exists():
+                return path
+        return None
+    
+    def has(self, content_hash: str) -> bool:
+        return self.find(content_hash) is not None
+    
+    def put_file(self, path: Path, content_hash: str) -> bool:
+        """Store the file's content under content_hash; returns False if already stored."""
+        if self.has(content_hash):
+            return False
+        target = self.blob_path(content_hash)
+        target.parent.mkdir(exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        try:
+            with open(path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                if self.compression == 'zstd':
+                    zstandard.ZstdCompressor().copy_stream(src, dst)
+                elif self.compression == 'gzip':
+                    import gzip
+                    with gzip.GzipFile(fileobj=dst, mode='wb', mtime=0) as compressed:
+                        while chunk := src.read(CHUNK_SIZE):
+                            compressed.write(chunk)
+                else:
+                    while chunk := src.read(CHUNK_SIZE):
+                        dst.write(chunk)
+            os.chmod(temp_path, 0o444)
+            os.replace(temp_path, target)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        return True
+    
+    def read(self, content_hash: str) -> bytes:
+        """Return the uncompressed content of a blob."""
+        path = self.find(content_hash)
+        if path is None:
+            raise KeyError(content_hash)
+        data = path.read_bytes()
+        if path.suffix == '.zst':
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("zstandard is needed to read .zst blobs: pip install zstandard")
+            return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        if path.suffix == '.gz':
+            import gzip
+            return gzip.decompress(data)
+        return data
+    
+    def link_working_copy(self, path: Path, content_hash: str):
+        """Replace a working copy with a hard link to its uncompressed blob, if possible."""
+        blob = self.blob_path(content_hash, 'none')
+        if not blob.exists() or os.path.samefile(blob, path):
+            return
+        temp_path = path.with_name(f".{path.name}.link")
+        try:
+            temp_path.unlink(missing_ok=True)
+            os.link(blob, temp_path)
+            os.replace(temp_path, path)
+        except OSError:
+            # Different filesystem or no hard link support: keep the plain copy
+            temp_path.unlink(missing_ok=True)
+    
+    def materialize(self, content_hash: str, path: Path):
+        """Write a blob's content to path as a working copy."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with StreamingDocumentWriter(path) as sink:
+            sink.write(self.read(content_hash))
+            sink.commit(None)
+        if self.compression == 'none':
+            self.link_working_copy(path, content_hash)
+    
+    def log_path(self, source_name: str, doc_name: str) -> Path:
+        return self.root / 'revisions' / source_name / f"{doc_name}.log"
+    
+    def revisions(self, source_name: str, doc_name: str) -> List[Dict[str, str]]:
+        """Return a document's revisions, oldest first."""
+        path = self.log_path(source_name, doc_name)
+        if not path.exists():
+            return []
+        revisions = []
+        for line in path.read_text().splitlines():
+            fetched, content_hash, size = line.split()
+            revisions.append({"fetched": fetched, "hash": content_hash, "size": int(size)})
+        return revisions
+    
+    def add_revision(self, source_name: str, doc_name: str, path: Path, content_hash: str,
+                     fetched: Optional[str] = None) -> bool:
+        """Store a fetched working copy and log it if it differs from the last revision."""
+        self.put_file(path, content_hash)
+        if self.compression == 'none':
+            self.link_working_copy(path, content_hash)
+        
+        log_path = self.log_path(source_name, doc_name)
+        revisions = self.revisions(source_name, doc_name)
+        if revisions and revisions[-1]['hash'] == content_hash:
+            return False
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        fetched = fetched or datetime.utcnow().isoformat() + "Z"
+        with open(log_path, 'a') as f:
+            f.write(f"{fetched} {content_hash} {path.stat().st_size}\n")
+        return True
+    
+    def resolve(self, source_name: str, doc_name: str, ref: str) -> str:
+        """Resolve a revision reference: an index (-1 is the latest) or a hash prefix."""
+        revisions = self.revisions(source_name, doc_name)
+        if not revisions:
+            raise KeyError(f"No revisions recorded for {doc_name}")
+        try:
+            return revisions[int(ref)]['hash']
+        except IndexError:
+            raise KeyError(f"{doc_name} has only {len(revisions)} revisions")
+        except ValueError:
             pass
-            
-        def __enter__(self):
-            return self
-            
-        def __exit__(self, *args):
-            self.close()
+        matches = {r['hash'] for r in revisions if r['hash'].startswith(ref.lower())}
+        if len(matches) != 1:
+            raise KeyError(f"Revision {ref!r} of {doc_name} is {'ambiguous' if matches else 'unknown'}")
+        return matches.pop()
+
+
+class SourceRun:
+    """State of one source during a sync: its work list, manifest store and tallies."""
+    
+    def __init__(self, source: dict, manifest, incremental: bool, blobs: Optional[BlobStore] = None):
+        self.source = source
+        self.name = source['name']
+        self.manifest = manifest
+        self.blobs = blobs
+        self.incremental = incremental
+        self.output_dir = Path(source['output_dir'])
+        self.normalizer = DocumentNormalizer.from_source(source)
+        self.docs_to_process: List[Tuple[str, str, Optional[str], Dict[str, str], dict]] = []
+        self.sitemap_meta: Dict[str, Dict[str, str]] = {}
+        self.matching_urls = 0
+        self.stats = {"updated": 0, "unchanged": 0, "failed": 0, "normalized": 0}
+        self.manifest_dirty = False
 
 
 class DocumentationFetcher:
-    def __init__(self, config_file: str = "docs-config.json", max_workers: int = 5, max_retries: int = 3):
+    def __init__(self, config_file: str = "docs-config.json", max_workers: int = 5, max_retries: int = 3,
+                 concurrency: int = 100):
         """Initialize with configuration file."""
         self.config_file = Path(__file__).parent / config_file
         self.max_workers = max_workers
         self.max_retries = max_retries
-        self.manifest_lock = Lock()
+        self.concurrency = concurrency
+        self.limiters: Dict[str, HostRateLimiter] = {}
+        self.limiter_settings: Dict[str, dict] = {}
+        self.limiters_lock = Lock()
+        self.metrics = FetchMetrics()
+        self.blob_stores: Dict[str, BlobStore] = {}
         self.config = self.load_config()
         
+        # One pooled session (see session), so requests to a host reuse keep-alive connections
+        self._session = None
+        self.session_lock = Lock()
+        
+        # Set by enable_keep_alive() for --watch: state kept between syncs
+        self.keep_alive = False
+        self.event_loop: Optional["asyncio.AbstractEventLoop"] = None
+        self.async_session = None
+        self.manifests: Dict[str, object] = {}
+        self.sitemap_cache: Optional[Dict[str, tuple]] = None
+        self.on_document: Optional[Callable] = None
+    
     def load_config(self) -> dict:
         """Load configuration from JSON file."""
         if not self.config_file.exists():
@@ -89,63 +1318,384 @@ class DocumentationFetcher:
                 source.setdefault('max_workers', self.max_workers)
                 source.setdefault('max_retries', self.max_retries)
                 source.setdefault('retry_delay', 1.0)
+                source.setdefault('incremental', False)
+                source.setdefault('engine', 'thread')
+                source.setdefault('concurrency', self.concurrency)
+                source.setdefault('rate_limit', {})
+                source.setdefault('manifest_backend', 'json')
+                source.setdefault('blob_store', None)
+                source.setdefault('normalize', True)
+                source.setdefault('watch_interval', WATCH_INTERVAL)
             return config
     
-    def fetch_with_retry(self, url: str, timeout: int = 30) -> Optional[requests.Response]:
-        """Fetch URL with retry logic and exponential backoff."""
+    @property
+    def session(self) -> "requests.Session":
+        """The pooled HTTP session, created on first use so offline commands skip importing requests."""
+        if self._session is None:
+            with self.session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE,
+                                                            pool_maxsize=HTTP_POOL_SIZE)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+    
+    def enable_keep_alive(self):
+        """Keep connections, manifests, the asyncio loop and parsed sitemaps
+        between syncs (for --watch). Call close() when done."""
+        self.keep_alive = True
+        self.event_loop = asyncio.new_event_loop()
+        self.sitemap_cache = {}
+    
+    def run_coroutine(self, coroutine):
+        """Run a coroutine on the kept event loop, or on a fresh one."""
+        if self.event_loop is not None:
+            return self.event_loop.run_until_complete(coroutine)
+        return asyncio.run(coroutine)
+    
+    def close(self):
+        """Release pooled connections and kept manifests."""
+        if self.async_session is not None:
+            self.event_loop.run_until_complete(self.async_session.close())
+            self.async_session = None
+        if self.event_loop is not None:
+            self.event_loop.close()
+            self.event_loop = None
+        for manifest in self.manifests.values():
+            manifest.close()
+        self.manifests = {}
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+    
+    def configure_hosts(self, urls: List[str], rate_limit: dict):
+        """Apply a source's rate_limit settings to every host in urls.
+        
+        The first source to configure a host wins; limiters already created keep
+        their state so concurrent sources share one limiter per host.
+        """
+        with self.limiters_lock:
+            for host in {urlparse(url).netloc for url in urls}:
+                self.limiter_settings.setdefault(host, rate_limit)
+    
+    def get_limiter(self, url: str) -> HostRateLimiter:
+        """Return the shared limiter for the host of url, creating it on first use."""
+        host = urlparse(url).netloc
+        with self.limiters_lock:
+            limiter = self.limiters.get(host)
+            if limiter is None:
+                settings = dict(self.limiter_settings.get(host, {}))
+                settings.setdefault('max_concurrency', max(self.max_workers, self.concurrency))
+                limiter = self.limiters[host] = HostRateLimiter(**settings)
+            return limiter
+    
+    def fetch_with_retry(self, url: str, timeout: int = 30,
+                         headers: Optional[Dict[str, str]] = None,
+                         sink: Optional[StreamingDocumentWriter] = None,
+                         method: str = 'GET', stream: bool = False,
+                         passthrough: Tuple[int, ...] = ()) -> Optional["requests.Response"]:
+        """Fetch URL with retry logic and exponential backoff.
+        
+        Requests go through the host's shared HostRateLimiter; a 429/503 pauses
+        every worker for that host instead of only this thread. Other client
+        errors (4xx) are not retried. A 304 Not Modified response is returned
+        as-is (it has no body), as are responses with a status in passthrough,
+        which the caller handles itself (not counted as failures). With a sink, the body is streamed into it in
+        chunks instead of being kept on the response; with stream=True it is
+        left unread for the caller.
+        """
+        limiter = self.get_limiter(url)
+        metrics = self.metrics
         delay = 1.0
         last_error = None
         
         for attempt in range(self.max_retries):
+            started = time.perf_counter()
+            limiter.acquire()
+            sent = time.perf_counter()
+            metrics.observe(url, 'wait', sent - started)
             try:
-                response = requests.get(url, timeout=timeout)
-                response.raise_for_status()
+                response = self.session.request(method, url, timeout=timeout, headers=headers,
+                                                stream=stream or sink is not None)
+                metrics.observe(url, 'ttfb', time.perf_counter() - sent)
+                if response.status_code in THROTTLE_STATUSES:
+                    # The limiter enforces the pause before the next attempt
+                    response.close()
+                    metrics.response(url, response.status_code)
+                    pause = limiter.throttle(parse_retry_after(response.headers.get('Retry-After')))
+                    last_error = requests.HTTPError(f"{response.status_code} throttled", response=response)
+                    metrics.retry(url, failure_reason(last_error), pause)
+                    continue
+                if response.status_code not in passthrough:
+                    response.raise_for_status()
+                nbytes = 0
+                if sink is not None and response.status_code != 304:
+                    body_started = time.perf_counter()
+                    sink.reset()
+                    with response:
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            sink.write(chunk)
+                    nbytes = sink.size
+                    metrics.observe(url, 'body', time.perf_counter() - body_started)
+                elif response.status_code == 304 or (not stream and sink is None):
+                    # Reading the (empty) 304 body lets the connection go back to the pool
+                    nbytes = len(response.content)
+                metrics.response(url, response.status_code, nbytes)
+                metrics.observe(url, 'request', time.perf_counter() - sent)
+                limiter.success()
                 return response
             except requests.RequestException as e:
                 last_error = e
+                status = e.response.status_code if e.response is not None else None
+                if status:
+                    metrics.response(url, status)
+                if not is_retryable(status):
+                    break  # Retrying will not fix a client error
                 if attempt < self.max_retries - 1:
-                    time.sleep(delay)
+                    backoff = jittered(delay)
+                    metrics.retry(url, failure_reason(e), backoff)
+                    time.sleep(backoff)
                     delay *= 2  # Exponential backoff
-                    
+            finally:
+                limiter.release()
+        
         # All retries failed
+        if last_error is not None:
+            metrics.failure(url, failure_reason(last_error))
         return None
     
+    def count_bytes(self, url: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """Pass chunks through, adding their size to the host's byte count."""
+        for chunk in chunks:
+            self.metrics.add_bytes(url, len(chunk))
+            yield chunk
+    
     def fetch_sitemap(self, url: str) -> List[str]:
         """Fetch and parse sitemap XML to get all URLs."""
-        response = self.fetch_with_retry(url)
+        return [entry['loc'] for entry in self.fetch_sitemap_entries(url)]
+    
+    def fetch_sitemap_entries(self, url: str) -> List[Dict[str, str]]:
+        """Fetch and parse sitemap XML, keeping lastmod/changefreq/priority per URL."""
+        return list(self.iter_sitemap_entries(url))
+    
+    def iter_sitemap_entries(self, url: str) -> Iterator[Dict[str, str]]:
+        """Yield sitemap entries as they are parsed, following sitemap indexes.
+        
+        Child sitemaps of a <sitemapindex> are read concurrently (up to
+        SITEMAP_MAX_DEPTH levels) and their entries are interleaved through a
+        bounded queue, so memory stays flat however large the site is.
+        """
+        results = queue.Queue(maxsize=SITEMAP_QUEUE_SIZE)
+        cancelled = Event()
+        done = object()
+        lock = Lock()
+        outstanding = 1
+        
+        def put(item):
+            # Give up if the consumer stopped iterating
+            while not cancelled.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def crawl(sitemap_url: str, depth: int):
+            nonlocal outstanding
+            try:
+                for kind, entry in self.parse_sitemap(sitemap_url):
+                    if kind == 'url':
+                        if not put(entry):
+                            return
+                    elif depth < SITEMAP_MAX_DEPTH:
+                        with lock:
+                            outstanding += 1
+                        executor.submit(crawl, entry['loc'], depth + 1)
+            finally:
+                put(done)
+        
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            executor.submit(crawl, url, 0)
+            finished = 0
+            while True:
+                item = results.get()
+                if item is done:
+                    finished += 1
+                    with lock:
+                        if finished == outstanding:
+                            return
+                    continue
+                yield item
+        finally:
+            cancelled.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def parse_sitemap(self, url: str) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """Stream-parse one sitemap file, yielding ('url', entry) or ('sitemap', entry).
+        
+        The body is fed to an incremental XML parser chunk by chunk and each
+        element is cleared once handled. Gzipped sitemaps (.xml.gz) are
+        decompressed on the fly, whether or not the server marks them with
+        Content-Encoding. With the sitemap cache enabled (--watch), the sitemap
+        is revalidated with its ETag / Last-Modified and a 304 replays the
+        entries parsed last time.
+        """
+        cached = self.sitemap_cache.get(url) if self.sitemap_cache is not None else None
+        response = self.fetch_with_retry(url, headers=self.conditional_headers(cached and cached[0]), stream=True)
         if not response:
-            print(f"Error: Failed to fetch sitemap from {url} after {self.max_retries} attempts")
-            return []
+            reason = self.metrics.failure_for(url)
+            print(f"Error: Failed to fetch sitemap from {url} after {self.max_retries} attempts"
+                  + (f" ({reason})" if reason else ""))
+            return
+        if response.status_code == 304 and cached:
+            yield from cached[1]
+            return
+        entries = [] if self.sitemap_cache is not None else None
         
-        # Parse XML
+        # Parse XML; tags may or may not carry the sitemap namespace
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        root = None
         try:
-            root = ET.fromstring(response.content)
-            # Handle namespace in sitemap
-            namespace = {'sm': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-            urls = []
-            
-            # Try with namespace first
-            loc_elements = root.findall('.//sm:loc', namespace)
-            if not loc_elements:
-                # Try without namespace
-                loc_elements = root.findall('.//loc')
-            
-            for loc in loc_elements:
-                if loc.text:
-                    urls.append(loc.text)
-            
-            return urls
-        except ET.ParseError as e:
-            print(f"Error parsing sitemap XML: {e}")
-            return []
+            with response:
+                for piece in iter_decompressed(self.count_bytes(url, response.iter_content(CHUNK_SIZE))):
+                    parser.feed(piece)
+                    for event, element in parser.read_events():
+                        if root is None:
+                            root = element
+                        if event != 'end':
+                            continue
+                        tag = element.tag.rpartition('}')[2]
+                        if tag not in ('url', 'sitemap'):
+                            continue
+                        
+                        entry = {}
+                        for child in element:
+                            field = child.tag.rpartition('}')[2]
+                            if child.text and (field == 'loc' or field in SITEMAP_FIELDS):
+                                entry[field] = child.text.strip()
+                        element.clear()
+                        root.clear()
+                        if entry.get('loc'):
+                            if entries is not None:
+                                entries.append((tag, entry))
+                            yield tag, entry
+                parser.close()
+            validators = self.get_validators(response)
+            if entries is not None and validators:
+                self.sitemap_cache[url] = (validators, entries)
+        except (ET.ParseError, zlib.error, requests.exceptions.RequestException) as e:
+            print(f"Error parsing sitemap XML from {url}: {e}")
     
     def filter_urls(self, urls: List[str], pattern: str) -> List[str]:
         """Filter URLs based on pattern."""
         return [url for url in urls if pattern in url]
     
-    def get_document_hash(self, content: str) -> str:
-        """Generate SHA256 hash of document content."""
-        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    def build_doc_index(self, urls: List[str], url_pattern: str,
+                        known_urls: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Map each sitemap URL to a unique document name in one pass.
+        
+        The name is the last path segment after url_pattern. When several URLs
+        share a last segment (nested pages such as sdk/overview and overview),
+        the URL already recorded under that name in the manifest (known_urls:
+        name -> url) keeps it, else the top-level page does; the others are
+        named after their full relative path with '/' replaced by '-'.
+        """
+        by_leaf: Dict[str, List[Tuple[str, str]]] = {}
+        for url in urls:
+            _, found, doc_part = url.partition(url_pattern)
+            doc_path = doc_part.strip('/') if found else ''
+            if doc_path:
+                by_leaf.setdefault(doc_path.split('/')[-1], []).append((url, doc_path))
+        
+        known_urls = known_urls or {}
+        index = {}
+        taken = set()
+        for leaf, candidates in by_leaf.items():
+            if len(candidates) == 1:
+                index[candidates[0][0]] = leaf
+                taken.add(leaf)
+                continue
+            owner = next((url for url, _ in candidates if known_urls.get(leaf) == url), None)
+            if owner is None:
+                owner = next((url for url, doc_path in candidates if doc_path == leaf), None)
+            if owner is not None:
+                index[owner] = leaf
+                taken.add(leaf)
+        
+        # Name the remaining colliding URLs after their full relative path
+        for leaf, candidates in by_leaf.items():
+            for url, doc_path in candidates:
+                if url in index:
+                    continue
+                doc_name = base_name = doc_path.replace('/', '-')
+                suffix = 2
+                while doc_name in taken or doc_name in by_leaf:
+                    doc_name = f"{base_name}-{suffix}"
+                    suffix += 1
+                index[url] = doc_name
+                taken.add(doc_name)
+        
+        return index
+    
+    def sitemap_metadata(self, entry: Dict[str, str]) -> Dict[str, str]:
+        """Return the sitemap fields (lastmod, changefreq, priority) of an entry."""
+        return {field: entry[field] for field in SITEMAP_FIELDS if field in entry}
+    
+    def is_stale(self, entry: Dict[str, str], doc: Optional[dict]) -> bool:
+        """Decide from sitemap <lastmod> whether a known document needs fetching.
+        
+        Returns False only when lastmod proves the stored copy is current, i.e. it
+        matches the lastmod already recorded or is not newer than last_fetched.
+        Without a usable lastmod the document is treated as stale so the normal
+        revalidation and hashing path decides.
+        """
+        if not doc or not doc.get('hash'):
+            return True
+        lastmod = entry.get('lastmod')
+        if not lastmod:
+            return True
+        if lastmod == doc.get('lastmod'):
+            return False
+        modified = parse_w3c_datetime(lastmod)
+        fetched = parse_w3c_datetime(doc.get('last_fetched'))
+        if modified is None or fetched is None:
+            return True
+        return modified > fetched
+    
+    def get_document_hash(self, content: Union[str, bytes]) -> str:
+        """Generate SHA256 hash of document content.
+        
+        Pass the raw body where there is one: the manifest hashes the bytes as
+        served, and text decoded by requests (ISO-8859-1 for a charset-less
+        text/*) does not round-trip for non-ASCII documents.
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        return hashlib.sha256(content).hexdigest()
+    
+    def get_validators(self, response: "requests.Response") -> Dict[str, str]:
+        """Extract cache validators (ETag / Last-Modified) from a response."""
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['etag'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['last_modified'] = response.headers['Last-Modified']
+        return validators
+    
+    def conditional_headers(self, validators: Optional[Dict[str, str]]) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers from stored validators."""
+        headers = {}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        return headers
     
     def load_manifest(self, manifest_file: str) -> dict:
         """Load manifest file if it exists."""
@@ -161,192 +1711,652 @@ class DocumentationFetcher:
     
     def save_manifest(self, manifest_file: str, manifest: dict):
         """Save manifest file."""
-        manifest_path = Path(manifest_file)
-        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        export_manifest_json(manifest_file, manifest)
+    
+    def open_manifest(self, source: dict):
+        """Open the source's manifest store (JSON file or SQLite, see manifest_backend)."""
+        backend = source.get('manifest_backend', 'json')
+        if backend not in MANIFEST_BACKENDS:
+            print(f"Error: Unknown manifest backend '{backend}' (choose from {', '.join(MANIFEST_BACKENDS)})")
+            sys.exit(1)
+        if self.keep_alive and source['name'] in self.manifests:
+            return self.manifests[source['name']]
+        if backend == 'sqlite':
+            store = SQLiteManifestStore(source['manifest_file'], source.get('manifest_db'))
+        else:
+            store = JSONManifestStore(source['manifest_file'])
+        if self.keep_alive:
+            self.manifests[source['name']] = store
+        return store
+    
+    def open_blob_store(self, source: dict) -> Optional[BlobStore]:
+        """Return the source's blob store, or None if it has none configured.
         
-        with open(manifest_path, 'w') as f:
-            json.dump(manifest, f, indent=2)
+        Sources naming the same blob_store path share one store, so identical
+        pages across sources are stored once.
+        """
+        root = source.get('blob_store')
+        if not root:
+            return None
+        store = self.blob_stores.get(root)
+        if store is None:
+            store = self.blob_stores[root] = BlobStore(root, source.get('blob_compression'))
+        return store
     
     def fetch_markdown(self, url: str, verbose: bool = False) -> Optional[str]:
         """Fetch markdown content from URL by appending .md."""
+        response = self.fetch_markdown_response(url, verbose)
+        if response is not None and response.status_code != 304:
+            return response.text
+        return None
+    
+    def fetch_markdown_response(self, url: str, verbose: bool = False,
+                                validators: Optional[Dict[str, str]] = None,
+                                sink: Optional[StreamingDocumentWriter] = None) -> Optional["requests.Response"]:
+        """Fetch the markdown response for URL, conditionally if validators are given."""
         markdown_url = url.rstrip('/') + '.md'
         
-        response = self.fetch_with_retry(markdown_url)
-        if response:
-            return response.text
-        else:
-            if verbose:
-                print(f"  Failed to fetch {markdown_url} after {self.max_retries} attempts")
-            return None
+        response = self.fetch_with_retry(markdown_url, headers=self.conditional_headers(validators), sink=sink)
+        if response is None and verbose:
+            reason = self.metrics.failure_for(markdown_url)
+            print(f"  Failed to fetch {markdown_url} after {self.max_retries} attempts"
+                  + (f" ({reason})" if reason else ""))
+        return response
+    
+    def resolve_document(self, doc_name: str, response, sink: StreamingDocumentWriter,
+                         existing_hash: Optional[str], dry_run: bool,
+                         normalizer: Optional[DocumentNormalizer] = None,
+                         semantic: Optional[dict] = None
+                         ) -> Tuple[str, str, Optional[str], Dict[str, str]]:
+        """Turn a response whose body was streamed into sink into a result.
+        
+        Works with both requests.Response and FetchedResponse. Only metadata is
+        returned; the content itself never leaves the sink. With a normalizer,
+        a body whose raw hash changed but whose semantic hash (see
+        DocumentNormalizer) matches semantic['semantic_hash'], recorded for the
+        working copy (semantic['semantic_of'] == existing_hash), is cosmetic churn:
+        it is reported unchanged and the document is not rewritten. Updates
+        carry the semantic hash, section hashes and the section delta.
+        """
+        if response is None:
+            sink.discard()
+            return doc_name, "failed", None, {}
+        if response.status_code == 304:
+            sink.discard()
+            return doc_name, "unchanged", existing_hash, {}
+        
+        # Record the body size too; --check compares it with Content-Length
+        new_validators = {**self.get_validators(response), 'size': sink.size}
+        semantic = semantic or {}
+        if normalizer is not None:
+            semantic_hash, sections = sink.digest.finish()
+            new_validators['semantic_hash'] = semantic_hash
+            new_validators['sections'] = sections
+            # semantic_of names the raw hash the stored semantic hash was computed
+            # from; if that is not the working copy (e.g. after a rollback), the
+            # match says nothing about what is on disk
+            if (existing_hash and sink.hasher.hexdigest() != existing_hash
+                    and semantic.get('semantic_of') == existing_hash
+                    and new_validators['semantic_hash'] == semantic.get('semantic_hash')):
+                sink.discard()
+                return doc_name, "unchanged", existing_hash, {**new_validators, 'normalized': True}
+            if semantic.get('sections'):
+                new_validators['delta'] = section_delta(semantic['sections'], sections)
+        changed, new_hash = sink.commit(existing_hash)
+        if normalizer is not None:
+            new_validators['semantic_of'] = new_hash
+        if not changed:
+            # Unchanged, but keep the validators so the next run gets a 304
+            new_validators.pop('delta', None)
+            return doc_name, "unchanged", new_hash, new_validators
+        # New or changed content; in a dry run the sink wrote nothing
+        if dry_run:
+            return doc_name, "would_update", None, {}
+        return doc_name, "updated", new_hash, new_validators
     
     def process_document(self, url: str, doc_name: str, output_dir: Path, 
                         existing_hash: Optional[str], force: bool, 
-                        dry_run: bool, verbose: bool) -> Tuple[str, str, Optional[str], Optional[str]]:
-        """Process a single document. Returns (doc_name, status, content, hash)."""
-        
-        # Check if we need to fetch
-        if not force and existing_hash:
-            # Fetch to check if changed
-            content = self.fetch_markdown(url, verbose)
-            if content:
-                new_hash = self.get_document_hash(content)
-                if new_hash == existing_hash:
-                    return doc_name, "unchanged", None, None
-                else:
-                    # Content changed, need to update
-                    if not dry_run:
-                        doc_path = output_dir / f"{doc_name}.md"
-                        with open(doc_path, 'w', encoding='utf-8') as f:
-                            f.write(content)
-                        return doc_name, "updated", content, new_hash
-                    else:
-                        return doc_name, "would_update", None, None
-            else:
-                return doc_name, "failed", None, None
+                        dry_run: bool, verbose: bool,
+                        validators: Optional[Dict[str, str]] = None,
+                        normalizer: Optional[DocumentNormalizer] = None,
+                        semantic: Optional[dict] = None
+                        ) -> Tuple[str, str, Optional[str], Dict[str, str]]:
+        """Process a single document.
+        
+        Returns (doc_name, status, hash, validators). When the document is
+        already known, stored validators are sent as conditional headers and a
+        304 response is reported as "unchanged" without reading a body. The body
+        is hashed and spooled to disk in one streaming pass, and the document is
+        only replaced when its hash changed.
+        """
         
         # Need to fetch (new or forced)
-        if dry_run:
-            return doc_name, "would_update", None, None
-        else:
-            content = self.fetch_markdown(url, verbose)
-            if content:
-                # Save content
-                doc_path = output_dir / f"{doc_name}.md"
-                with open(doc_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                new_hash = self.get_document_hash(content)
-                return doc_name, "updated", content, new_hash
-            else:
-                return doc_name, "failed", None, None
+        if force or not existing_hash:
+            if dry_run:
+                return doc_name, "would_update", None, {}
+            existing_hash, validators = None, None
+        
+        # Known documents are revalidated; the server answers 304 if nothing changed
+        with StreamingDocumentWriter(None if dry_run else output_dir / f"{doc_name}.md",
+                                     normalizer) as sink:
+            response = self.fetch_markdown_response(url, verbose, validators, sink)
+            started = time.perf_counter()
+            result = self.resolve_document(doc_name, response, sink, existing_hash, dry_run,
+                                           normalizer, semantic)
+        self.metrics.observe(url, 'write', time.perf_counter() - started)
+        return result
     
-    def process_source(self, source: dict, force: bool = False, dry_run: bool = False, 
-                      verbose: bool = False, disable_progress: bool = False) -> dict:
-        """Process a single documentation source with parallel fetching."""
-        name = source['name']
-        sitemap_url = source['sitemap']
-        url_pattern = source['url_pattern']
-        output_dir = Path(source['output_dir'])
-        manifest_file = source['manifest_file']
-        fetch_markdown = source.get('fetch_markdown', True)
-        max_workers = source.get('max_workers', self.max_workers)
+    async def fetch_with_retry_async(self, session: "aiohttp.ClientSession", url: str, timeout: int = 30,
+                                     headers: Optional[Dict[str, str]] = None,
+                                     sink: Optional[StreamingDocumentWriter] = None
+                                     ) -> Optional[FetchedResponse]:
+        """Async counterpart of fetch_with_retry using a shared aiohttp session.
         
-        print(f"\nProcessing: {name}")
-        print(f"  Sitemap: {sitemap_url}")
-        print(f"  Pattern: {url_pattern}")
-        print(f"  Max workers: {max_workers}")
+        Retries follow the same is_retryable() rule. With a sink, the body is
+        streamed into it and the returned content is empty.
+        """
+        limiter = self.get_limiter(url)
+        metrics = self.metrics
+        delay = 1.0
+        last_error = None
         
-        # Load existing manifest
-        manifest = self.load_manifest(manifest_file)
-        manifest['source'] = sitemap_url
+        for attempt in range(self.max_retries):
+            started = time.perf_counter()
+            await limiter.acquire_async()
+            sent = time.perf_counter()
+            metrics.observe(url, 'wait', sent - started)
+            try:
+                async with session.get(url, headers=headers,
+                                       timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    metrics.observe(url, 'ttfb', time.perf_counter() - sent)
+                    if response.status in THROTTLE_STATUSES:
+                        # The limiter enforces the pause before the next attempt
+                        metrics.response(url, response.status)
+                        pause = limiter.throttle(parse_retry_after(response.headers.get('Retry-After')))
+                        last_error = f"HTTP {response.status}"
+                        metrics.retry(url, last_error, pause)
+                        continue
+                    response.raise_for_status()
+                    content = b''
+                    nbytes = 0
+                    body_started = time.perf_counter()
+                    if sink is None:
+                        content = await response.read()
+                        nbytes = len(content)
+                    elif response.status != 304:
+                        sink.reset()
+                        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                            sink.write(chunk)
+                        nbytes = sink.size
+                    if nbytes:
+                        metrics.observe(url, 'body', time.perf_counter() - body_started)
+                    metrics.response(url, response.status, nbytes)
+                    metrics.observe(url, 'request', time.perf_counter() - sent)
+                    limiter.success()
+                    return FetchedResponse(response.status, response.headers, content,
+                                           response.charset or 'utf-8')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = failure_reason(e)
+                status = e.status if isinstance(e, aiohttp.ClientResponseError) else None
+                if status:
+                    metrics.response(url, status)
+                if not is_retryable(status):
+                    break  # Retrying will not fix a client error
+                if attempt < self.max_retries - 1:
+                    backoff = jittered(delay)
+                    metrics.retry(url, last_error, backoff)
+                    await asyncio.sleep(backoff)
+                    delay *= 2  # Exponential backoff
+            finally:
+                limiter.release()
         
-        # Fetch and filter URLs
-        all_urls = self.fetch_sitemap(sitemap_url)
-        filtered_urls = self.filter_urls(all_urls, url_pattern)
+        # All retries failed
+        if last_error is not None:
+            metrics.failure(url, last_error)
+        return None
+    
+    def trace_config(self) -> "aiohttp.TraceConfig":
+        """aiohttp tracing hooks feeding DNS and connect timings into the metrics."""
+        metrics = self.metrics
+        trace = aiohttp.TraceConfig()
+        
+        async def on_request_start(session, context, params):
+            context.url = str(params.url)
+        
+        async def on_dns_start(session, context, params):
+            context.dns_started = time.perf_counter()
+        
+        async def on_dns_end(session, context, params):
+            metrics.observe(context.url, 'dns', time.perf_counter() - context.dns_started)
+        
+        async def on_connect_start(session, context, params):
+            context.connect_started = time.perf_counter()
+        
+        async def on_connect_end(session, context, params):
+            metrics.observe(context.url, 'connect', time.perf_counter() - context.connect_started)
+        
+        trace.on_request_start.append(on_request_start)
+        trace.on_dns_resolvehost_start.append(on_dns_start)
+        trace.on_dns_resolvehost_end.append(on_dns_end)
+        trace.on_connection_create_start.append(on_connect_start)
+        trace.on_connection_create_end.append(on_connect_end)
+        return trace
+    
+    async def process_document_async(self, session: "aiohttp.ClientSession", url: str, doc_name: str,
+                                     output_dir: Path, existing_hash: Optional[str], force: bool,
+                                     dry_run: bool, verbose: bool,
+                                     validators: Optional[Dict[str, str]] = None,
+                                     normalizer: Optional[DocumentNormalizer] = None,
+                                     semantic: Optional[dict] = None
+                                     ) -> Tuple[str, str, Optional[str], Dict[str, str]]:
+        """Async counterpart of process_document."""
+        markdown_url = url.rstrip('/') + '.md'
+        
+        if force or not existing_hash:
+            if dry_run:
+                return doc_name, "would_update", None, {}
+            existing_hash, validators = None, None
+        
+        with StreamingDocumentWriter(None if dry_run else output_dir / f"{doc_name}.md",
+                                     normalizer) as sink:
+            response = await self.fetch_with_retry_async(
+                session, markdown_url, headers=self.conditional_headers(validators), sink=sink
+            )
+            if response is None and verbose:
+                reason = self.metrics.failure_for(markdown_url)
+                print(f"  Failed to fetch {markdown_url} after {self.max_retries} attempts"
+                      + (f" ({reason})" if reason else ""))
+            started = time.perf_counter()
+            result = self.resolve_document(doc_name, response, sink, existing_hash, dry_run,
+                                           normalizer, semantic)
+        self.metrics.observe(url, 'write', time.perf_counter() - started)
+        return result
+    
+    async def process_documents_async(self, work: List[tuple], force: bool, dry_run: bool,
+                                      verbose: bool, on_result):
+        """Process documents concurrently over one pooled keep-alive session.
         
-        print(f"  Found {len(filtered_urls)} matching URLs")
+        work holds (run, url, doc_name, existing_hash, validators, semantic) items from any
+        number of sources. Each source's semaphore caps its in-flight requests at
+        its concurrency; on_result(run, url, doc_name, result, error) is called on
+        the event loop thread as each document completes.
+        """
+        runs = {id(item[0]): item[0] for item in work}.values()
+        semaphores = {run.name: asyncio.Semaphore(run.source.get('concurrency', self.concurrency)) for run in runs}
         
-        if not filtered_urls:
-            return {"updated": 0, "unchanged": 0, "failed": 0}
+        async def run_one(session, run, url, doc_name, existing_hash, validators, semantic):
+            async with semaphores[run.name]:
+                try:
+                    result = await self.process_document_async(
+                        session, url, doc_name, run.output_dir, existing_hash,
+                        force, dry_run, verbose, validators, run.normalizer, semantic
+                    )
+                except Exception as e:
+                    on_result(run, url, doc_name, None, e)
+                else:
+                    on_result(run, url, doc_name, result, None)
+        
+        if self.keep_alive:
+            # The session (and its open connections) outlives this sync
+            if self.async_session is None:
+                limit = sum(source.get('concurrency', self.concurrency) for source in self.config['sources'])
+                connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit)
+                self.async_session = aiohttp.ClientSession(connector=connector, trace_configs=[self.trace_config()])
+            await asyncio.gather(*(run_one(self.async_session, *item) for item in work))
+            return
+        
+        limit = sum(run.source.get('concurrency', self.concurrency) for run in runs)
+        connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit)
+        async with aiohttp.ClientSession(connector=connector, trace_configs=[self.trace_config()]) as session:
+            await asyncio.gather(*(run_one(session, *item) for item in work))
+    
+    def process_documents_threaded(self, work: List[tuple], force: bool, dry_run: bool,
+                                   verbose: bool, on_result):
+        """Process documents from any number of sources on one shared thread pool.
+        
+        The pool has one thread per worker slot across all sources; each source's
+        semaphore caps how many of them it occupies at once. on_result is called
+        on the calling thread as futures complete.
+        """
+        runs = {id(item[0]): item[0] for item in work}.values()
+        semaphores = {run.name: BoundedSemaphore(run.source.get('max_workers', self.max_workers)) for run in runs}
+        pool_size = sum(run.source.get('max_workers', self.max_workers) for run in runs)
+        
+        def run_one(run, url, doc_name, existing_hash, validators, semantic):
+            with semaphores[run.name]:
+                return self.process_document(
+                    url, doc_name, run.output_dir, existing_hash,
+                    force, dry_run, verbose, validators, run.normalizer, semantic
+                )
+        
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            # Submit all tasks
+            futures = {executor.submit(run_one, *item): item for item in work}
+            
+            # Process completed futures
+            for future in as_completed(futures):
+                run, url, doc_name_orig = futures[future][:3]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    on_result(run, url, doc_name_orig, None, e)
+                else:
+                    on_result(run, url, doc_name_orig, result, None)
+    
+    def plan_source(self, run: SourceRun, force: bool, dry_run: bool, verbose: bool):
+        """Fetch a source's sitemap and fill run.docs_to_process with documents to fetch."""
+        source = run.source
+        sitemap_url = source['sitemap']
+        url_pattern = source['url_pattern']
+        fetch_markdown = source.get('fetch_markdown', True)
+        
+        # Fetch and filter URLs
+        self.configure_hosts([sitemap_url], source.get('rate_limit', {}))
+        entries = self.fetch_sitemap_entries(sitemap_url)
+        filtered_entries = [e for e in entries if url_pattern in e['loc']]
+        self.configure_hosts([e['loc'] for e in filtered_entries], source.get('rate_limit', {}))
+        run.matching_urls = len(filtered_entries)
+        known_urls = {doc_name: entry.get('url') for doc_name, entry in run.manifest.items()}
+        doc_index = self.build_doc_index([e['loc'] for e in filtered_entries], url_pattern, known_urls)
         
         # Create output directory
-        if not dry_run:
-            output_dir.mkdir(parents=True, exist_ok=True)
+        if filtered_entries and not dry_run:
+            run.output_dir.mkdir(parents=True, exist_ok=True)
         
         # Prepare documents to process
-        docs_to_process = []
-        for url in filtered_urls:
-            # Extract document name from URL
-            doc_part = url.split(url_pattern)[-1] if url_pattern in url else ''
-            doc_name = doc_part.rstrip('/').split('/')[-1] if doc_part else ''
+        for sitemap_entry in filtered_entries:
+            url = sitemap_entry['loc']
+            doc_name = doc_index.get(url)
             if doc_name and fetch_markdown:
-                existing_hash = manifest['documents'].get(doc_name, {}).get('hash')
-                docs_to_process.append((url, doc_name, existing_hash))
+                entry = run.manifest.get(doc_name) or {}
+                run.sitemap_meta[doc_name] = self.sitemap_metadata(sitemap_entry)
+                if run.incremental and not self.is_stale(sitemap_entry, entry):
+                    run.stats["unchanged"] += 1
+                    if verbose:
+                        print(f"    Unchanged (lastmod): {doc_name}")
+                    continue
+                validators = {k: entry[k] for k in ('etag', 'last_modified') if entry.get(k)}
+                semantic = {k: entry[k] for k in ('semantic_hash', 'semantic_of', 'sections') if entry.get(k)}
+                run.docs_to_process.append((url, doc_name, entry.get('hash'), validators, semantic))
+    
+    def record_result(self, run: SourceRun, url: str, doc_name_orig: str, result, error,
+                      dry_run: bool, verbose: bool):
+        """Record one finished document in its source's stats and manifest."""
+        stats = run.stats
+        if error is not None:
+            print(f"    Error processing {doc_name_orig}: {error}")
+            stats["failed"] += 1
+            return
         
-        if not docs_to_process:
-            return {"updated": 0, "unchanged": 0, "failed": 0}
+        doc_name, status, new_hash, new_validators = result
         
-        stats = {"updated": 0, "unchanged": 0, "failed": 0}
+        # Update stats
+        if status == "unchanged":
+            stats["unchanged"] += 1
+            normalized = new_validators.pop('normalized', False)
+            if normalized:
+                stats["normalized"] += 1
+            if verbose:
+                print(f"    Unchanged{' (cosmetic changes only)' if normalized else ''}: {doc_name}")
+            
+            # Record fresh validators and sitemap metadata so the
+            # next run can skip this document earlier
+            fresh = {**new_validators, **run.sitemap_meta.get(doc_name, {})}
+            if not dry_run and fresh:
+                doc = run.manifest.get(doc_name) or {}
+                if any(doc.get(k) != v for k, v in fresh.items()):
+                    run.manifest.update(doc_name, fresh)
+                    run.manifest_dirty = True
+            
+            # Backfill documents fetched before the blob store was enabled
+            if not dry_run and run.blobs and new_hash:
+                fetched = (run.manifest.get(doc_name) or {}).get('last_fetched')
+                self.store_revision(run, doc_name, new_hash, fetched, backfill=True)
+        elif status in ["updated", "would_update"]:
+            stats["updated"] += 1
+            if verbose or dry_run:
+                action = "Would fetch" if dry_run else "Updated"
+                delta = new_validators.get('delta')
+                print(f"    {action}: {doc_name}" + (f" ({describe_delta(delta)})" if delta else ""))
+            
+            # Update manifest (each store is thread-safe)
+            if not dry_run and new_hash:
+                last_fetched = datetime.utcnow().isoformat() + "Z"
+                if self.on_document:
+                    self.on_document("document.updated", run, doc_name, url=url, hash=new_hash,
+                                     new=run.manifest.get(doc_name) is None,
+                                     delta=new_validators.get('delta'))
+                run.manifest.put(doc_name, {
+                    "url": url,
+                    "hash": new_hash,
+                    "last_fetched": last_fetched,
+                    **new_validators,
+                    **run.sitemap_meta.get(doc_name, {})
+                })
+                if run.blobs:
+                    self.store_revision(run, doc_name, new_hash, last_fetched)
+        elif status == "failed":
+            stats["failed"] += 1
+            if verbose:
+                print(f"    Failed: {doc_name}")
+            if self.on_document:
+                self.on_document("document.failed", run, doc_name, url=url,
+                                 reason=self.metrics.failure_for(url.rstrip('/') + '.md'))
+    
+    def store_revision(self, run: SourceRun, doc_name: str, content_hash: str,
+                       fetched: Optional[str] = None, backfill: bool = False):
+        """Add a document's working copy to the blob store and its revision log.
         
-        # Process documents in parallel with progress bar
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            futures = {
-                executor.submit(
-                    self.process_document, 
-                    url, doc_name, output_dir, existing_hash, 
-                    force, dry_run, verbose
-                ): (url, doc_name)
-                for url, doc_name, existing_hash in docs_to_process
-            }
+        A backfill (an unchanged document) is skipped when already recorded, and
+        only stored if the working copy still matches content_hash.
+        """
+        blobs = run.blobs
+        path = run.output_dir / f"{doc_name}.md"
+        try:
+            if backfill:
+                revisions = blobs.revisions(run.name, doc_name)
+                if revisions and revisions[-1]['hash'] == content_hash and blobs.has(content_hash):
+                    return
+                if not path.exists() or (not blobs.has(content_hash) and file_sha256(path) != content_hash):
+                    return
+            blobs.add_revision(run.name, doc_name, path, content_hash, fetched)
+        except OSError as e:
+            print(f"    Warning: could not store {doc_name} in blob store: {e}")
+    
+    def finish_source(self, run: SourceRun, dry_run: bool):
+        """Save the source's manifest if anything changed."""
+        if not dry_run and (run.stats["updated"] > 0 or run.manifest_dirty):
+            run.manifest.set_meta('source', run.source['sitemap'])
+            run.manifest.set_meta('last_updated', datetime.utcnow().isoformat() + "Z")
+            run.manifest.flush()
+            print(f"  Manifest updated for {run.name}: {run.source['manifest_file']}")
+    
+    def process_sources(self, sources: List[dict], force: bool = False, dry_run: bool = False,
+                        verbose: bool = False, disable_progress: bool = False,
+                        incremental: bool = False) -> Dict[str, dict]:
+        """Sync several sources at once and return stats per source name.
+        
+        All sitemaps are fetched concurrently, then every source's documents are
+        interleaved into one global work queue. Per-source caps (max_workers or
+        concurrency) and the shared per-host rate limiters bound the load each
+        source and host sees; one progress bar covers the whole run. The async
+        engine is used when every source selects it and aiohttp is installed.
+        """
+        engines = {source.get('engine', 'thread') for source in sources}
+        engine = 'async' if engines == {'async'} else 'thread'
+        if engine == 'async' and not AIOHTTP_AVAILABLE:
+            print("Note: aiohttp not installed, falling back to thread engine: pip install aiohttp")
+            engine = 'thread'
+        elif len(engines) > 1:
+            print("Note: sources select different engines; using the thread engine for all of them")
+        
+        runs = []
+        try:
+            for source in sources:
+                source_incremental = (incremental or source.get('incremental', False)) and not force
+                runs.append(SourceRun(source, self.open_manifest(source), source_incremental,
+                                      self.open_blob_store(source)))
+            
+            # Fetch every sitemap at once
+            from concurrent.futures import ThreadPoolExecutor
+            with self.metrics.phase('sitemap'), ThreadPoolExecutor(max_workers=len(runs) or 1) as executor:
+                list(executor.map(lambda run: self.plan_source(run, force, dry_run, verbose), runs))
+            
+            for run in runs:
+                source = run.source
+                print(f"\nProcessing: {run.name}")
+                print(f"  Sitemap: {source['sitemap']}")
+                print(f"  Pattern: {source['url_pattern']}")
+                if engine == 'async':
+                    print(f"  Engine: async (concurrency: {source.get('concurrency', self.concurrency)})")
+                else:
+                    print(f"  Max workers: {source.get('max_workers', self.max_workers)}")
+                print(f"  Found {run.matching_urls} matching URLs")
+                if run.incremental:
+                    print(f"  Incremental: {len(run.docs_to_process)} of {len(run.sitemap_meta)} documents need fetching")
+            
+            # Interleave sources round-robin so no source waits behind another
+            queues = [[(run, *doc) for doc in run.docs_to_process] for run in runs]
+            work = [item for batch in zip_longest(*queues) for item in batch if item is not None]
             
             # Use progress bar if available and not disabled
-            if not disable_progress and not verbose:
-                progress_bar = tqdm(
-                    total=len(futures),
-                    desc=f"  Fetching {name}",
-                    disable=not TQDM_AVAILABLE
-                )
+            if work and not disable_progress and not verbose:
+                desc = f"  Fetching {runs[0].name}" if len(runs) == 1 else f"  Fetching {len(runs)} sources"
+                progress_bar = make_progress_bar(total=len(work), desc=desc, disable=not TQDM_AVAILABLE)
             else:
                 progress_bar = None
+            completed = 0
             
-            # Process completed futures
-            for future in as_completed(futures):
-                url, doc_name_orig = futures[future]
-                try:
-                    doc_name, status, content, new_hash = future.result()
-                    
-                    # Update stats
-                    if status == "unchanged":
-                        stats["unchanged"] += 1
-                        if verbose:
-                            print(f"    Unchanged: {doc_name}")
-                    elif status in ["updated", "would_update"]:
-                        stats["updated"] += 1
-                        if verbose or dry_run:
-                            action = "Would fetch" if dry_run else "Updated"
-                            print(f"    {action}: {doc_name}")
-                        
-                        # Update manifest (thread-safe)
-                        if not dry_run and new_hash:
-                            with self.manifest_lock:
-                                manifest['documents'][doc_name] = {
-                                    "url": url,
-                                    "hash": new_hash,
-                                    "last_fetched": datetime.utcnow().isoformat() + "Z"
-                                }
-                    elif status == "failed":
-                        stats["failed"] += 1
-                        if verbose:
-                            print(f"    Failed: {doc_name}")
-                    
-                    # Update progress bar
-                    if progress_bar:
-                        progress_bar.update(1)
-                        if not TQDM_AVAILABLE:
-                            # Simple progress indicator for fallback
-                            if stats["updated"] + stats["unchanged"] + stats["failed"] == len(futures):
-                                print(f"  Completed: {stats['updated']} updated, {stats['unchanged']} unchanged, {stats['failed']} failed")
-                        
-                except Exception as e:
-                    print(f"    Error processing {doc_name_orig}: {e}")
-                    stats["failed"] += 1
-                    if progress_bar:
-                        progress_bar.update(1)
+            def handle_result(run, url, doc_name_orig, result, error):
+                nonlocal completed
+                completed += 1
+                self.record_result(run, url, doc_name_orig, result, error, dry_run, verbose)
+                
+                # Update progress bar
+                if progress_bar:
+                    progress_bar.update(1)
+                    if not TQDM_AVAILABLE and completed == len(work):
+                        # Simple progress indicator for fallback
+                        totals = {key: sum(r.stats[key] for r in runs) for key in run.stats}
+                        print(f"  Completed: {totals['updated']} updated, {totals['unchanged']} unchanged, {totals['failed']} failed")
+            
+            with self.metrics.phase('fetch'):
+                if work and engine == 'async':
+                    self.run_coroutine(self.process_documents_async(work, force, dry_run, verbose, handle_result))
+                elif work:
+                    self.process_documents_threaded(work, force, dry_run, verbose, handle_result)
             
             if progress_bar:
                 progress_bar.close()
+            
+            for host, limiter in self.limiters.items():
+                if limiter.throttled:
+                    print(f"  Throttled {limiter.throttled} times by {host}; concurrency limit now {int(limiter.limit)}")
+            
+            with self.metrics.phase('manifest'):
+                for run in runs:
+                    self.finish_source(run, dry_run)
+        finally:
+            if not self.keep_alive:
+                for run in runs:
+                    run.manifest.close()
+        
+        return {run.name: run.stats for run in runs}
+    
+    def process_source(self, source: dict, force: bool = False, dry_run: bool = False, 
+                      verbose: bool = False, disable_progress: bool = False,
+                      incremental: bool = False) -> dict:
+        """Process a single documentation source with parallel fetching.
         
-        # Save manifest
-        if not dry_run and stats["updated"] > 0:
-            manifest['last_updated'] = datetime.utcnow().isoformat() + "Z"
-            self.save_manifest(manifest_file, manifest)
-            print(f"  Manifest updated: {manifest_file}")
+        Documents are fetched by a thread pool, or by the asyncio engine when the
+        source's engine is "async" and aiohttp is installed. In incremental mode,
+        documents whose sitemap <lastmod> shows no change since they were last
+        fetched are counted as unchanged without a request.
+        """
+        return self.process_sources(
+            [source], force=force, dry_run=dry_run, verbose=verbose,
+            disable_progress=disable_progress, incremental=incremental
+        )[source['name']]
+    
+    def compare_validators(self, doc: dict, response) -> Optional[bool]:
+        """Decide from response headers alone whether a known document changed.
         
-        return stats
+        Returns True (changed), False (unchanged) or None when the headers give
+        no answer. ETag is authoritative, then Last-Modified; Content-Length (or
+        the total of a Content-Range) can only prove a change, and is ignored
+        for compressed responses.
+        """
+        if response.status_code == 304:
+            return False
+        headers = response.headers
+        etag = headers.get('ETag')
+        if etag and doc.get('etag'):
+            return etag != doc['etag']
+        last_modified = headers.get('Last-Modified')
+        if last_modified and doc.get('last_modified'):
+            if last_modified == doc['last_modified']:
+                return False
+            from email.utils import parsedate_to_datetime
+            try:
+                return parsedate_to_datetime(last_modified) > parsedate_to_datetime(doc['last_modified'])
+            except (TypeError, ValueError):
+                return True
+        if doc.get('size') is not None and not headers.get('Content-Encoding'):
+            length = headers.get('Content-Length')
+            if response.status_code == 206:
+                length = headers.get('Content-Range', '').rpartition('/')[2]
+            if length and length.isdigit() and int(length) != doc['size']:
+                return True
+        return None
     
-    def check_updates(self, source_name: Optional[str] = None) -> Dict[str, List[str]]:
-        """Check which documents need updating without fetching."""
+    def check_document(self, url: str, doc: dict, sitemap_entry: Dict[str, str],
+                       full: bool = False) -> Tuple[Optional[bool], str]:
+        """Check one known document, downloading its body only as a last resort.
+        
+        Returns (changed, method): changed is None if the check failed, and
+        method says what answered it: "sitemap" (lastmod), "headers" (HEAD),
+        "range" (a one-byte ranged GET, for servers that reject HEAD) or "full"
+        (GET and hash).
+        """
+        markdown_url = url.rstrip('/') + '.md'
+        
+        if not full:
+            if sitemap_entry.get('lastmod') and not self.is_stale(sitemap_entry, doc):
+                return False, "sitemap"
+            
+            headers = self.conditional_headers(doc)
+            method = "headers"
+            response = self.fetch_with_retry(markdown_url, headers=headers, method='HEAD',
+                                             passthrough=HEAD_UNSUPPORTED)
+            if response is None or response.status_code in HEAD_UNSUPPORTED:
+                # HEAD not supported or failed; probe with a one-byte ranged GET
+                method = "range"
+                response = self.fetch_with_retry(markdown_url, headers={**headers, 'Range': 'bytes=0-0'})
+            if response is not None:
+                changed = self.compare_validators(doc, response)
+                if changed is not None:
+                    return changed, method
+                if method == "range" and response.status_code == 200:
+                    # The server ignored Range and sent the whole body
+                    return self.get_document_hash(response.content) != doc.get('hash'), "full"
+        
+        response = self.fetch_markdown_response(url)
+        if response is None:
+            return None, "full"
+        return self.get_document_hash(response.content) != doc.get('hash'), "full"
+    
+    def check_updates(self, source_name: Optional[str] = None,
+                      incremental: bool = False, full: bool = False) -> Dict[str, dict]:
+        """Check which documents need updating without fetching their bodies.
+        
+        Known documents are answered from sitemap <lastmod> and HEAD validators
+        (ETag, Last-Modified, Content-Length), falling back to a full GET and
+        hash only when the server gives none. Each source's result includes a
+        "checks" tally of which method answered. With full=True every known
+        document is downloaded and hashed as before; incremental mode then
+        still skips documents whose <lastmod> shows no change.
+        """
         sources = self.config['sources']
         if source_name:
             sources = [s for s in sources if s['name'] == source_name]
@@ -357,58 +2367,69 @@ class DocumentationFetcher:
             name = source['name']
             sitemap_url = source['sitemap']
             url_pattern = source['url_pattern']
-            manifest_file = source['manifest_file']
             
             # Load manifest
-            manifest = self.load_manifest(manifest_file)
+            manifest = self.open_manifest(source)
+            known_docs = {doc_name: entry for doc_name, entry in manifest.items()}
+            manifest.close()
             
             # Fetch current URLs
-            all_urls = self.fetch_sitemap(sitemap_url)
-            filtered_urls = self.filter_urls(all_urls, url_pattern)
+            self.configure_hosts([sitemap_url], source.get('rate_limit', {}))
+            entries = self.fetch_sitemap_entries(sitemap_url)
+            entries_by_url = {e['loc']: e for e in entries}
+            filtered_urls = self.filter_urls(list(entries_by_url), url_pattern)
+            self.configure_hosts(filtered_urls, source.get('rate_limit', {}))
             
-            current_docs = set()
-            for url in filtered_urls:
-                # Extract document name from URL
-                doc_part = url.split(url_pattern)[-1] if url_pattern in url else ''
-                doc_name = doc_part.rstrip('/').split('/')[-1] if doc_part else ''
-                if doc_name:
-                    current_docs.add(doc_name)
+            known_urls = {doc_name: entry.get('url') for doc_name, entry in known_docs.items()}
+            doc_index = self.build_doc_index(filtered_urls, url_pattern, known_urls)
+            doc_urls = {doc_name: url for url, doc_name in doc_index.items()}
+            current_docs = set(doc_urls)
             
             # Find changes
-            existing_docs = set(manifest['documents'].keys())
+            existing_docs = set(known_docs)
             new_docs = current_docs - existing_docs
             removed_docs = existing_docs - current_docs
             
             # Check for content changes (with parallel fetching)
             changed_docs = []
+            failed_docs = []
+            checks = {"sitemap": 0, "headers": 0, "range": 0, "full": 0}
             docs_to_check = []
             
             for doc_name in current_docs & existing_docs:
-                url = next((u for u in filtered_urls if doc_name in u), None)
-                if url and source.get('fetch_markdown', True):
-                    old_hash = manifest['documents'][doc_name].get('hash')
-                    docs_to_check.append((url, doc_name, old_hash))
+                url = doc_urls[doc_name]
+                if source.get('fetch_markdown', True):
+                    doc = known_docs[doc_name]
+                    if (full and (incremental or source.get('incremental', False))
+                            and not self.is_stale(entries_by_url[url], doc)):
+                        checks["sitemap"] += 1
+                        continue
+                    docs_to_check.append((url, doc_name, doc))
             
             # Check in parallel
             if docs_to_check:
+                from concurrent.futures import ThreadPoolExecutor, as_completed
                 with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
                     futures = {
-                        executor.submit(self.fetch_markdown, url, False): (doc_name, old_hash)
-                        for url, doc_name, old_hash in docs_to_check
+                        executor.submit(self.check_document, url, doc, entries_by_url[url], full): doc_name
+                        for url, doc_name, doc in docs_to_check
                     }
                     
                     for future in as_completed(futures):
-                        doc_name, old_hash = futures[future]
-                        content = future.result()
-                        if content:
-                            new_hash = self.get_document_hash(content)
-                            if new_hash != old_hash:
-                                changed_docs.append(doc_name)
+                        doc_name = futures[future]
+                        changed, method = future.result()
+                        checks[method] += 1
+                        if changed is None:
+                            failed_docs.append(doc_name)
+                        elif changed:
+                            changed_docs.append(doc_name)
             
             updates[name] = {
                 "new": list(new_docs),
                 "changed": changed_docs,
-                "removed": list(removed_docs)
+                "removed": list(removed_docs),
+                "failed": failed_docs,
+                "checks": checks
             }
         
         return updates
@@ -424,9 +2445,23 @@ class DocumentationFetcher:
         if not TQDM_AVAILABLE and not args.no_progress:
             print("Note: Install tqdm for better progress bars: pip install tqdm")
         
+        for source in self.config['sources']:
+            if getattr(args, 'blob_store', None):
+                source['blob_store'] = args.blob_store
+            if getattr(args, 'blob_compression', None):
+                source['blob_compression'] = args.blob_compression
+            if getattr(args, 'manifest_backend', None):
+                source['manifest_backend'] = args.manifest_backend
+        
+        if getattr(args, 'history', None) or getattr(args, 'diff', None) or getattr(args, 'rollback', None):
+            self.run_revisions(args)
+            return
+        
         if args.check:
             # Check for updates
-            updates = self.check_updates(args.source)
+            with self.metrics.phase('check'):
+                updates = self.check_updates(args.source, incremental=args.incremental,
+                                             full=args.full_check)
             
             for source_name, changes in updates.items():
                 print(f"\n{source_name}:")
@@ -436,8 +2471,16 @@ class DocumentationFetcher:
                     print(f"  Changed documents: {', '.join(changes['changed'])}")
                 if changes['removed']:
                     print(f"  Removed documents: {', '.join(changes['removed'])}")
-                if not any([changes['new'], changes['changed'], changes['removed']]):
+                if changes['failed']:
+                    print(f"  Could not check: {', '.join(changes['failed'])}")
+                if not any([changes['new'], changes['changed'], changes['removed'], changes['failed']]):
                     print("  No updates needed")
+                checks = changes['checks']
+                answered = checks['sitemap'] + checks['headers'] + checks['range']
+                print(f"  Checked {answered + checks['full']} documents: {answered} without a body "
+                      f"({checks['sitemap']} sitemap, {checks['headers']} HEAD, {checks['range']} range), "
+                      f"{checks['full']} full downloads")
+            self.write_metrics(args, mode="check", sources=updates)
             return
         
         # Process sources
@@ -452,35 +2495,207 @@ class DocumentationFetcher:
             print("Error: Specify --source <name> or --all")
             sys.exit(1)
         
-        total_stats = {"updated": 0, "unchanged": 0, "failed": 0}
-        
         for source in sources:
             # Update source-specific settings
             if hasattr(args, 'max_workers') and args.max_workers:
                 source['max_workers'] = args.max_workers
             if hasattr(args, 'max_retries') and args.max_retries:
                 source['max_retries'] = args.max_retries
-                
-            stats = self.process_source(
-                source, 
-                force=args.force, 
-                dry_run=args.dry_run,
-                verbose=args.verbose,
-                disable_progress=args.no_progress
-            )
-            
+            if getattr(args, 'engine', None):
+                source['engine'] = args.engine
+            if getattr(args, 'concurrency', None):
+                source['concurrency'] = args.concurrency
+            if getattr(args, 'interval', None):
+                source['watch_interval'] = args.interval
+        
+        if getattr(args, 'watch', False):
+            self.watch(sources, args)
+            return
+        
+        source_stats = self.process_sources(
+            sources,
+            force=args.force, 
+            dry_run=args.dry_run,
+            verbose=args.verbose,
+            disable_progress=args.no_progress,
+            incremental=args.incremental
+        )
+        
+        total_stats = {"updated": 0, "unchanged": 0, "failed": 0}
+        for stats in source_stats.values():
             for key in total_stats:
                 total_stats[key] += stats[key]
         
         # Print summary
         print("\n" + "="*50)
         print("Summary:")
+        if len(source_stats) > 1:
+            for name, stats in source_stats.items():
+                print(f"  {name}: {stats['updated']} updated, {stats['unchanged']} unchanged, {stats['failed']} failed")
         print(f"  Updated: {total_stats['updated']}")
         print(f"  Unchanged: {total_stats['unchanged']}")
+        normalized = sum(stats.get('normalized', 0) for stats in source_stats.values())
+        if normalized:
+            print(f"    ({normalized} with cosmetic changes only, not rewritten)")
         print(f"  Failed: {total_stats['failed']}")
         
         if args.dry_run:
             print("\nDry run completed - no files were modified")
+        elif total_stats['updated'] > 0 and not getattr(args, 'no_index', False):
+            self.update_project_index()
+        
+        self.write_metrics(args, mode="sync", sources=source_stats)
+    
+    def update_project_index(self):
+        """Post-sync hook: refresh PROJECT_INDEX.json for the documents just written.
+        
+        The documents are already on disk, so any failure here is only a
+        warning and leaves the sync's exit status alone.
+        """
+        path = Path(__file__).parent / "build-project-index.py"
+        if not path.exists():
+            return
+        try:
+            spec = importlib.util.spec_from_file_location("build_project_index", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            changed, reparsed = module.update_project_index()
+        except Exception as e:
+            print(f"Warning: Could not update project index: {type(e).__name__}: {e}")
+            return
+        if changed:
+            print(f"Updated {module.INDEX_FILE} ({reparsed} files reparsed)")
+    
+    def watch(self, sources: List[dict], args):
+        """Poll sources on their own intervals until SIGINT/SIGTERM.
+        
+        Each source is synced every watch_interval seconds (+/- WATCH_JITTER)
+        over kept connections, with conditional requests for the sitemap and
+        every document. Changed documents and poll summaries are emitted as
+        JSONL events; with events on stdout, the usual log goes to stderr.
+        """
+        events = EventStream(None if args.event_socket else sys.stdout, args.event_socket)
+        log = sys.stderr if not args.event_socket else sys.stdout
+        import signal
+        stop = Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        
+        def on_document(event, run, doc_name, **fields):
+            path = run.output_dir / f"{doc_name}.md"
+            events.emit(event, source=run.name, document=doc_name, path=str(path), **fields)
+        
+        self.enable_keep_alive()
+        self.on_document = on_document
+        intervals = {source['name']: float(source.get('watch_interval', WATCH_INTERVAL)) for source in sources}
+        next_poll = {name: time.monotonic() for name in intervals}
+        events.emit("watch.started", sources=intervals)
+        try:
+            while not stop.is_set():
+                now = time.monotonic()
+                due = [source for source in sources if next_poll[source['name']] <= now]
+                if due:
+                    started = time.perf_counter()
+                    with redirect_stdout(log):
+                        stats = self.process_sources(due, dry_run=args.dry_run, verbose=args.verbose,
+                                                     disable_progress=True, incremental=args.incremental)
+                        if any(s['updated'] for s in stats.values()) and not args.no_index:
+                            self.update_project_index()
+                    elapsed = round(time.perf_counter() - started, 3)
+                    for source in due:
+                        name = source['name']
+                        delay = intervals[name] * random.uniform(1 - WATCH_JITTER, 1 + WATCH_JITTER)
+                        next_poll[name] = time.monotonic() + delay
+                        events.emit("poll", source=name, seconds=elapsed, next_poll_in=round(delay, 1),
+                                    **stats.get(name, {}))
+                stop.wait(max(0.0, min(next_poll.values()) - time.monotonic()))
+        finally:
+            events.emit("watch.stopped")
+            events.close()
+            self.on_document = None
+            self.close()
+    
+    def run_revisions(self, args):
+        """Handle --history, --diff and --rollback for one document of one source."""
+        source = next((s for s in self.config['sources'] if s['name'] == args.source), None)
+        if source is None:
+            print("Error: --history, --diff and --rollback need --source <name>")
+            sys.exit(1)
+        blobs = self.open_blob_store(source)
+        if blobs is None:
+            print(f"Error: Source '{source['name']}' has no blob_store configured (or pass --blob-store)")
+            sys.exit(1)
+        name = source['name']
+        
+        try:
+            if args.history:
+                revisions = blobs.revisions(name, args.history)
+                if not revisions:
+                    print(f"No revisions recorded for {args.history}")
+                for index, revision in enumerate(revisions):
+                    marker = "" if blobs.has(revision['hash']) else "  (blob missing)"
+                    print(f"  {index - len(revisions)}  {revision['fetched']}  {revision['hash'][:12]}  "
+                          f"{revision['size']} bytes{marker}")
+            elif args.diff:
+                doc_name, *refs = args.diff
+                if len(refs) > 2:
+                    print("Error: --diff takes DOC [OLD [NEW]]")
+                    sys.exit(1)
+                old_ref, new_ref = (refs + ['-2', '-1'][len(refs):])[:2]
+                old_hash = blobs.resolve(name, doc_name, old_ref)
+                new_hash = blobs.resolve(name, doc_name, new_ref)
+                old_lines = blobs.read(old_hash).decode('utf-8', errors='replace').splitlines(keepends=True)
+                new_lines = blobs.read(new_hash).decode('utf-8', errors='replace').splitlines(keepends=True)
+                import difflib
+                sys.stdout.writelines(difflib.unified_diff(
+                    old_lines, new_lines, f"{doc_name}@{old_hash[:12]}", f"{doc_name}@{new_hash[:12]}"
+                ))
+            else:
+                doc_name, ref = args.rollback
+                content_hash = blobs.resolve(name, doc_name, ref)
+                path = Path(source['output_dir']) / f"{doc_name}.md"
+                blobs.materialize(content_hash, path)
+                
+                # Describe the working copy truthfully; dropping the validators,
+                # the sitemap lastmod and the live version's semantic hash makes
+                # the next sync (incremental or not) fetch the live page again
+                # and rewrite it rather than call it unchanged or cosmetic
+                manifest = self.open_manifest(source)
+                try:
+                    manifest.update(doc_name, {"hash": content_hash, "etag": None,
+                                               "last_modified": None, "size": path.stat().st_size,
+                                               "semantic_hash": None, "semantic_of": None,
+                                               "sections": None, "delta": None,
+                                               "lastmod": None, "last_fetched": None})
+                    manifest.flush()
+                finally:
+                    manifest.close()
+                print(f"Rolled back {doc_name} to {content_hash[:12]}; the next sync restores the live version")
+        except KeyError as e:
+            print(f"Error: {e.args[0]}")
+            sys.exit(1)
+    
+    def write_metrics(self, args, mode: str, sources: Dict[str, dict]):
+        """Write the run report (--metrics-json) and Prometheus metrics if requested."""
+        outputs = []
+        if getattr(args, 'metrics_json', None):
+            report = self.metrics.report(mode=mode, sources=sources)
+            outputs.append((args.metrics_json, json.dumps(report, indent=2) + "\n"))
+        if getattr(args, 'metrics_prometheus', None):
+            # --check results hold lists of document names; export their sizes
+            counts = {name: {key: len(value) if isinstance(value, list) else value
+                             for key, value in stats.items() if not isinstance(value, dict)}
+                      for name, stats in sources.items()}
+            outputs.append((args.metrics_prometheus, self.metrics.to_prometheus(counts)))
+        
+        for path, text in outputs:
+            if path == '-':
+                sys.stdout.write(text)
+                continue
+            tmp_path = Path(f"{path}.tmp")
+            tmp_path.write_text(text)
+            os.replace(tmp_path, path)
+            print(f"Metrics written to {path}")
 
 
 def main():
@@ -505,12 +2720,24 @@ def main():
         help="Check for updates without fetching"
     )
     
+    parser.add_argument(
+        "--full-check",
+        action="store_true",
+        help="With --check, download and hash every known document instead of using headers"
+    )
+    
     parser.add_argument(
         "--force", "-f",
         action="store_true",
         help="Force re-fetch all documents (ignore hashes)"
     )
     
+    parser.add_argument(
+        "--incremental", "-i",
+        action="store_true",
+        help="Only fetch documents whose sitemap <lastmod> is newer than the manifest"
+    )
+    
     parser.add_argument(
         "--dry-run", "-n",
         action="store_true",
@@ -538,6 +2765,95 @@ def main():
         help="Maximum number of retry attempts (default: 3)"
     )
     
+    parser.add_argument(
+        "--engine", "-e",
+        choices=["thread", "async"],
+        help="Fetch engine: thread pool or asyncio with a pooled client (default: per source, thread)"
+    )
+    
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Maximum in-flight requests for the async engine (default: 100)"
+    )
+    
+    parser.add_argument(
+        "--manifest-backend",
+        choices=["json", "sqlite"],
+        help="Manifest store: JSON file, or SQLite committed per document (default: per source, json)"
+    )
+    
+    parser.add_argument(
+        "--blob-store",
+        metavar="DIR",
+        help="Keep every fetched version in a content-addressed blob store under DIR"
+    )
+    
+    parser.add_argument(
+        "--blob-compression",
+        choices=["zstd", "gzip", "none"],
+        help="Blob compression; 'none' hard-links working copies to their blobs (default: zstd, else gzip)"
+    )
+    
+    parser.add_argument(
+        "--history",
+        metavar="DOC",
+        help="List the stored revisions of a document (needs --source and a blob store)"
+    )
+    
+    parser.add_argument(
+        "--diff",
+        nargs='+',
+        metavar="ARG",
+        help="DOC [OLD [NEW]]: diff two stored revisions, by index (-1 is latest) or hash prefix "
+             "(default: -2 -1)"
+    )
+    
+    parser.add_argument(
+        "--rollback",
+        nargs=2,
+        metavar=("DOC", "REV"),
+        help="Restore a stored revision of a document as its working copy"
+    )
+    
+    parser.add_argument(
+        "--metrics-json",
+        metavar="PATH",
+        help="Write a JSON run report with latency percentiles, bytes, retries and failures ('-' for stdout)"
+    )
+    
+    parser.add_argument(
+        "--metrics-prometheus",
+        metavar="PATH",
+        help="Write run metrics in Prometheus text format, e.g. for node_exporter's textfile collector"
+    )
+    
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running: poll the selected sources on their watch_interval and emit "
+             "a JSONL event per changed document (log output moves to stderr)"
+    )
+    
+    parser.add_argument(
+        "--interval",
+        type=float,
+        metavar="SECONDS",
+        help=f"Poll interval for --watch, overriding each source's watch_interval (default: {WATCH_INTERVAL})"
+    )
+    
+    parser.add_argument(
+        "--event-socket",
+        metavar="PATH",
+        help="With --watch, serve events on a Unix socket at PATH instead of stdout"
+    )
+    
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Do not refresh PROJECT_INDEX.json after a sync that updated documents"
+    )
+    
     parser.add_argument(
         "--no-progress",
         action="store_true",
@@ -549,7 +2865,8 @@ def main():
     # Run fetcher
     fetcher = DocumentationFetcher(
         max_workers=args.max_workers,
-        max_retries=args.max_retries
+        max_retries=args.max_retries,
+        concurrency=args.concurrency or 100
     )
     fetcher.run(args)
 
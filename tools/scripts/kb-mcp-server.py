@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Local MCP server for the knowledge base (kb/) and the fetched docs (tools/).
+
+Speaks the Model Context Protocol over stdio (newline-delimited JSON-RPC),
+so lookups are answered in-process instead of over the network.
+
+Tools:
+- search:             BM25 search over markdown sections (search-docs.py index)
+- get_section:        one section of a file by #anchor, or the file's outline
+- list_changed_since: documents fetched or edited after a given time
+
+Features:
+- Search index loaded once at startup and kept memory-mapped
+- LRU cache of parsed files, validated by a stat (mtime, size) on every hit
+- Index freshness checked at most once per second, re-indexing only changed files
+- No dependencies beyond the standard library
+
+Usage (see mcp.json):
+    python tools/scripts/kb-mcp-server.py
+"""
+
+import importlib.util
+import json
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def load_search_docs():
+    """Import search-docs.py as a module (its file name is not importable)."""
+    path = Path(__file__).parent / "search-docs.py"
+    spec = importlib.util.spec_from_file_location("search_docs", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+search_docs = load_search_docs()
+
+SERVER_NAME = "kb"
+SERVER_VERSION = "1.0.0"
+PROTOCOL_VERSION = "2024-11-05"
+# Revisions whose stdio tools subset this server speaks as-is (2025-03-26
+# is left out: it requires JSON-RPC batches, which serve() rejects)
+SUPPORTED_PROTOCOL_VERSIONS = (PROTOCOL_VERSION, "2025-06-18")
+
+CACHE_SIZE = 128       # parsed files kept in memory
+RESULT_CACHE_SIZE = 256  # search results kept until the index changes
+STAT_INTERVAL = 1.0    # seconds between index freshness checks
+MAX_SECTION_CHARS = 20000
+
+TOOLS = [
+    {
+        "name": "search",
+        "description": "Full-text (BM25) search over the kb/ and tools/ markdown. Returns the best "
+                       "matching sections with file, #anchor, heading path and a snippet; pass the "
+                       "file and anchor to get_section to read one.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Search terms"},
+                "limit": {"type": "integer", "description": "Number of results (default 5)", "minimum": 1},
+                "path": {"type": "string", "description": "Only return files under this path, e.g. kb/"},
+            },
+            "required": ["query"],
+        },
+    },
+    {
+        "name": "get_section",
+        "description": "Read one section of a markdown file by its #anchor (from search results). "
+                       "Without an anchor, returns the file's outline of headings and anchors.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "file": {"type": "string", "description": "Path relative to the repository root"},
+                "anchor": {"type": "string", "description": "Section anchor, e.g. hook-events-overview"},
+            },
+            "required": ["file"],
+        },
+    },
+    {
+        "name": "list_changed_since",
+        "description": "List documents whose content changed after a time: fetched docs by the "
+                       "fetch time in their manifest (with the anchors of the sections added, removed "
+                       "and changed by the last fetch), other files by modification time.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "since": {"type": "string", "description": "ISO date or time, e.g. 2025-10-18 or 2025-10-18T08:00:00Z"},
+                "path": {"type": "string", "description": "Only list files under this path"},
+            },
+            "required": ["since"],
+        },
+    },
+]
+
+
+def parse_time(value: str) -> datetime:
+    """Parse an ISO date or datetime (a trailing Z allowed) as UTC."""
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"not an ISO date or time: {value!r}")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class KnowledgeBase:
+    """Preloaded search index plus a stat-validated LRU cache of parsed files."""
+    
+    def __init__(self, repo_root: Path = search_docs.REPO_ROOT):
+        self.repo_root = Path(repo_root)
+        self.index = search_docs.SearchIndex(repo_root=self.repo_root)
+        self.files: "OrderedDict[str, dict]" = OrderedDict()
+        self.results: "OrderedDict[tuple, List[dict]]" = OrderedDict()
+        self.manifests: Dict[str, tuple] = {}
+        self.checked = 0.0
+        self.refresh(force=True)
+        self.index.load()
+    
+    def refresh(self, force: bool = False):
+        """Re-index changed files, at most once per STAT_INTERVAL."""
+        now = time.monotonic()
+        if not force and now - self.checked < STAT_INTERVAL:
+            return
+        self.checked = now
+        counts = self.index.update()
+        if counts["added"] or counts["changed"] or counts["removed"]:
+            self.results.clear()
+            print(f"kb: re-indexed {counts['added'] + counts['changed']} files, "
+                  f"dropped {counts['removed']}", file=sys.stderr)
+    
+    def resolve(self, rel: str) -> Path:
+        """Path of a corpus markdown file; rejects anything outside the corpus."""
+        path = (self.repo_root / rel).resolve()
+        try:
+            rel_path = path.relative_to(self.repo_root.resolve())
+        except ValueError:
+            raise ValueError(f"{rel} is outside the repository")
+        if rel_path.parts[:1] not in [(d,) for d in self.index.corpus_dirs] or path.suffix != ".md":
+            raise ValueError(f"{rel} is not a markdown file under {', '.join(self.index.corpus_dirs)}")
+        return path
+    
+    def parsed(self, rel: str) -> dict:
+        """Lines and sections of a file, from the LRU cache if its stat still matches."""
+        path = self.resolve(rel)
+        try:
+            stat = path.stat()
+        except OSError:
+            self.files.pop(rel, None)
+            raise ValueError(f"no such file: {rel}")
+        entry = self.files.get(rel)
+        if entry and entry["stamp"] == (stat.st_mtime_ns, stat.st_size):
+            self.files.move_to_end(rel)
+            return entry
+        
+        text = path.read_text(encoding="utf-8", errors="replace")
+        sections = list(search_docs.split_sections(text))
+        entry = {
+            "stamp": (stat.st_mtime_ns, stat.st_size),
+            "lines": text.splitlines(),
+            "tokens": {},  # line number -> token set, filled in by snippet()
+            "sections": {section["anchor"]: section for section in sections},
+        }
+        self.files[rel] = entry
+        self.files.move_to_end(rel)
+        while len(self.files) > CACHE_SIZE:
+            self.files.popitem(last=False)
+        return entry
+    
+    # Tools
+    
+    def search(self, query: str, limit: int = 5, path: Optional[str] = None) -> List[dict]:
+        self.refresh()
+        key = (query, int(limit), path)
+        if key in self.results:
+            self.results.move_to_end(key)
+            return self.results[key]
+        results = []
+        for score, section_id in self.index.search(query, max(1, int(limit)), path):
+            info = self.index.section(section_id)
+            results.append({
+                "file": info["file"], "anchor": info["anchor"], "headings": info["headings"],
+                "line": info["start"] + 1, "score": round(score, 3),
+                "snippet": self.snippet(info, query),
+            })
+        self.results[key] = results
+        while len(self.results) > RESULT_CACHE_SIZE:
+            self.results.popitem(last=False)
+        return results
+    
+    def snippet(self, info: dict, query: str, width: int = 3) -> str:
+        """Best window of width lines in the section, from cached lines and tokens."""
+        try:
+            entry = self.parsed(info["file"])
+        except ValueError:
+            return ""
+        lines, tokens = entry["lines"], entry["tokens"]
+        numbers = [n for n in range(info["start"], info["end"]) if lines[n].strip()]
+        if numbers and search_docs.HEADING_RE.match(lines[numbers[0]]):
+            numbers = numbers[1:]
+        if not numbers:
+            return ""
+        terms = set(search_docs.tokenize(query))
+        hits = []
+        for n in numbers:
+            if n not in tokens:
+                tokens[n] = frozenset(search_docs.tokenize(lines[n]))
+            hits.append(len(terms & tokens[n]))
+        best = max(range(max(1, len(numbers) - width + 1)), key=lambda i: sum(hits[i:i + width]))
+        text = " ".join(lines[n].strip() for n in numbers[best:best + width])
+        return text if len(text) <= 300 else text[:297] + "..."
+    
+    def get_section(self, file: str, anchor: Optional[str] = None) -> dict:
+        entry = self.parsed(file)
+        if not anchor:
+            return {"file": file, "outline": [
+                {"anchor": s["anchor"], "headings": s["path"], "line": s["start"] + 1}
+                for s in entry["sections"].values() if s["anchor"]
+            ]}
+        section = entry["sections"].get(anchor.lstrip("#"))
+        if section is None:
+            raise ValueError(f"no section #{anchor} in {file}; call get_section without an anchor for the outline")
+        text = "\n".join(entry["lines"][section["start"]:section["end"]]).strip()
+        result = {"file": file, "anchor": section["anchor"], "headings": section["path"],
+                  "start": section["start"] + 1, "end": section["end"]}
+        if len(text) > MAX_SECTION_CHARS:
+            text = text[:MAX_SECTION_CHARS]
+            result["truncated"] = True
+        result["text"] = text
+        return result
+    
+    def manifest_documents(self) -> Dict[str, dict]:
+        """Fetched documents by file path, from each source's manifest (re-read when it changes)."""
+        config_path = Path(search_docs.__file__).parent / "docs-config.json"
+        try:
+            sources = json.loads(config_path.read_text()).get("sources", [])
+        except (OSError, ValueError):
+            return {}
+        documents = {}
+        for source in sources:
+            manifest_path = self.repo_root / source.get("manifest_file", "")
+            try:
+                mtime = manifest_path.stat().st_mtime_ns
+            except OSError:
+                continue
+            cached = self.manifests.get(source["name"])
+            if not cached or cached[0] != mtime:
+                try:
+                    entries = json.loads(manifest_path.read_text()).get("documents", {})
+                except (OSError, ValueError):
+                    continue
+                cached = self.manifests[source["name"]] = (mtime, entries)
+            for name, entry in cached[1].items():
+                documents[f"{source['output_dir']}/{name}.md"] = {**entry, "source": source["name"]}
+        return documents
+    
+    def list_changed_since(self, since: str, path: Optional[str] = None) -> List[dict]:
+        cutoff = parse_time(since)
+        fetched = self.manifest_documents()
+        changed = []
+        for file_path in self.index.corpus_files():
+            rel = file_path.relative_to(self.repo_root).as_posix()
+            if path and not rel.startswith(path):
+                continue
+            entry = fetched.get(rel)
+            if entry and entry.get("last_fetched"):
+                when, how = parse_time(entry["last_fetched"]), "fetched"
+            else:
+                when = datetime.fromtimestamp(file_path.stat().st_mtime, timezone.utc)
+                how = "modified"
+            if when > cutoff:
+                item = {"file": rel, "changed": when.isoformat().replace("+00:00", "Z"), "by": how}
+                if entry:
+                    item["source"], item["url"] = entry["source"], entry.get("url")
+                    if entry.get("delta"):
+                        item["sections"] = entry["delta"]
+                changed.append(item)
+        changed.sort(key=lambda item: item["changed"], reverse=True)
+        return changed
+
+
+class MCPServer:
+    """Minimal MCP server: initialize, ping, tools/list and tools/call."""
+    
+    def __init__(self, kb: KnowledgeBase):
+        self.kb = kb
+        self.handlers = {
+            "search": kb.search,
+            "get_section": kb.get_section,
+            "list_changed_since": kb.list_changed_since,
+        }
+    
+    def handle(self, message: dict) -> Optional[dict]:
+        """Response to one JSON-RPC message, or None for notifications."""
+        method = message.get("method")
+        request_id = message.get("id")
+        if request_id is None:
+            return None
+        
+        if method == "initialize":
+            requested = (message.get("params") or {}).get("protocolVersion")
+            result = {
+                "protocolVersion": requested if requested in SUPPORTED_PROTOCOL_VERSIONS else PROTOCOL_VERSION,
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": SERVER_NAME, "version": SERVER_VERSION},
+            }
+        elif method == "ping":
+            result = {}
+        elif method == "tools/list":
+            result = {"tools": TOOLS}
+        elif method == "tools/call":
+            result = self.call_tool(message.get("params") or {})
+        else:
+            return {"jsonrpc": "2.0", "id": request_id,
+                    "error": {"code": -32601, "message": f"Method not found: {method}"}}
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+    
+    def call_tool(self, params: dict) -> dict:
+        handler = self.handlers.get(params.get("name"))
+        if handler is None:
+            return {"content": [{"type": "text", "text": f"Unknown tool: {params.get('name')}"}], "isError": True}
+        try:
+            output = handler(**(params.get("arguments") or {}))
+        except (TypeError, ValueError) as e:
+            return {"content": [{"type": "text", "text": f"Error: {e}"}], "isError": True}
+        return {"content": [{"type": "text", "text": json.dumps(output, ensure_ascii=False)}]}
+    
+    def serve(self, stdin=sys.stdin, stdout=sys.stdout):
+        for line in stdin:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+            except ValueError:
+                response = {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}
+            else:
+                if not isinstance(message, dict):
+                    response = {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid request"}}
+                else:
+                    try:
+                        response = self.handle(message)
+                    except Exception as e:
+                        # Keep serving; report the failure on this request only
+                        print(f"kb: {type(e).__name__}: {e}", file=sys.stderr)
+                        response = {"jsonrpc": "2.0", "id": message.get("id"),
+                                    "error": {"code": -32603, "message": str(e)}}
+            if response is not None:
+                stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+                stdout.flush()
+
+
+def main():
+    MCPServer(KnowledgeBase()).serve()
+
+
+if __name__ == "__main__":
+    main()
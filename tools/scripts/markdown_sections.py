@@ -0,0 +1,41 @@
+"""
+Markdown heading rules shared by the knowledge-base scripts.
+
+search-docs.py, embed-docs.py, build-project-index.py and fetch-docs.py all
+split markdown at headings; importing the rules from here keeps them agreeing
+on what a heading is, which code fences hide, and how anchors are spelled.
+"""
+
+import re
+from typing import Optional
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})(.*)$")
+
+
+def slugify(heading: str) -> str:
+    """GitHub-style anchor for a heading."""
+    return re.sub(r"[^\w\- ]", "", heading.lower()).replace(" ", "-")
+
+
+class HeadingScanner:
+    """Markdown headings found line by line, ignoring those inside code fences.
+    
+    fence holds the marker of the open fence, if any.
+    """
+    
+    def __init__(self):
+        self.fence: Optional[str] = None
+    
+    def scan(self, line: str) -> Optional["re.Match"]:
+        """HEADING_RE match for the next line; None for text, fence lines and fenced lines."""
+        # A fence closes only on a bare run of its own character, at least as long
+        fence_match = FENCE_RE.match(line)
+        if fence_match:
+            marker, info = fence_match.groups()
+            if self.fence is None:
+                self.fence = marker
+            elif marker[0] == self.fence[0] and len(marker) >= len(self.fence) and not info.strip():
+                self.fence = None
+            return None
+        return None if self.fence else HEADING_RE.match(line)
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Full-text search over the knowledge base markdown (kb/ and tools/).
+
+Features:
+- Section-level inverted index: each heading starts a searchable section
+- BM25 ranking with a boost for words in the section's headings
+- Stemmed tokens (snowballstemmer if installed, else a light suffix stemmer)
+- Heading-aware snippets and #anchor links to the matching section
+- Memory-mapped postings, so a query only reads the terms it needs
+- Incremental updates: files are re-tokenized only when their content hash
+  changes, and fetched docs reuse the hashes in their .docs-manifest.json
+
+Usage:
+    python search-docs.py "hook exit code"
+    python search-docs.py --in kb/ -n 5 option chain
+    python search-docs.py --update        # refresh the index only
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from markdown_sections import HEADING_RE, HeadingScanner, slugify
+
+# Try to import snowballstemmer for better stemming, but make it optional
+try:
+    import snowballstemmer
+    SNOWBALL_AVAILABLE = True
+except ImportError:
+    SNOWBALL_AVAILABLE = False
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+CORPUS_DIRS = ("kb", "tools")
+INDEX_DIR = REPO_ROOT / ".search-index"
+INDEX_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+HEADING_WEIGHT = 3  # heading words count this many times in their section
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9_]*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have if in into is it its of on or
+that the their then there these this to was were will with you your
+""".split())
+
+
+def light_stem(word: str) -> str:
+    """Strip common English inflections; crude but consistent for index and query."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    for suffix in ("ational", "ization", "ation", "ement", "ment", "ness", "ing", "ize", "ed", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]  # running -> run
+            break
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+if SNOWBALL_AVAILABLE:
+    STEMMER_NAME = "snowball-english"
+    _snowball = snowballstemmer.stemmer("english")
+    stem = _snowball.stemWord
+else:
+    STEMMER_NAME = "light"
+    stem = light_stem
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split into words, drop stopwords and stem."""
+    return [stem(token) for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_sections(text: str) -> Iterator[dict]:
+    """Split markdown into heading-bounded sections.
+    
+    Yields dicts with heading, path (the enclosing headings), anchor, start
+    and end (0-based line range) and body text. Headings inside code fences
+    are ignored. Text before the first heading is its own section.
+    """
+    lines = text.splitlines()
+    stack: List[Tuple[int, str]] = []
+    anchors: Dict[str, int] = {}
+    scanner = HeadingScanner()
+    current = {"heading": "", "path": [], "anchor": "", "start": 0}
+    
+    def close(end: int) -> Optional[dict]:
+        body = "\n".join(lines[current["start"]:end])
+        if current["heading"] or body.strip():
+            return {**current, "end": end, "text": body}
+        return None
+    
+    for number, line in enumerate(lines):
+        match = scanner.scan(line)
+        if not match:
+            continue
+        section = close(number)
+        if section:
+            yield section
+        level, heading = len(match.group(1)), match.group(2).strip()
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, heading))
+        anchor = slugify(heading)
+        seen = anchors.get(anchor, 0)
+        anchors[anchor] = seen + 1
+        if seen:
+            anchor = f"{anchor}-{seen}"
+        current = {"heading": heading, "path": [h for _, h in stack], "anchor": anchor, "start": number}
+    
+    section = close(len(lines))
+    if section:
+        yield section
+
+
+def file_sha256(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def write_atomic(path: Path, data: bytes):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+class ManifestHashes:
+    """Content hashes that fetch-docs.py recorded for the documents it wrote.
+    
+    Reads docs-config.json for each source's output_dir and manifest_file, so
+    a fetched document's hash is known without reading the file. A hash is
+    only trusted for files not modified after their manifest was written.
+    """
+    
+    def __init__(self, repo_root: Path):
+        self.hashes: Dict[str, Tuple[str, int]] = {}
+        config_path = Path(__file__).parent / "docs-config.json"
+        if not config_path.exists():
+            return
+        for source in json.loads(config_path.read_text()).get("sources", []):
+            manifest_path = repo_root / source.get("manifest_file", "")
+            if not manifest_path.is_file():
+                continue
+            try:
+                written = manifest_path.stat().st_mtime_ns
+                documents = json.loads(manifest_path.read_text()).get("documents", {})
+            except (OSError, ValueError):
+                continue
+            for name, entry in documents.items():
+                if entry.get("hash"):
+                    self.hashes[f"{source['output_dir']}/{name}.md"] = (entry["hash"], written)
+    
+    def get(self, rel_path: str, mtime_ns: int) -> Optional[str]:
+        content_hash, written = self.hashes.get(rel_path, (None, 0))
+        return content_hash if mtime_ns <= written else None
+
+
+class SearchIndex:
+    """On-disk BM25 index over markdown sections.
+    
+    Files in the index directory:
+    - files.json:    per-file cache (hash, mtime, size and each section's term
+                     frequencies), so unchanged files are never re-tokenized
+    - stamps.json:   mtime and size per file, to detect "nothing changed"
+                     without loading files.json
+    - sections.json: [file, anchor, heading path, start line, end line, length]
+    - lexicon.json:  term -> [offset, document frequency] into the postings
+    - postings.bin:  native-endian uint32 (section id, term frequency) pairs,
+                     grouped by term and memory-mapped at query time
+    """
+    
+    def __init__(self, index_dir: Path = INDEX_DIR, repo_root: Path = REPO_ROOT,
+                 corpus_dirs: Tuple[str, ...] = CORPUS_DIRS):
+        self.index_dir = Path(index_dir)
+        self.repo_root = Path(repo_root)
+        self.corpus_dirs = corpus_dirs
+        self.sections: List[list] = []
+        self.lexicon: Dict[str, list] = {}
+        self.meta: dict = {}
+        self.postings = None
+        self._mmap = None
+    
+    # Building
+    
+    def corpus_files(self) -> Iterator[Path]:
+        for directory in self.corpus_dirs:
+            root = self.repo_root / directory
+            for path in sorted(root.rglob("*.md")):
+                if not any(part.startswith(".") for part in path.relative_to(self.repo_root).parts):
+                    yield path
+    
+    def load_file_cache(self) -> dict:
+        path = self.index_dir / "files.json"
+        if path.exists():
+            cache = json.loads(path.read_text())
+            if cache.get("version") == INDEX_VERSION and cache.get("stemmer") == STEMMER_NAME:
+                return cache["files"]
+        return {}
+    
+    def parse_file(self, path: Path) -> List[dict]:
+        text = path.read_text(encoding="utf-8", errors="replace")
+        sections = []
+        for section in split_sections(text):
+            terms: Dict[str, int] = {}
+            tokens = tokenize(section["text"]) + tokenize(" ".join(section["path"])) * (HEADING_WEIGHT - 1)
+            for token in tokens:
+                terms[token] = terms.get(token, 0) + 1
+            sections.append({
+                "path": section["path"], "anchor": section["anchor"],
+                "start": section["start"], "end": section["end"],
+                "length": len(tokens), "terms": terms,
+            })
+        return sections
+    
+    def update(self, force: bool = False, verbose: bool = False) -> Dict[str, int]:
+        """Bring the index up to date; returns counts of added/changed/removed/unchanged files.
+        
+        A file whose mtime and size match the cache is skipped without being
+        read. Otherwise its hash (from a docs manifest when fetch-docs.py wrote
+        it, else computed) decides whether it is re-tokenized. Postings are
+        rewritten only if something changed.
+        """
+        paths = {path.relative_to(self.repo_root).as_posix(): path for path in self.corpus_files()}
+        stats = {rel: path.stat() for rel, path in paths.items()}
+        stamps = {rel: [stat.st_mtime_ns, stat.st_size] for rel, stat in stats.items()}
+        if not force and self.exists() and self.load_stamps() == stamps:
+            # Fast path: nothing was touched since the last update
+            return {"added": 0, "changed": 0, "removed": 0, "unchanged": len(stamps)}
+        
+        cache = {} if force else self.load_file_cache()
+        manifest = ManifestHashes(self.repo_root)
+        counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        files = {}
+        
+        for rel, path in paths.items():
+            stat = stats[rel]
+            entry = cache.get(rel)
+            if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                files[rel] = entry
+                counts["unchanged"] += 1
+                continue
+            content_hash = manifest.get(rel, stat.st_mtime_ns) or file_sha256(path)
+            if entry and entry["hash"] == content_hash:
+                files[rel] = {**entry, "mtime": stat.st_mtime_ns, "size": stat.st_size}
+                counts["unchanged"] += 1
+                continue
+            counts["changed" if entry else "added"] += 1
+            if verbose:
+                print(f"  Indexing {rel}")
+            files[rel] = {"hash": content_hash, "mtime": stat.st_mtime_ns, "size": stat.st_size,
+                          "sections": self.parse_file(path)}
+        counts["removed"] = len(set(cache) - set(files))
+        
+        if force or counts["added"] or counts["changed"] or counts["removed"] or not self.exists():
+            self.write(files)
+        else:
+            # Only timestamps moved (e.g. a sync rewrote identical content)
+            self.write_file_cache(files)
+        return counts
+    
+    def exists(self) -> bool:
+        return all((self.index_dir / name).exists()
+                   for name in ("sections.json", "lexicon.json", "postings.bin", "files.json", "stamps.json"))
+    
+    def load_stamps(self) -> Optional[dict]:
+        try:
+            stamps = json.loads((self.index_dir / "stamps.json").read_text())
+        except (OSError, ValueError):
+            return None
+        if stamps.get("version") != INDEX_VERSION or stamps.get("stemmer") != STEMMER_NAME:
+            return None
+        return stamps["files"]
+    
+    def write_file_cache(self, files: dict):
+        cache = {"version": INDEX_VERSION, "stemmer": STEMMER_NAME, "files": files}
+        write_atomic(self.index_dir / "files.json", json.dumps(cache, separators=(",", ":")).encode())
+        # Written last: a matching stamps.json means files.json is current
+        stamps = {rel: [entry["mtime"], entry["size"]] for rel, entry in files.items()}
+        write_atomic(self.index_dir / "stamps.json", json.dumps(
+            {"version": INDEX_VERSION, "stemmer": STEMMER_NAME, "files": stamps}, separators=(",", ":")
+        ).encode())
+    
+    def write(self, files: dict):
+        """Rebuild sections, lexicon and postings from the per-file cache."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        sections = []
+        term_postings: Dict[str, List[int]] = {}
+        for rel in sorted(files):
+            for section in files[rel]["sections"]:
+                section_id = len(sections)
+                sections.append([rel, section["anchor"], section["path"],
+                                 section["start"], section["end"], section["length"]])
+                for term, tf in section["terms"].items():
+                    term_postings.setdefault(term, []).extend((section_id, tf))
+        
+        postings = array("I")
+        lexicon = {}
+        for term in sorted(term_postings):
+            lexicon[term] = [len(postings), len(term_postings[term]) // 2]
+            postings.extend(term_postings[term])
+        
+        total_length = sum(section[5] for section in sections)
+        meta = {
+            "version": INDEX_VERSION,
+            "stemmer": STEMMER_NAME,
+            "byteorder": sys.byteorder,
+            "sections": len(sections),
+            "avg_length": total_length / len(sections) if sections else 0.0,
+        }
+        write_atomic(self.index_dir / "postings.bin", postings.tobytes())
+        write_atomic(self.index_dir / "lexicon.json",
+                     json.dumps({"meta": meta, "terms": lexicon}, separators=(",", ":")).encode())
+        write_atomic(self.index_dir / "sections.json", json.dumps(sections, separators=(",", ":")).encode())
+        self.write_file_cache(files)
+        self.close()
+    
+    # Querying
+    
+    def load(self):
+        """Load the lexicon and section table and memory-map the postings."""
+        if self.postings is not None:
+            return
+        lexicon = json.loads((self.index_dir / "lexicon.json").read_text())
+        self.meta, self.lexicon = lexicon["meta"], lexicon["terms"]
+        if self.meta.get("byteorder") != sys.byteorder or self.meta.get("stemmer") != STEMMER_NAME:
+            raise ValueError("index was built on another platform or with another stemmer; run --rebuild")
+        self.sections = json.loads((self.index_dir / "sections.json").read_text())
+        with open(self.index_dir / "postings.bin", "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.postings = memoryview(self._mmap).cast("I")
+            else:
+                self.postings = memoryview(array("I"))
+    
+    def close(self):
+        if self._mmap is not None:
+            self.postings.release()
+            self._mmap.close()
+        self._mmap = None
+        self.postings = None
+    
+    def search(self, query: str, limit: int = 10, prefix: Optional[str] = None) -> List[Tuple[float, int]]:
+        """Return up to limit (score, section id) pairs, best first."""
+        self.load()
+        count = self.meta["sections"]
+        avg_length = self.meta["avg_length"] or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entry = self.lexicon.get(term)
+            if entry is None:
+                continue
+            offset, df = entry
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            block = self.postings[offset:offset + 2 * df]
+            for i in range(0, 2 * df, 2):
+                section_id, tf = block[i], block[i + 1]
+                length = self.sections[section_id][5]
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                scores[section_id] = scores.get(section_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+        if prefix:
+            scores = {sid: score for sid, score in scores.items() if self.sections[sid][0].startswith(prefix)}
+        return [(score, sid) for sid, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1])]
+    
+    def section(self, section_id: int) -> dict:
+        rel, anchor, path, start, end, length = self.sections[section_id]
+        return {"file": rel, "anchor": anchor, "headings": path, "start": start, "end": end}
+    
+    def snippet(self, section_id: int, query: str, width: int = 3) -> str:
+        """The window of width lines in the section with the most query-term hits."""
+        info = self.section(section_id)
+        try:
+            text = (self.repo_root / info["file"]).read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return ""
+        lines = text.splitlines()[info["start"]:info["end"]]
+        if lines and HEADING_RE.match(lines[0]):
+            lines = lines[1:]
+        lines = [line.strip() for line in lines if line.strip()]
+        terms = set(tokenize(query))
+        hits = [len(terms.intersection(tokenize(line))) for line in lines]
+        if not lines:
+            return ""
+        best = max(range(max(1, len(lines) - width + 1)), key=lambda i: sum(hits[i:i + width]))
+        return " ".join(lines[best:best + width])
+
+
+def highlight(text: str, query: str, enabled: bool) -> str:
+    if not enabled:
+        return text
+    terms = set(tokenize(query))
+    return re.sub(r"[A-Za-z0-9_]+",
+                  lambda m: f"\033[1m{m.group(0)}\033[0m" if stem(m.group(0).lower()) in terms else m.group(0),
+                  text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the kb/ and tools/ markdown")
+    parser.add_argument("query", nargs="*", help="Search terms")
+    parser.add_argument("--limit", "-n", type=int, default=10, help="Number of results (default: 10)")
+    parser.add_argument("--in", dest="prefix", metavar="PATH", help="Only return files under this path, e.g. kb/")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--update", action="store_true", help="Update the index and exit")
+    parser.add_argument("--rebuild", action="store_true", help="Re-tokenize every file")
+    parser.add_argument("--no-update", action="store_true", help="Search the index as is, without checking for changed files")
+    parser.add_argument("--verbose", "-v", action="store_true", help="List re-indexed files")
+    args = parser.parse_args()
+    
+    index = SearchIndex()
+    if args.rebuild or args.update or not args.no_update or not index.exists():
+        counts = index.update(force=args.rebuild, verbose=args.verbose)
+        if args.update or args.rebuild or args.verbose:
+            print(f"Index: {counts['added']} added, {counts['changed']} changed, "
+                  f"{counts['removed']} removed, {counts['unchanged']} unchanged")
+    if not args.query:
+        if not (args.update or args.rebuild):
+            parser.error("no search terms given")
+        return
+    
+    query = " ".join(args.query)
+    results = index.search(query, args.limit, args.prefix)
+    if args.json:
+        print(json.dumps([{**index.section(sid), "score": round(score, 4), "snippet": index.snippet(sid, query)}
+                          for score, sid in results], indent=2))
+        return
+    if not results:
+        print("No matches")
+        return
+    
+    color = sys.stdout.isatty()
+    for rank, (score, sid) in enumerate(results, 1):
+        info = index.section(sid)
+        location = f"{info['file']}#{info['anchor']}" if info["anchor"] else info["file"]
+        print(f"{rank}. {location}  (score {score:.2f}, line {info['start'] + 1})")
+        if info["headings"]:
+            print(f"   {' > '.join(info['headings'])}")
+        snippet = index.snippet(sid, query)
+        if snippet:
+            if len(snippet) > 240:
+                snippet = snippet[:237] + "..."
+            print(f"   {highlight(snippet, query, color)}")
+
+
+if __name__ == "__main__":
+    main()